@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import BotTrade, TradingSession
+from .models import BotTrade, TradingSession, Candle
 
 
 @admin.register(BotTrade)
@@ -32,3 +32,11 @@ class TradingSessionAdmin(admin.ModelAdmin):
         return f"{obj.win_rate():.2f}%"
 
     win_rate_display.short_description = 'Win Rate'
+
+
+@admin.register(Candle)
+class CandleAdmin(admin.ModelAdmin):
+    list_display = ['symbol', 'interval', 'open_time', 'open', 'high', 'low', 'close', 'volume', 'updated_at']
+    list_filter = ['interval', 'symbol']
+    search_fields = ['symbol']
+    readonly_fields = ['updated_at']
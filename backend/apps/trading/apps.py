@@ -5,3 +5,6 @@ class TradingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.trading'
     verbose_name = 'Trading & Bots'
+
+    def ready(self):
+        from . import signals  # noqa: F401
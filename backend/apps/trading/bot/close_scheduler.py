@@ -0,0 +1,120 @@
+"""
+Timer wheel for closing bot positions at their due time.
+
+Every position gets its close deadline when it is opened
+(PositionManager.choose_close_deadline) and is stored in one Redis sorted
+set: member = BotTrade id, score = deadline timestamp. The close worker
+(trading.close_due_positions) pops due ids in batches and closes them in
+bulk, so closing costs O(due positions) instead of a scan over every user.
+
+Popping claims each id with ZREM, so several workers can drain the wheel
+concurrently without closing a position twice. Ids whose trade was already
+closed elsewhere are simply skipped by the worker.
+"""
+
+import logging
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from apps.trading.utils.redis_client import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+
+class PositionCloseScheduler:
+    """Single sorted set of open positions scored by close deadline"""
+
+    KEY = 'bot:close_schedule'
+    REBUILD_BATCH_SIZE = 1000
+
+    def __init__(self, connection=None):
+        self._connection = connection
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Scheduled closing replaces the per-run close sweep when enabled"""
+        return getattr(settings, 'BOT_CLOSE_SCHEDULER_ENABLED', False)
+
+    @property
+    def redis(self):
+        if self._connection is None:
+            self._connection = get_redis_connection()
+        return self._connection
+
+    def schedule(self, deadlines: Dict) -> None:
+        """Store close deadlines of newly opened trades: {trade id: deadline datetime}"""
+        if not deadlines:
+            return
+
+        try:
+            self.redis.zadd(self.KEY, {
+                str(trade_id): deadline.timestamp() for trade_id, deadline in deadlines.items()
+            })
+        except RedisError as e:
+            logger.error(f"❌ Failed to schedule {len(deadlines)} position closes: {e}")
+
+    def reschedule(self, trade_ids: Iterable, due_at) -> None:
+        """Put claimed ids back (e.g. after a failed close batch)"""
+        trade_ids = [str(trade_id) for trade_id in trade_ids]
+        if not trade_ids:
+            return
+
+        try:
+            self.redis.zadd(self.KEY, {trade_id: due_at.timestamp() for trade_id in trade_ids})
+        except RedisError as e:
+            logger.error(f"❌ Failed to reschedule {len(trade_ids)} position closes: {e}")
+
+    def pop_due(self, now, limit: int) -> List[str]:
+        """Claim up to limit ids due at or before now"""
+        try:
+            trade_ids = self.redis.zrangebyscore(self.KEY, '-inf', now.timestamp(), start=0, num=limit)
+            if not trade_ids:
+                return []
+
+            pipe = self.redis.pipeline(transaction=False)
+            for trade_id in trade_ids:
+                pipe.zrem(self.KEY, trade_id)
+            claimed = pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Close schedule unavailable: {e}")
+            return []
+
+        return [trade_id for trade_id, removed in zip(trade_ids, claimed) if removed]
+
+    def pending(self) -> int:
+        """Number of scheduled closes"""
+        try:
+            return self.redis.zcard(self.KEY)
+        except RedisError:
+            return 0
+
+    def rebuild(self) -> int:
+        """
+        Schedule every open position missing from the wheel (after a Redis flush).
+        Existing deadlines are kept. Returns number of positions scheduled.
+        """
+        from apps.trading.bot.simulator import BotConfigurationFactory, PositionManager
+        from apps.trading.models import BotTrade
+
+        position_managers = {
+            bot_type: PositionManager(config)
+            for bot_type, config in BotConfigurationFactory.CONFIGURATIONS.items()
+        }
+        default_manager = position_managers['basic']
+
+        scheduled = 0
+        batch = {}
+        rows = BotTrade.objects.filter(is_open=True).values_list('id', 'opened_at', 'user__bot_type')
+        for trade_id, opened_at, bot_type in rows.iterator(chunk_size=self.REBUILD_BATCH_SIZE):
+            position_manager = position_managers.get(bot_type, default_manager)
+            batch[str(trade_id)] = position_manager.choose_close_deadline(opened_at).timestamp()
+            if len(batch) >= self.REBUILD_BATCH_SIZE:
+                scheduled += self.redis.zadd(self.KEY, batch, nx=True)
+                batch = {}
+        if batch:
+            scheduled += self.redis.zadd(self.KEY, batch, nx=True)
+
+        logger.info(f"✅ Scheduled {scheduled} open positions missing from the close schedule")
+        return scheduled
@@ -0,0 +1,77 @@
+"""
+Fixed-point money and price arithmetic for the simulator hot path.
+
+Values are plain Python ints holding a number of minimal units:
+- prices and quantities: 1E-8 units (PRICE_EXP)
+- money (balances, P/L): 0.01 units (MONEY_EXP)
+- percents (targets, P/L %): 0.01 units (PERCENT_EXP)
+
+All rounding is truncation toward zero, matching the ROUND_DOWN quantize
+calls of the Decimal implementation. Decimals are only produced at the ORM
+boundary via from_units().
+"""
+
+from decimal import Decimal, ROUND_DOWN
+
+PRICE_EXP = 8
+MONEY_EXP = 2
+PERCENT_EXP = 2
+RATIO_EXP = 4
+
+PRICE_SCALE = 10 ** PRICE_EXP
+MONEY_SCALE = 10 ** MONEY_EXP
+PERCENT_SCALE = 10 ** PERCENT_EXP
+RATIO_SCALE = 10 ** RATIO_EXP
+
+# Scale used for random factors (slippage, noise) parsed from floats
+FACTOR_EXP = 18
+FACTOR_SCALE = 10 ** FACTOR_EXP
+
+# Type aliases for annotations: ints holding minimal units
+PriceUnits = int
+MoneyUnits = int
+PercentUnits = int
+
+
+def div_down(numerator: int, denominator: int) -> int:
+    """Integer division truncating toward zero (ROUND_DOWN)"""
+    quotient = abs(numerator) // abs(denominator)
+    return -quotient if (numerator < 0) != (denominator < 0) else quotient
+
+
+def to_units(value, exp: int) -> int:
+    """Decimal (or int/str) -> units of 10**-exp, truncated toward zero"""
+    if not isinstance(value, Decimal):
+        value = Decimal(value)
+    return int(value.scaleb(exp).to_integral_value(rounding=ROUND_DOWN))
+
+
+def from_units(units: int, exp: int) -> Decimal:
+    """Units of 10**-exp -> Decimal with exactly exp decimal places"""
+    return Decimal(units).scaleb(-exp)
+
+
+def float_to_units(value: float, exp: int) -> int:
+    """
+    Float -> units of 10**-exp, truncated toward zero.
+
+    Uses the float's shortest repr, so the result equals
+    Decimal(str(value)).quantize(Decimal(10) ** -exp, rounding=ROUND_DOWN)
+    without building a Decimal.
+    """
+    text = repr(value)
+    negative = text[0] == '-'
+    if negative:
+        text = text[1:]
+
+    mantissa, _, power = text.partition('e')
+    whole, _, fraction = mantissa.partition('.')
+    digits = int(whole + fraction)
+    shift = exp - len(fraction) + (int(power) if power else 0)
+
+    if shift >= 0:
+        units = digits * 10 ** shift
+    else:
+        units = digits // 10 ** -shift
+
+    return -units if negative else units
@@ -0,0 +1,303 @@
+"""
+Redis-backed per-user open-position index for the trading bot simulator.
+
+Each user has one sorted set of open BotTrade ids scored by opened_at
+(epoch seconds), so the simulator can check position limits (ZCARD) and
+find positions old enough to close (ZRANGEBYSCORE) without touching
+bot_trades. The database stays the source of truth: whenever the index is
+not known to be complete (READY marker missing, Redis unavailable) every
+read returns None and callers fall back to their ORM queries. The
+rebuild_position_index management command repopulates the index from
+bot_trades and restores the READY marker, so a Redis flush is survivable.
+
+A rebuild runs while simulators keep writing. It streams bot_trades into
+temporary keys and swaps each one into place; writers that see the
+REBUILDING marker mirror their changes into the temporary keys and record
+closed ids, so positions opened or closed mid-rebuild are neither lost
+nor resurrected by the swap.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from redis.exceptions import RedisError
+
+from apps.trading.utils.redis_client import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+
+class OpenPositionIndex:
+    """Sorted set per user: member = BotTrade id, score = opened_at timestamp"""
+
+    KEY_PREFIX = 'bot:open_positions:'
+    READY_KEY = 'bot:open_positions_ready'
+    REBUILD_BATCH_SIZE = 1000
+
+    # Rebuild state: marker (expires if a rebuild dies), staging keys, ids closed meanwhile
+    REBUILDING_KEY = 'bot:open_positions_rebuilding'
+    STAGING_PREFIX = 'bot:open_positions_staging:'
+    CLOSED_DURING_REBUILD_KEY = 'bot:open_positions_staging_closed'
+    REBUILD_TIMEOUT = 60 * 60
+
+    # KEYS: live, staging, rebuilding marker; ARGV: score, member, ...
+    ADD_SCRIPT = """
+        redis.call('ZADD', KEYS[1], unpack(ARGV))
+        if redis.call('EXISTS', KEYS[3]) == 1 then
+            redis.call('ZADD', KEYS[2], unpack(ARGV))
+        end
+    """
+
+    # KEYS: live, staging, rebuilding marker, closed set; ARGV: members
+    REMOVE_SCRIPT = """
+        redis.call('ZREM', KEYS[1], unpack(ARGV))
+        if redis.call('EXISTS', KEYS[3]) == 1 then
+            redis.call('ZREM', KEYS[2], unpack(ARGV))
+            redis.call('SADD', KEYS[4], unpack(ARGV))
+            redis.call('EXPIRE', KEYS[4], %d)
+        end
+    """ % REBUILD_TIMEOUT
+
+    # KEYS: staging, live, closed set. Drops ids closed since they were read,
+    # then replaces the live key (or deletes it when nothing is open)
+    SWAP_SCRIPT = """
+        for _, member in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+            if redis.call('SISMEMBER', KEYS[3], member) == 1 then
+                redis.call('ZREM', KEYS[1], member)
+            end
+        end
+        if redis.call('EXISTS', KEYS[1]) == 1 then
+            redis.call('RENAME', KEYS[1], KEYS[2])
+        else
+            redis.call('DEL', KEYS[2])
+        end
+    """
+
+    def __init__(self, connection=None):
+        self._connection = connection
+        self._scripts = None
+
+    @property
+    def redis(self):
+        if self._connection is None:
+            self._connection = get_redis_connection()
+        return self._connection
+
+    @property
+    def scripts(self):
+        if self._scripts is None:
+            self._scripts = {
+                name: self.redis.register_script(source)
+                for name, source in (
+                    ('add', self.ADD_SCRIPT), ('remove', self.REMOVE_SCRIPT), ('swap', self.SWAP_SCRIPT)
+                )
+            }
+        return self._scripts
+
+    @classmethod
+    def key(cls, user_id) -> str:
+        return f'{cls.KEY_PREFIX}{user_id}'
+
+    @classmethod
+    def staging_key(cls, user_id) -> str:
+        return f'{cls.STAGING_PREFIX}{user_id}'
+
+    def _write_keys(self, user_id) -> List[str]:
+        return [self.key(user_id), self.staging_key(user_id), self.REBUILDING_KEY, self.CLOSED_DURING_REBUILD_KEY]
+
+    def is_ready(self) -> bool:
+        """True when the index is known to mirror bot_trades"""
+        try:
+            return bool(self.redis.exists(self.READY_KEY))
+        except RedisError as e:
+            logger.warning(f"Open position index unavailable: {e}")
+            return False
+
+    def _invalidate(self, error: Exception) -> None:
+        """Drop the READY marker after a failed write so reads fall back to the DB"""
+        logger.error(f"❌ Open position index write failed, falling back to DB until rebuild: {error}")
+        try:
+            self.redis.delete(self.READY_KEY)
+        except RedisError:
+            pass
+
+    def add(self, trades: Iterable) -> None:
+        """Index newly opened trades"""
+        trades = list(trades)
+        if not trades:
+            return
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for trade in trades:
+                self.scripts['add'](
+                    keys=self._write_keys(trade.user_id)[:3],
+                    args=[trade.opened_at.timestamp(), str(trade.id)],
+                    client=pipe,
+                )
+            pipe.execute()
+        except RedisError as e:
+            self._invalidate(e)
+
+    def remove(self, trades: Iterable) -> None:
+        """Drop closed trades from the index"""
+        trades = list(trades)
+        if not trades:
+            return
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for trade in trades:
+                self.scripts['remove'](keys=self._write_keys(trade.user_id), args=[str(trade.id)], client=pipe)
+            pipe.execute()
+        except RedisError as e:
+            self._invalidate(e)
+
+    def remove_ids(self, user_id, trade_ids: Iterable) -> None:
+        """Drop trade ids of one user (e.g. stale entries found during a close)"""
+        trade_ids = [str(trade_id) for trade_id in trade_ids]
+        if not trade_ids:
+            return
+
+        try:
+            self.scripts['remove'](keys=self._write_keys(user_id), args=trade_ids)
+        except RedisError as e:
+            self._invalidate(e)
+
+    def reconcile(self, user_ids: List) -> Dict:
+        """
+        Prune members whose trades are no longer open in bot_trades (rows
+        deleted by session cleanup, leftovers of an interrupted rebuild) and
+        return the open position counts from the DB. Meant for users the
+        index shows at their position limit, where a ghost blocks new trades.
+        """
+        from apps.trading.models import BotTrade
+
+        open_ids = {user_id: set() for user_id in user_ids}
+        rows = BotTrade.objects.filter(user_id__in=user_ids, is_open=True).values_list('user_id', 'id')
+        for user_id, trade_id in rows:
+            open_ids[user_id].add(str(trade_id))
+
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.zrange(self.key(user_id), 0, -1)
+            members = pipe.execute()
+
+            pipe = self.redis.pipeline(transaction=False)
+            pruned = 0
+            for user_id, indexed in zip(user_ids, members):
+                stale_ids = set(indexed) - open_ids[user_id]
+                if stale_ids:
+                    self.scripts['remove'](keys=self._write_keys(user_id), args=list(stale_ids), client=pipe)
+                    pruned += len(stale_ids)
+            pipe.execute()
+        except RedisError as e:
+            self._invalidate(e)
+        else:
+            if pruned:
+                logger.info(f"🧹 Pruned {pruned} stale open position index entries for {len(user_ids)} users")
+
+        return {user_id: len(ids) for user_id, ids in open_ids.items()}
+
+    def count(self, user_id) -> Optional[int]:
+        """Number of open positions for user, or None if the index can't be trusted"""
+        counts = self.counts([user_id])
+        return None if counts is None else counts[user_id]
+
+    def counts(self, user_ids: List) -> Optional[Dict]:
+        """Open position counts for many users in one round-trip, or None"""
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.exists(self.READY_KEY)
+            for user_id in user_ids:
+                pipe.zcard(self.key(user_id))
+            ready, *cards = pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Open position index unavailable: {e}")
+            return None
+
+        if not ready:
+            return None
+        return dict(zip(user_ids, cards))
+
+    def due_ids(self, user_id, opened_before) -> Optional[List[str]]:
+        """Ids of user's open positions opened at or before opened_before, or None"""
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.exists(self.READY_KEY)
+            pipe.zrangebyscore(self.key(user_id), '-inf', opened_before.timestamp())
+            ready, trade_ids = pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Open position index unavailable: {e}")
+            return None
+
+        if not ready:
+            return None
+        return [trade_id.decode() if isinstance(trade_id, bytes) else trade_id for trade_id in trade_ids]
+
+    def _delete_matching(self, pattern: str) -> int:
+        deleted = 0
+        batch = []
+        for key in self.redis.scan_iter(match=pattern, count=self.REBUILD_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= self.REBUILD_BATCH_SIZE:
+                deleted += self.redis.delete(*batch)
+                batch = []
+        if batch:
+            deleted += self.redis.delete(*batch)
+        return deleted
+
+    def clear(self) -> int:
+        """Delete every per-user key and the READY marker. Returns keys deleted"""
+        self.redis.delete(self.READY_KEY)
+        return self._delete_matching(f'{self.KEY_PREFIX}*')
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the whole index from bot_trades and mark it READY, without
+        stopping writers: bot_trades is streamed into staging keys, which are
+        swapped over the live keys user by user (see module docstring).
+        Returns number of open positions indexed.
+        """
+        from apps.trading.models import BotTrade
+
+        if not self.redis.set(self.REBUILDING_KEY, 1, nx=True, ex=self.REBUILD_TIMEOUT):
+            raise RuntimeError('Open position index rebuild already in progress')
+
+        try:
+            # Leftovers of an interrupted rebuild would be swapped in as ghosts
+            self._delete_matching(f'{self.STAGING_PREFIX}*')
+            self.redis.delete(self.CLOSED_DURING_REBUILD_KEY)
+
+            indexed = 0
+            pipe = self.redis.pipeline(transaction=False)
+            rows = BotTrade.objects.filter(is_open=True).values_list('user_id', 'id', 'opened_at')
+            for user_id, trade_id, opened_at in rows.iterator(chunk_size=self.REBUILD_BATCH_SIZE):
+                pipe.zadd(self.staging_key(user_id), {str(trade_id): opened_at.timestamp()})
+                indexed += 1
+                if indexed % self.REBUILD_BATCH_SIZE == 0:
+                    pipe.execute()
+            pipe.execute()
+
+            # Staged users first, then live keys of users with nothing open any more
+            swapped = set()
+            for prefix in (self.STAGING_PREFIX, self.KEY_PREFIX):
+                for key in self.redis.scan_iter(match=f'{prefix}*', count=self.REBUILD_BATCH_SIZE):
+                    user_id = key[len(prefix):]
+                    if user_id in swapped:
+                        continue
+                    swapped.add(user_id)
+                    self.scripts['swap'](keys=[
+                        self.staging_key(user_id), self.key(user_id), self.CLOSED_DURING_REBUILD_KEY
+                    ])
+
+            self.redis.set(self.READY_KEY, 1)
+        finally:
+            self.redis.delete(self.REBUILDING_KEY)
+            # Writes mirrored after a user's swap are already in its live key
+            self._delete_matching(f'{self.STAGING_PREFIX}*')
+            self.redis.delete(self.CLOSED_DURING_REBUILD_KEY)
+
+        logger.info(f"✅ Rebuilt open position index with {indexed} positions")
+        return indexed
@@ -0,0 +1,127 @@
+"""
+Shared per-tick price path engine for the trading bot simulator.
+
+Advances every simulated symbol once per tick with a vectorized geometric
+Brownian motion and publishes the resulting price vector to Redis, so all
+simulators (per-user, bulk, shard and stale-close paths) read one consistent
+price per symbol for the same tick instead of drawing their own Gaussians.
+"""
+
+import logging
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.trading.bot.fixed_point import PRICE_EXP, float_to_units, from_units
+
+logger = logging.getLogger(__name__)
+
+
+def get_symbol_volatility(symbol: str) -> Decimal:
+    """Per-tick volatility coefficient for symbol"""
+    if 'BTC' in symbol or 'ETH' in symbol:
+        return Decimal('0.008')
+    elif 'BNB' in symbol or 'SOL' in symbol:
+        return Decimal('0.012')
+    return Decimal('0.015')
+
+
+class PricePathEngine:
+    """
+    Vectorized GBM price path over all simulated symbols.
+
+    Tick state lives in the cache (Redis) under TICK_CACHE_KEY:
+        {
+            'tick': int,              # monotonically increasing tick number
+            'timestamp': str,         # ISO time the tick was produced
+            'symbols': [str, ...],
+            'prices': [float, ...],   # current path price per symbol
+            'anchors': [float, ...],  # base price the path was started from
+        }
+
+    When the base price of a symbol changes (the CoinGecko snapshot is
+    refreshed), that symbol's path is re-anchored to the new base price so
+    the simulated market cannot drift away from the real one.
+    """
+
+    TICK_CACHE_KEY = 'bot:price_tick:v1'
+    TICK_CACHE_TTL = 600
+    DRIFT_PER_TICK = 0.0
+
+    # Per-process decoded tick: ((tick number, timestamp), (units, decimals))
+    _decoded_tick = (None, ({}, {}))
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+
+    def advance(self, base_prices: Dict[str, Decimal]) -> Dict:
+        """Advance all symbols by one tick and publish the new price vector"""
+        previous = cache.get(self.TICK_CACHE_KEY) or {}
+        previous_prices = dict(zip(previous.get('symbols', []), previous.get('prices', [])))
+        previous_anchors = dict(zip(previous.get('symbols', []), previous.get('anchors', [])))
+
+        symbols = sorted(symbol for symbol, price in base_prices.items() if price > 0)
+        if not symbols:
+            return previous
+
+        anchors = np.array([float(base_prices[symbol]) for symbol in symbols])
+        last = np.array([previous_prices.get(symbol, 0.0) for symbol in symbols])
+        last_anchors = np.array([previous_anchors.get(symbol, 0.0) for symbol in symbols])
+
+        # Start new symbols (and re-anchor refreshed ones) at their base price
+        reset = (last <= 0) | (last_anchors != anchors)
+        last = np.where(reset, anchors, last)
+
+        sigma = np.array([float(get_symbol_volatility(symbol)) for symbol in symbols])
+        shocks = self.rng.standard_normal(len(symbols))
+        prices = last * np.exp((self.DRIFT_PER_TICK - 0.5 * sigma ** 2) + sigma * shocks)
+
+        tick = {
+            'tick': previous.get('tick', 0) + 1,
+            'timestamp': timezone.now().isoformat(),
+            'symbols': symbols,
+            'prices': prices.tolist(),
+            'anchors': anchors.tolist(),
+        }
+        cache.set(self.TICK_CACHE_KEY, tick, self.TICK_CACHE_TTL)
+
+        logger.debug(f"Advanced price tick {tick['tick']} for {len(symbols)} symbols")
+        return tick
+
+    @classmethod
+    def get_tick(cls) -> Optional[Dict]:
+        """Read the latest published tick"""
+        return cache.get(cls.TICK_CACHE_KEY)
+
+    @classmethod
+    def get_prices(cls) -> Dict[str, Decimal]:
+        """Latest tick as {symbol: Decimal price}, quantized to 1E-8"""
+        return cls._decode_tick()[1]
+
+    @classmethod
+    def get_price_units(cls) -> Dict[str, int]:
+        """Latest tick as {symbol: price in 1E-8 fixed-point units}"""
+        return cls._decode_tick()[0]
+
+    @classmethod
+    def _decode_tick(cls) -> Tuple[Dict[str, int], Dict[str, Decimal]]:
+        """Decode the latest tick once per process per tick"""
+        tick = cls.get_tick()
+        if not tick:
+            return {}, {}
+
+        tick_id = (tick['tick'], tick['timestamp'])
+        decoded_id, decoded = cls._decoded_tick
+        if decoded_id == tick_id:
+            return decoded
+
+        units = {
+            symbol: float_to_units(price, PRICE_EXP)
+            for symbol, price in zip(tick['symbols'], tick['prices'])
+        }
+        decoded = (units, {symbol: from_units(value, PRICE_EXP) for symbol, value in units.items()})
+        cls._decoded_tick = (tick_id, decoded)
+        return decoded
@@ -3,9 +3,11 @@ Optimized Trading Bot Simulator with Batch Operations
 Implements batch inserts, bulk updates, and caching for scalability
 """
 
+import asyncio
+import math
 import random
 import logging
-from decimal import Decimal, ROUND_DOWN
+from decimal import Decimal
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from datetime import timedelta
@@ -20,6 +22,16 @@ from asgiref.sync import async_to_sync
 from apps.trading.models import BotTrade, TradingSession
 from apps.transactions.models import Transaction
 from apps.trading.utils.crypto_fetcher import CryptoDataFetcher
+from apps.trading.bot.price_engine import PricePathEngine, get_symbol_volatility
+from apps.trading.bot.position_index import OpenPositionIndex
+from apps.trading.bot.close_scheduler import PositionCloseScheduler
+from apps.trading.snapshots import write_balance_snapshots
+from apps.trading.bot.fixed_point import (
+    PRICE_EXP, MONEY_EXP, PERCENT_EXP, RATIO_EXP, FACTOR_EXP,
+    PRICE_SCALE, MONEY_SCALE, PERCENT_SCALE, RATIO_SCALE, FACTOR_SCALE,
+    PriceUnits, MoneyUnits, PercentUnits,
+    div_down, to_units, from_units, float_to_units,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -119,40 +131,100 @@ class BotConfigurationFactory:
 
 
 class MarketSimulator:
-    """Simulates realistic market conditions with caching"""
+    """
+    Simulates realistic market conditions with caching.
+    Hot-path methods (*_units) work on fixed-point ints, see fixed_point.py.
+    """
+
+    PRICES_CACHE_KEY = 'market_prices_v1'
+    PRICES_CACHE_TTL = 300
 
-    def __init__(self, base_prices: Dict[str, Decimal]):
+    def __init__(
+        self,
+        base_prices: Dict[str, Decimal],
+        tick_prices: Optional[Dict[str, Decimal]] = None,
+        rng: Optional[random.Random] = None
+    ):
         self.base_prices = base_prices
+        self.rng = rng or random
+        if tick_prices is None:
+            self.tick_prices = PricePathEngine.get_prices()
+            self.tick_units = PricePathEngine.get_price_units()
+        else:
+            self.tick_prices = tick_prices
+            self.tick_units = {symbol: to_units(price, PRICE_EXP) for symbol, price in tick_prices.items()}
+        self.base_units = {symbol: to_units(price, PRICE_EXP) for symbol, price in base_prices.items()}
         self.volatility_cache = {}
 
+    @staticmethod
+    def load_base_prices() -> Dict[str, Decimal]:
+        """Fetch market prices with caching"""
+        cache_key = MarketSimulator.PRICES_CACHE_KEY
+        prices = cache.get(cache_key)
+
+        if prices:
+            logger.debug("Using cached market prices")
+            return prices
+
+        prices = CryptoDataFetcher.get_base_prices_sync(limit=30)
+
+        if not prices:
+            logger.warning("API price fetching failed, using fallback prices")
+            prices = {
+                'BTC/USDT': Decimal('67000.00'),
+                'ETH/USDT': Decimal('3500.00'),
+                'BNB/USDT': Decimal('580.00'),
+                'SOL/USDT': Decimal('145.00'),
+                'XRP/USDT': Decimal('0.52'),
+                'ADA/USDT': Decimal('0.38'),
+                'DOGE/USDT': Decimal('0.085'),
+                'DOT/USDT': Decimal('6.20'),
+                'MATIC/USDT': Decimal('0.72'),
+                'AVAX/USDT': Decimal('28.50'),
+            }
+
+        cache.set(cache_key, prices, MarketSimulator.PRICES_CACHE_TTL)
+        return prices
+
+    def choose_trading_pair(self) -> str:
+        """Pick a trading pair, weighting BTC and ETH pairs higher"""
+        pairs = list(self.base_prices.keys())
+        weights = [3 if 'BTC' in pair or 'ETH' in pair else 1 for pair in pairs]
+        return self.rng.choices(pairs, weights=weights, k=1)[0]
+
     def get_current_price(self, symbol: str, time_offset_seconds: int = 0) -> Decimal:
-        """Generate realistic price with time-based variation"""
-        base_price = self.base_prices.get(symbol, Decimal('0'))
-        if base_price <= 0:
-            return Decimal('0')
+        """
+        Current price for symbol from the shared price tick (see PricePathEngine).
+        Falls back to a per-call random variation around the base price when
+        no tick has been published for the symbol yet.
+        """
+        return from_units(self.get_current_price_units(symbol, time_offset_seconds), PRICE_EXP)
 
-        volatility = self._get_volatility(symbol)
-        time_factor = Decimal(str(time_offset_seconds / 3600))
-        drift = Decimal(str(random.gauss(0, 0.0002))) * time_factor
-        random_factor = Decimal(str(random.gauss(0, float(volatility))))
+    def get_current_price_units(self, symbol: str, time_offset_seconds: int = 0) -> PriceUnits:
+        """get_current_price() in 1E-8 price units"""
+        tick_units = self.tick_units.get(symbol)
+        if tick_units is not None and not time_offset_seconds:
+            return tick_units
 
-        price_multiplier = Decimal('1') + drift + random_factor
-        current_price = base_price * price_multiplier
+        base_units = self.base_units.get(symbol, 0)
+        if base_units <= 0:
+            return 0
+
+        volatility = self._get_volatility(symbol)
+        time_factor = float_to_units(time_offset_seconds / 3600, FACTOR_EXP)
+        drift = float_to_units(self.rng.gauss(0, 0.0002), FACTOR_EXP) * time_factor
+        random_factor = float_to_units(self.rng.gauss(0, float(volatility)), FACTOR_EXP)
 
-        return current_price.quantize(Decimal('1E-8'), rounding=ROUND_DOWN)
+        # price = base * (1 + drift + random_factor), drift carries FACTOR_SCALE twice
+        multiplier = FACTOR_SCALE * FACTOR_SCALE + drift + random_factor * FACTOR_SCALE
+        return div_down(base_units * multiplier, FACTOR_SCALE * FACTOR_SCALE)
 
     def _get_volatility(self, symbol: str) -> Decimal:
         """Get volatility coefficient for symbol"""
         if symbol in self.volatility_cache:
             return self.volatility_cache[symbol]
 
-        if 'BTC' in symbol or 'ETH' in symbol:
-            volatility = Decimal('0.008')
-        elif 'BNB' in symbol or 'SOL' in symbol:
-            volatility = Decimal('0.012')
-        else:
-            volatility = Decimal('0.015')
-
+        volatility = get_symbol_volatility(symbol)
         self.volatility_cache[symbol] = volatility
         return volatility
 
@@ -164,28 +236,86 @@ class MarketSimulator:
         duration_seconds: int
     ) -> Decimal:
         """Calculate exit price with realistic slippage"""
+        exit_units = self.realistic_exit_units(
+            to_units(entry_price, PRICE_EXP),
+            to_units(target_percent, FACTOR_EXP),
+            side,
+            duration_seconds,
+            target_exp=FACTOR_EXP
+        )
+        return from_units(exit_units, PRICE_EXP)
+
+    def realistic_exit_units(
+        self,
+        entry_units: PriceUnits,
+        target_units: PercentUnits,
+        side: str,
+        duration_seconds: int,
+        target_exp: int = PERCENT_EXP
+    ) -> PriceUnits:
+        """
+        calculate_realistic_exit() on fixed-point ints.
+        target_units is the target percent in units of 10**-target_exp.
+        """
+        # 1 +/- target_percent / 100
+        target_scale = 100 * 10 ** target_exp
         if side == 'buy':
-            exit_price = entry_price * (Decimal('1') + target_percent / Decimal('100'))
+            target_factor = target_scale + target_units
         else:
-            exit_price = entry_price * (Decimal('1') - target_percent / Decimal('100'))
+            target_factor = target_scale - target_units
 
-        slippage = Decimal(str(random.uniform(0.0001, 0.0005)))
-        if target_percent > 0:
-            exit_price = exit_price * (Decimal('1') - slippage)
+        slippage = float_to_units(self.rng.uniform(0.0001, 0.0005), FACTOR_EXP)
+        if target_units > 0:
+            slippage_factor = FACTOR_SCALE - slippage
         else:
-            exit_price = exit_price * (Decimal('1') + slippage)
+            slippage_factor = FACTOR_SCALE + slippage
 
-        noise_factor = Decimal(str(random.gauss(0, 0.0005 * (duration_seconds / 300))))
-        exit_price = exit_price * (Decimal('1') + noise_factor)
+        noise = float_to_units(self.rng.gauss(0, 0.0005 * (duration_seconds / 300)), FACTOR_EXP)
+        noise_factor = FACTOR_SCALE + noise
 
-        return exit_price.quantize(Decimal('1E-8'), rounding=ROUND_DOWN)
+        return div_down(
+            entry_units * target_factor * slippage_factor * noise_factor,
+            target_scale * FACTOR_SCALE * FACTOR_SCALE
+        )
 
 
 class PositionManager:
-    """Manages trading positions with risk controls"""
+    """
+    Manages trading positions with risk controls.
+    Hot-path methods (*_units) work on fixed-point ints, see fixed_point.py.
+    """
 
-    def __init__(self, config: BotConfiguration):
+    # Trade amounts: money * ratio * ratio -> 1E-10 units
+    AMOUNT_EXP = MONEY_EXP + 2 * RATIO_EXP
+    MIN_TRADE_AMOUNT = Decimal('10.00')
+    FEE_PER_MILLE = 2  # 0.2% fee on trade value
+
+    # (balance upper bound in money units, size percent in ratio units)
+    SIZE_TIERS = (
+        (100 * MONEY_SCALE, 300),
+        (500 * MONEY_SCALE, 500),
+        (2000 * MONEY_SCALE, 800),
+        (10000 * MONEY_SCALE, 1200),
+    )
+    MAX_SIZE_PERCENT = 1500
+
+    # Sweep model being replaced by close deadlines: one run per minute,
+    # 70% chance per run to close a position past min_open_duration
+    CLOSE_SWEEP_INTERVAL = 60
+    CLOSE_SWEEP_CHANCE = 0.7
+
+    def __init__(self, config: BotConfiguration, rng: Optional[random.Random] = None):
         self.config = config
+        self.rng = rng or random
+        self._risk_units = to_units(config.risk_per_trade, RATIO_EXP)
+        self._win_rate = float(config.win_rate)
+        self._high_yield_chance = float(config.high_yield_chance)
+        self._high_loss_chance = float(config.high_loss_chance)
+        self._high_profit_range = tuple(float(v) for v in config.high_profit_range)
+        self._profit_range = tuple(float(v) for v in config.profit_range)
+        self._high_loss_range = tuple(float(v) for v in config.high_loss_range)
+        self._loss_range = tuple(float(v) for v in config.loss_range)
+        self._close_rate = -math.log(1 - self.CLOSE_SWEEP_CHANCE) / self.CLOSE_SWEEP_INTERVAL
 
     def calculate_position_size(
         self,
@@ -194,85 +324,343 @@ class PositionManager:
         open_positions_count: int
     ) -> Tuple[Decimal, Decimal]:
         """Calculate optimal position size"""
-        min_trade_amount = Decimal('10.00')
-        risk_amount = balance * self.config.risk_per_trade
-
-        position_factor = Decimal('1') - (Decimal(str(open_positions_count)) * Decimal('0.1'))
-        position_factor = max(position_factor, Decimal('0.5'))
-
-        if balance < Decimal('100'):
-            size_percent = Decimal('0.03')
-        elif balance < Decimal('500'):
-            size_percent = Decimal('0.05')
-        elif balance < Decimal('2000'):
-            size_percent = Decimal('0.08')
-        elif balance < Decimal('10000'):
-            size_percent = Decimal('0.12')
-        else:
-            size_percent = Decimal('0.15')
+        trade_units, quantity_units = self.position_size_units(
+            to_units(balance, MONEY_EXP),
+            to_units(entry_price, PRICE_EXP),
+            open_positions_count
+        )
+        if quantity_units <= 0:
+            return Decimal('0'), Decimal('0')
 
-        trade_amount = min(risk_amount, balance * size_percent) * position_factor
+        return from_units(trade_units, self.AMOUNT_EXP), from_units(quantity_units, PRICE_EXP)
+
+    def position_size_units(
+        self,
+        balance_units: MoneyUnits,
+        entry_units: PriceUnits,
+        open_positions_count: int
+    ) -> Tuple[int, PriceUnits]:
+        """
+        calculate_position_size() on fixed-point ints.
+        Returns (trade amount in 1E-10 units, quantity in 1E-8 units).
+        """
+        min_trade_amount = to_units(self.MIN_TRADE_AMOUNT, self.AMOUNT_EXP)
+
+        # 1 - 0.1 per open position, never below 0.5
+        position_factor = max(RATIO_SCALE - open_positions_count * RATIO_SCALE // 10, RATIO_SCALE // 2)
+
+        size_percent = self.MAX_SIZE_PERCENT
+        for upper_bound, tier_percent in self.SIZE_TIERS:
+            if balance_units < upper_bound:
+                size_percent = tier_percent
+                break
+
+        trade_amount = balance_units * min(self._risk_units, size_percent) * position_factor
         trade_amount = max(trade_amount, min_trade_amount)
 
-        if trade_amount > balance * Decimal('0.95'):
-            trade_amount = balance * Decimal('0.95')
+        max_trade_amount = balance_units * (RATIO_SCALE * 95 // 100) * RATIO_SCALE
+        if trade_amount > max_trade_amount:
+            trade_amount = max_trade_amount
 
-        if trade_amount < min_trade_amount:
-            logger.warning(f"Insufficient balance ({balance}) for min trade amount ({min_trade_amount}). Skipping trade.")
-            return Decimal('0'), Decimal('0')
+        if trade_amount < min_trade_amount or entry_units <= 0:
+            logger.warning(
+                f"Insufficient balance ({from_units(balance_units, MONEY_EXP)}) for min trade amount "
+                f"({self.MIN_TRADE_AMOUNT}). Skipping trade."
+            )
+            return 0, 0
 
-        quantity = (trade_amount / entry_price).quantize(Decimal('1E-8'), rounding=ROUND_DOWN)
+        quantity = div_down(trade_amount * PRICE_SCALE, entry_units * 10 ** (self.AMOUNT_EXP - PRICE_EXP))
 
         return trade_amount, quantity
 
+    def select_positions_to_close(self, open_positions: List[BotTrade], current_time) -> List[BotTrade]:
+        """
+        Pick positions to close based on how long they've been open:
+        - If open longer than max_duration: ALWAYS close (100%)
+        - If open between min and max duration: 70% chance to close
+        """
+        min_time_ago = current_time - self.config.min_open_duration
+        max_time_ago = current_time - self.config.max_open_duration
+
+        positions_to_close = []
+        for pos in open_positions:
+            if pos.opened_at > min_time_ago:
+                continue
+            if pos.opened_at <= max_time_ago:
+                # Been open too long - always close
+                positions_to_close.append(pos)
+            elif self.rng.random() < self.CLOSE_SWEEP_CHANCE:
+                # 70% chance to close positions that are ready
+                positions_to_close.append(pos)
+
+        return positions_to_close
+
+    def choose_close_deadline(self, opened_at):
+        """
+        Pick the close time of a position when it is opened.
+        min_open_duration plus an exponential delay with the same per-minute
+        close probability as select_positions_to_close(), capped at max_open_duration.
+        """
+        min_seconds = self.config.min_open_duration.total_seconds()
+        max_seconds = self.config.max_open_duration.total_seconds()
+        delay = min(min_seconds + self.rng.expovariate(self._close_rate), max_seconds)
+        return opened_at + timedelta(seconds=int(delay))
+
+    def settle_position(self, position: BotTrade, market: MarketSimulator, current_time) -> MoneyUnits:
+        """
+        Close position in memory: pick a profit target, derive exit price and
+        P/L on fixed-point ints and set the model fields (ORM boundary).
+        Returns realized P/L in 0.01 units.
+        """
+        entry_units = to_units(position.entry_price, PRICE_EXP)
+        duration_seconds = int((current_time - position.opened_at).total_seconds())
+
+        exit_units = market.realistic_exit_units(
+            entry_units,
+            self.generate_profit_target_units(),
+            position.side,
+            duration_seconds
+        )
+        return self._apply_exit(position, entry_units, exit_units, current_time)
+
+    def settle_stale_position(self, position: BotTrade, market: MarketSimulator, current_time) -> MoneyUnits:
+        """
+        Force-close a position that outlived its bot's schedule: exit at the
+        shared tick price, or at a random -2%..+3% target when the symbol has
+        no tick. Returns realized P/L in 0.01 units.
+        """
+        entry_units = to_units(position.entry_price, PRICE_EXP)
+        exit_units = market.tick_units.get(position.symbol)
+
+        if exit_units is None:
+            duration_seconds = int((current_time - position.opened_at).total_seconds())
+            exit_units = market.realistic_exit_units(
+                entry_units,
+                float_to_units(self.rng.uniform(-2.0, 3.0), FACTOR_EXP),
+                position.side,
+                duration_seconds,
+                target_exp=FACTOR_EXP
+            )
+
+        return self._apply_exit(position, entry_units, exit_units, current_time)
+
+    def _apply_exit(
+        self,
+        position: BotTrade,
+        entry_units: PriceUnits,
+        exit_units: PriceUnits,
+        current_time
+    ) -> MoneyUnits:
+        """Compute P/L for exit price and set the model exit fields (ORM boundary)"""
+        if exit_units <= 0:
+            exit_units = div_down(entry_units * 99, 100)
+
+        profit_loss, profit_loss_percent = self.profit_loss_units(
+            entry_units,
+            exit_units,
+            to_units(position.quantity, PRICE_EXP),
+            position.side
+        )
+
+        position.exit_price = from_units(exit_units, PRICE_EXP)
+        position.profit_loss = from_units(profit_loss, MONEY_EXP)
+        position.profit_loss_percent = from_units(profit_loss_percent, PERCENT_EXP)
+        position.is_open = False
+        position.closed_at = current_time
+
+        return profit_loss
+
+    @staticmethod
+    def calculate_profit_loss(
+        entry_price: Decimal,
+        exit_price: Decimal,
+        quantity: Decimal,
+        side: str
+    ) -> Tuple[Decimal, Decimal]:
+        """Calculate profit/loss with fees"""
+        profit_loss, profit_loss_percent = PositionManager.profit_loss_units(
+            to_units(entry_price, PRICE_EXP),
+            to_units(exit_price, PRICE_EXP),
+            to_units(quantity, PRICE_EXP),
+            side
+        )
+        return from_units(profit_loss, MONEY_EXP), from_units(profit_loss_percent, PERCENT_EXP)
+
+    @staticmethod
+    def profit_loss_units(
+        entry_units: PriceUnits,
+        exit_units: PriceUnits,
+        quantity_units: PriceUnits,
+        side: str
+    ) -> Tuple[MoneyUnits, PercentUnits]:
+        """
+        calculate_profit_loss() on fixed-point ints.
+        Returns (P/L in 0.01 units, P/L percent in 0.01 units).
+        """
+        if side == 'buy':
+            price_move = exit_units - entry_units
+        else:
+            price_move = entry_units - exit_units
+
+        # (move * qty - entry * qty * fee) at 1E-16, truncated to 0.01
+        profit_loss = div_down(
+            (price_move * 1000 - entry_units * PositionManager.FEE_PER_MILLE) * quantity_units,
+            1000 * 10 ** (2 * PRICE_EXP - MONEY_EXP)
+        )
+
+        if entry_units > 0:
+            # (move / entry * 100 - fee * 100) in 0.01 units
+            profit_loss_percent = div_down(
+                price_move * 100 * PERCENT_SCALE - entry_units * PositionManager.FEE_PER_MILLE * PERCENT_SCALE // 10,
+                entry_units
+            )
+        else:
+            profit_loss_percent = 0
+
+        return profit_loss, profit_loss_percent
+
+    def generate_profit_target(self) -> Decimal:
+        """Generate profit/loss target"""
+        return from_units(self.generate_profit_target_units(), PERCENT_EXP)
+
+    def generate_profit_target_units(self) -> PercentUnits:
+        """generate_profit_target() in 0.01 percent units"""
+        is_winning_trade = self.rng.uniform(0, 100) < self._win_rate
+
+        if is_winning_trade:
+            if self.rng.uniform(0, 100) < self._high_yield_chance:
+                profit_percent = self.rng.uniform(*self._high_profit_range)
+            else:
+                profit_percent = self.rng.triangular(
+                    self._profit_range[0],
+                    self._profit_range[1],
+                    self._profit_range[0] * 1.3
+                )
+        else:
+            if self.rng.uniform(0, 100) < self._high_loss_chance:
+                profit_percent = self.rng.uniform(*self._high_loss_range)
+            else:
+                profit_percent = self.rng.triangular(
+                    self._loss_range[0],
+                    self._loss_range[1],
+                    self._loss_range[1] * 0.7
+                )
+
+        return float_to_units(profit_percent, PERCENT_EXP)
+
+
+def serialize_bot_trade(trade: BotTrade) -> Dict:
+    """Serialize trade for WebSocket bot_trade(s)_update payloads"""
+    return {
+        'id': str(trade.id),
+        'symbol': trade.symbol,
+        'side': trade.side,
+        'entry_price': str(trade.entry_price),
+        'exit_price': str(trade.exit_price) if trade.exit_price else None,
+        'quantity': str(trade.quantity),
+        'profit_loss': str(trade.profit_loss),
+        'profit_loss_percent': str(trade.profit_loss_percent),
+        'is_open': trade.is_open,
+        'opened_at': trade.opened_at.isoformat() if trade.opened_at else None,
+        'closed_at': trade.closed_at.isoformat() if trade.closed_at else None,
+    }
+
+
+def user_rng(seed: Optional[int], user_id):
+    """
+    Random generator for one user's simulation. With a seed, a dedicated
+    random.Random derived from (seed, user id), so each user's trade stream
+    is reproducible regardless of processing order; otherwise the shared
+    global random module.
+    """
+    if seed is None:
+        return random
+    return random.Random(f'{seed}:{user_id}')
+
+
+# Max group_send calls in flight at once when flushing bot_trades_update events
+TRADE_UPDATE_SEND_CONCURRENCY = 100
+
+
+def send_bot_trades_updates(channel_layer, updates: Dict) -> int:
+    """
+    Send one coalesced bot_trades_update event per user.
+
+    updates: {user_id: (trades, new balance)}. All group_send calls of a
+    run are issued concurrently from one event loop (a single sync->async
+    hop), so the channel layer's Redis commands are pipelined across users
+    instead of paying one blocking round-trip per trade.
+    Returns number of users notified.
+    """
+    if not channel_layer or not updates:
+        return 0
+
+    events = [
+        (
+            f'user_{user_id}',
+            {
+                'type': 'bot_trades_update',
+                'balance': str(balance),
+                'trades': [serialize_bot_trade(trade) for trade in trades]
+            }
+        )
+        for user_id, (trades, balance) in updates.items() if trades
+    ]
+
+    write_balance_snapshots({user_id: balance for user_id, (trades, balance) in updates.items() if trades})
+
+    async def send_all():
+        failures = 0
+        for start in range(0, len(events), TRADE_UPDATE_SEND_CONCURRENCY):
+            results = await asyncio.gather(
+                *[
+                    channel_layer.group_send(group_name, event)
+                    for group_name, event in events[start:start + TRADE_UPDATE_SEND_CONCURRENCY]
+                ],
+                return_exceptions=True
+            )
+            failures += sum(1 for result in results if isinstance(result, Exception))
+        return failures
+
+    try:
+        failures = async_to_sync(send_all)()
+    except Exception as e:
+        logger.error(f"Error sending WebSocket messages: {e}")
+        return 0
+
+    if failures:
+        logger.error(f"Failed to send {failures}/{len(events)} bot_trades_update events")
+    return len(events) - failures
+
 
 class TradingBotSimulator:
     """
     Trading bot simulator - generates realistic trades
     """
 
-    def __init__(self, user, bot_type: str):
+    def __init__(self, user, bot_type: str, seed: Optional[int] = None):
         self.user = user
         self.bot_type = bot_type
         self.session: Optional[TradingSession] = None
 
+        # Seeded runs replay the same trade stream for this user
+        self.rng = user_rng(seed, user.id)
+
         self.config = BotConfigurationFactory.get_config(bot_type)
         self.base_prices = self._fetch_market_prices()
         self.trading_pairs = list(self.base_prices.keys())
-        self.market = MarketSimulator(self.base_prices)
-        self.position_manager = PositionManager(self.config)
+        self.market = MarketSimulator(self.base_prices, rng=self.rng)
+        self.position_manager = PositionManager(self.config, rng=self.rng)
+        self.position_index = OpenPositionIndex()
+        self.close_scheduler = PositionCloseScheduler()
         self.channel_layer = get_channel_layer()
+        self.opened_trades: List[BotTrade] = []
 
         logger.info(f"Initialized {bot_type} bot simulator for user {user.email}")
 
     def _fetch_market_prices(self) -> Dict[str, Decimal]:
         """Fetch market prices with caching"""
-        cache_key = 'market_prices_v1'
-        prices = cache.get(cache_key)
-
-        if prices:
-            logger.debug("Using cached market prices")
-            return prices
-
-        prices = CryptoDataFetcher.get_base_prices_sync(limit=30)
-
-        if not prices:
-            logger.warning("API price fetching failed, using fallback prices")
-            prices = {
-                'BTC/USDT': Decimal('67000.00'),
-                'ETH/USDT': Decimal('3500.00'),
-                'BNB/USDT': Decimal('580.00'),
-                'SOL/USDT': Decimal('145.00'),
-                'XRP/USDT': Decimal('0.52'),
-                'ADA/USDT': Decimal('0.38'),
-                'DOGE/USDT': Decimal('0.085'),
-                'DOT/USDT': Decimal('6.20'),
-                'MATIC/USDT': Decimal('0.72'),
-                'AVAX/USDT': Decimal('28.50'),
-            }
-
-        cache.set(cache_key, prices, 300)
-        return prices
+        return MarketSimulator.load_base_prices()
 
     def start_session(self) -> Optional[TradingSession]:
         """Start or resume trading session with optimized cleanup"""
@@ -347,98 +735,25 @@ class TradingBotSimulator:
         side: str
     ) -> Tuple[Decimal, Decimal]:
         """Calculate profit/loss with fees"""
-        fee_percent = Decimal('0.002')
+        return self.position_manager.calculate_profit_loss(entry_price, exit_price, quantity, side)
 
-        if side == 'buy':
-            raw_pl = (exit_price - entry_price) * quantity
-        else:
-            raw_pl = (entry_price - exit_price) * quantity
-
-        trade_value = entry_price * quantity
-        fees = trade_value * fee_percent
-        profit_loss = raw_pl - fees
-        profit_loss = profit_loss.quantize(Decimal('0.01'), rounding=ROUND_DOWN)
-
-        if entry_price > 0:
-            if side == 'buy':
-                profit_loss_percent = ((exit_price - entry_price) / entry_price) * Decimal('100')
-            else:
-                profit_loss_percent = ((entry_price - exit_price) / entry_price) * Decimal('100')
-            profit_loss_percent -= (fee_percent * Decimal('100'))
-        else:
-            profit_loss_percent = Decimal('0.00')
-
-        profit_loss_percent = profit_loss_percent.quantize(Decimal('0.01'), rounding=ROUND_DOWN)
-
-        return profit_loss, profit_loss_percent
-
-    def _send_bot_trade_update(self, trade: BotTrade, new_balance: Decimal):
-        """Send WebSocket notification about trade (open or closed)"""
-        if not self.channel_layer:
+    def _send_bot_trades_update(self, trades: List[BotTrade], new_balance: Decimal):
+        """Send one WebSocket notification for all trades opened or closed in this run"""
+        if not trades:
             return
 
-        group_name = f'user_{self.user.id}'
-
-        try:
-            async_to_sync(self.channel_layer.group_send)(
-                group_name,
-                {
-                    'type': 'bot_trade_update',
-                    'balance': str(new_balance),
-                    'trade': {
-                        'id': str(trade.id),
-                        'symbol': trade.symbol,
-                        'side': trade.side,
-                        'entry_price': str(trade.entry_price),
-                        'exit_price': str(trade.exit_price) if trade.exit_price else None,
-                        'quantity': str(trade.quantity),
-                        'profit_loss': str(trade.profit_loss),
-                        'profit_loss_percent': str(trade.profit_loss_percent),
-                        'is_open': trade.is_open,
-                        'opened_at': trade.opened_at.isoformat() if trade.opened_at else None,
-                        'closed_at': trade.closed_at.isoformat() if trade.closed_at else None,
-                    }
-                }
-            )
-            status = "OPENED" if trade.is_open else "CLOSED"
-            logger.info(f"Sent bot_trade_update ({status}) to user {self.user.email}: {trade.symbol}")
-        except Exception as e:
-            logger.error(f"Error sending WebSocket message: {e}")
+        if send_bot_trades_updates(self.channel_layer, {self.user.id: (trades, new_balance)}):
+            logger.info(f"Sent bot_trades_update ({len(trades)} trades) to user {self.user.email}")
 
     def _generate_profit_target(self) -> Decimal:
         """Generate profit/loss target"""
-        is_winning_trade = random.uniform(0, 100) < float(self.config.win_rate)
+        return self.position_manager.generate_profit_target()
 
-        if is_winning_trade:
-            if random.uniform(0, 100) < float(self.config.high_yield_chance):
-                profit_percent = Decimal(str(random.uniform(
-                    float(self.config.high_profit_range[0]),
-                    float(self.config.high_profit_range[1])
-                )))
-            else:
-                profit_percent = Decimal(str(random.triangular(
-                    float(self.config.profit_range[0]),
-                    float(self.config.profit_range[1]),
-                    float(self.config.profit_range[0]) * 1.3
-                )))
-        else:
-            if random.uniform(0, 100) < float(self.config.high_loss_chance):
-                profit_percent = Decimal(str(random.uniform(
-                    float(self.config.high_loss_range[0]),
-                    float(self.config.high_loss_range[1])
-                )))
-            else:
-                profit_percent = Decimal(str(random.triangular(
-                    float(self.config.loss_range[0]),
-                    float(self.config.loss_range[1]),
-                    float(self.config.loss_range[1]) * 0.7
-                )))
-
-        return profit_percent.quantize(Decimal('0.01'), rounding=ROUND_DOWN)
-
-    def generate_trade(self) -> bool:
+    def generate_trade(self, notify: bool = True) -> bool:
         """
         Generate a single OPEN position (optimized for live trading display)
+        With notify=False the trade is queued in opened_trades for the caller
+        to send in one coalesced update.
         Returns True if position was opened
         """
         if not self.session or not self.session.is_active:
@@ -446,11 +761,16 @@ class TradingBotSimulator:
             if not self.session:
                 return False
 
-        # Check position limits
-        open_positions_count = BotTrade.objects.filter(
-            user=self.user,
-            is_open=True
-        ).count()
+        # Check position limits (Redis index, DB count if the index isn't ready)
+        open_positions_count = self.position_index.count(self.user.id)
+        if open_positions_count is not None and open_positions_count >= self.config.max_open_positions:
+            # Confirm against the DB before refusing: stale entries would block for good
+            open_positions_count = self.position_index.reconcile([self.user.id])[self.user.id]
+        elif open_positions_count is None:
+            open_positions_count = BotTrade.objects.filter(
+                user=self.user,
+                is_open=True
+            ).count()
 
         logger.info(f"Open positions: {open_positions_count}/{self.config.max_open_positions} for {self.user.email}")
 
@@ -462,23 +782,25 @@ class TradingBotSimulator:
             return False
 
         # Select trading pair with weighted random
-        weights = [3 if 'BTC' in pair or 'ETH' in pair else 1 for pair in self.trading_pairs]
-        symbol = random.choices(self.trading_pairs, weights=weights, k=1)[0]
+        symbol = self.market.choose_trading_pair()
 
-        entry_price = self.market.get_current_price(symbol)
-        if entry_price <= 0:
+        entry_units = self.market.get_current_price_units(symbol)
+        if entry_units <= 0:
             return False
 
-        side = random.choices(['buy', 'sell'], weights=[0.55, 0.45], k=1)[0]
+        side = self.rng.choices(['buy', 'sell'], weights=[0.55, 0.45], k=1)[0]
 
-        balance = Decimal(str(self.session.current_balance))
-        trade_amount, quantity = self.position_manager.calculate_position_size(
-            balance, entry_price, open_positions_count
+        balance_units = to_units(self.session.current_balance, MONEY_EXP)
+        _, quantity_units = self.position_manager.position_size_units(
+            balance_units, entry_units, open_positions_count
         )
 
-        if quantity <= 0:
+        if quantity_units <= 0:
             return False
 
+        entry_price = from_units(entry_units, PRICE_EXP)
+        quantity = from_units(quantity_units, PRICE_EXP)
+
         # Create timestamps - position opens NOW
         current_time = timezone.now()
 
@@ -496,6 +818,10 @@ class TradingBotSimulator:
             opened_at=current_time,
             closed_at=None
         )
+        db_transaction.on_commit(lambda: self.position_index.add([trade]))
+        if self.close_scheduler.is_enabled():
+            deadline = self.position_manager.choose_close_deadline(trade.opened_at)
+            db_transaction.on_commit(lambda: self.close_scheduler.schedule({trade.id: deadline}))
 
         # Update session (increment trade count)
         from django.db.models import F
@@ -507,7 +833,10 @@ class TradingBotSimulator:
         self.session.refresh_from_db()
 
         # Send WebSocket notification for new OPEN position
-        self._send_bot_trade_update(trade, self.user.balance)
+        if notify:
+            self._send_bot_trades_update([trade], self.user.balance)
+        else:
+            self.opened_trades.append(trade)
 
         logger.info(f"Opened position: {symbol} {side.upper()} @ {entry_price} for {self.user.email}")
 
@@ -519,17 +848,21 @@ class TradingBotSimulator:
         Returns number of trades generated
         """
         if count is None:
-            count = random.randint(*self.config.trades_per_run_range)
+            count = self.rng.randint(*self.config.trades_per_run_range)
 
         trades_generated = 0
+        self.opened_trades = []
         for _ in range(count):
             try:
-                if self.generate_trade():
+                if self.generate_trade(notify=False):
                     trades_generated += 1
             except Exception as e:
                 logger.error(f"Error generating trade for {self.user.email}: {e}")
                 continue
 
+        self._send_bot_trades_update(self.opened_trades, self.user.balance)
+        self.opened_trades = []
+
         logger.info(f"Generated {trades_generated} trades for {self.user.email}")
         return trades_generated
 
@@ -539,39 +872,42 @@ class TradingBotSimulator:
         Only closes positions open for at least min_open_duration
         Returns number of positions closed
         """
+        if self.close_scheduler.is_enabled():
+            # Closed at their deadlines by the trading.close_due_positions worker
+            return 0
+
         current_time = timezone.now()
 
         # Only close positions that have been open for minimum duration
         min_time_ago = current_time - self.config.min_open_duration
-        max_time_ago = current_time - self.config.max_open_duration
-
-        # First, check ALL open positions
-        all_open = BotTrade.objects.filter(user=self.user, is_open=True)
-        logger.info(f"Total open positions for {self.user.email}: {all_open.count()}")
 
         # Fetch positions ready to close (open for min duration or longer)
-        open_positions = list(BotTrade.objects.filter(
-            user=self.user,
-            is_open=True,
-            opened_at__lte=min_time_ago  # Only positions open long enough
-        ))
+        due_ids = self.position_index.due_ids(self.user.id, min_time_ago)
+        if due_ids is None:
+            open_positions = list(BotTrade.objects.filter(
+                user=self.user,
+                is_open=True,
+                opened_at__lte=min_time_ago  # Only positions open long enough
+            ).order_by('opened_at'))
+        elif due_ids:
+            open_positions = list(BotTrade.objects.filter(
+                user=self.user,
+                id__in=due_ids,
+                is_open=True
+            ).order_by('opened_at'))
+            # Drop index entries whose trades were closed or deleted elsewhere
+            stale_ids = set(due_ids) - {str(position.id) for position in open_positions}
+            if stale_ids:
+                self.position_index.remove_ids(self.user.id, stale_ids)
+        else:
+            open_positions = []
 
         logger.info(f"Positions ready to close (open >= {self.config.min_open_duration}): {len(open_positions)}")
 
         if not open_positions:
             return 0
 
-        # Close positions based on how long they've been open:
-        # - If open longer than max_duration: ALWAYS close (100%)
-        # - If open between min and max duration: 70% chance to close
-        positions_to_close = []
-        for pos in open_positions:
-            if pos.opened_at <= max_time_ago:
-                # Been open too long - always close
-                positions_to_close.append(pos)
-            elif random.random() < 0.7:
-                # 70% chance to close positions that are ready
-                positions_to_close.append(pos)
+        positions_to_close = self.position_manager.select_positions_to_close(open_positions, current_time)
 
         if not positions_to_close:
             logger.debug(f"No positions ready to close for {self.user.email}")
@@ -580,7 +916,7 @@ class TradingBotSimulator:
         logger.info(f"Closing {len(positions_to_close)} out of {len(open_positions)} open positions for {self.user.email}")
 
         closed_count = 0
-        total_profit_loss = Decimal('0')
+        total_profit_loss_units = 0
         winning_count = 0
         positions_to_update = []
         transactions_to_create = []
@@ -588,47 +924,22 @@ class TradingBotSimulator:
         # Process positions ready to close
         for position in positions_to_close:
             try:
-                # Generate exit conditions
-                profit_target = self._generate_profit_target()
-                duration_seconds = int((current_time - position.opened_at).total_seconds())
-
-                exit_price = self.market.calculate_realistic_exit(
-                    position.entry_price,
-                    profit_target,
-                    position.side,
-                    duration_seconds
-                )
-
-                if exit_price <= 0:
-                    exit_price = position.entry_price * Decimal('0.99')
-
-                profit_loss, profit_loss_percent = self._calculate_profit_loss(
-                    position.entry_price,
-                    exit_price,
-                    position.quantity,
-                    position.side
-                )
-
-                # Prepare position for bulk update
-                position.exit_price = exit_price
-                position.profit_loss = profit_loss
-                position.profit_loss_percent = profit_loss_percent
-                position.is_open = False
-                position.closed_at = current_time
+                # Generate exit conditions and P/L (sets exit fields on position)
+                profit_loss_units = self.position_manager.settle_position(position, self.market, current_time)
                 positions_to_update.append(position)
 
                 # Prepare transaction for bulk create
                 transactions_to_create.append(Transaction(
                     user=self.user,
-                    transaction_type='bot_profit' if profit_loss > 0 else 'bot_loss',
-                    amount=abs(profit_loss),
+                    transaction_type='bot_profit' if profit_loss_units > 0 else 'bot_loss',
+                    amount=from_units(abs(profit_loss_units), MONEY_EXP),
                     status='completed',
                     processed_at=current_time
                 ))
 
                 # Track totals
-                total_profit_loss += profit_loss
-                if profit_loss > 0:
+                total_profit_loss_units += profit_loss_units
+                if profit_loss_units > 0:
                     winning_count += 1
                 closed_count += 1
 
@@ -636,6 +947,8 @@ class TradingBotSimulator:
                 logger.error(f"Error processing position {position.id}: {e}")
                 continue
 
+        total_profit_loss = from_units(total_profit_loss_units, MONEY_EXP)
+
         # Optimized: Use single atomic transaction for all updates
         if positions_to_update:
             with db_transaction.atomic():
@@ -665,14 +978,568 @@ class TradingBotSimulator:
                     balance=F('balance') + total_profit_loss
                 )
 
+                db_transaction.on_commit(lambda: self.position_index.remove(positions_to_update))
+
             # Refresh to get updated values
             if self.session:
                 self.session.refresh_from_db()
             self.user.refresh_from_db()
 
-            # Send WebSocket notifications for closed positions
-            for position in positions_to_update:
-                self._send_bot_trade_update(position, self.user.balance)
+            # One WebSocket notification for all closed positions
+            self._send_bot_trades_update(positions_to_update, self.user.balance)
 
         logger.info(f"Closed {closed_count} positions for {self.user.email} (total P/L: {total_profit_loss})")
         return closed_count
+
+
+class BulkSimulationOrchestrator:
+    """
+    Batched multi-user simulation engine.
+
+    Loads eligible users in chunks of ``batch_size``, opens and closes their
+    positions in memory against one shared market snapshot and persists each
+    chunk with a fixed number of bulk queries (instead of several round-trips
+    per trade in TradingBotSimulator).
+    """
+
+    SIDES = ['buy', 'sell']
+    SIDE_WEIGHTS = [0.55, 0.45]
+
+    def __init__(self, batch_size: int = 200, trades_per_user: Optional[int] = None, seed: Optional[int] = None):
+        self.batch_size = max(int(batch_size), 1)
+        self.trades_per_user = trades_per_user
+        self.seed = seed
+        self.rng = random
+        self.market = MarketSimulator(MarketSimulator.load_base_prices())
+        self.position_managers = {
+            bot_type: PositionManager(config)
+            for bot_type, config in BotConfigurationFactory.CONFIGURATIONS.items()
+        }
+        self.position_index = OpenPositionIndex()
+        self.close_scheduler = PositionCloseScheduler()
+        self.channel_layer = get_channel_layer()
+
+    def simulate_users(self, users) -> List[Dict]:
+        """
+        Simulate all users from queryset, chunk by chunk (keyset pagination on pk)
+        Returns one result dict per processed user
+        """
+        queryset = users.filter(
+            bot_type__in=list(self.position_managers.keys())
+        ).order_by('pk')
+
+        results = []
+        last_pk = None
+        while True:
+            chunk_qs = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            chunk = list(chunk_qs[:self.batch_size])
+            if not chunk:
+                break
+
+            try:
+                results.extend(self._simulate_chunk(chunk))
+            except Exception as e:
+                logger.exception(f"Error simulating chunk of {len(chunk)} users: {e}")
+
+            last_pk = chunk[-1].pk
+            if len(chunk) < self.batch_size:
+                break
+
+        logger.info(f"Bulk simulation processed {len(results)} users")
+        return results
+
+    def simulate_user_ids(self, user_ids: List) -> List[Dict]:
+        """
+        Simulate an explicit list of user IDs, chunk by chunk
+        Returns one result dict per processed user
+        """
+        from apps.accounts.models import User
+
+        results = []
+        for start in range(0, len(user_ids), self.batch_size):
+            chunk = list(User.objects.filter(
+                id__in=user_ids[start:start + self.batch_size],
+                bot_type__in=list(self.position_managers.keys()),
+                # IDs may have been split a while ago; skip users disabled since
+                is_active=True,
+                is_bot_enabled=True
+            ).order_by('pk'))
+            if not chunk:
+                continue
+
+            try:
+                results.extend(self._simulate_chunk(chunk))
+            except Exception as e:
+                logger.exception(f"Error simulating chunk of {len(chunk)} users: {e}")
+
+        logger.info(f"Bulk simulation processed {len(results)} users")
+        return results
+
+    def _simulate_chunk(self, users: List) -> List[Dict]:
+        """Run one tick for a chunk of users and persist it atomically"""
+        current_time = timezone.now()
+        user_ids = [user.id for user in users]
+
+        sessions = self._load_sessions(users)
+
+        # With the close scheduler on, closing is the close worker's job and
+        # only the open position counts are needed here
+        scheduled_closes = self.close_scheduler.is_enabled()
+        open_positions = defaultdict(list)
+        open_counts = None
+        if scheduled_closes:
+            open_counts = self._load_open_counts(users)
+        else:
+            open_qs = BotTrade.objects.filter(user_id__in=user_ids, is_open=True).order_by('opened_at')
+            for position in open_qs:
+                open_positions[position.user_id].append(position)
+
+        positions_to_update = []
+        trades_to_create = []
+        transactions_to_create = []
+        close_deadlines = {}
+        session_deltas = {}
+        balance_deltas = {}
+        results = []
+
+        for user in users:
+            position_manager = self._use_user_rng(user.id, self.position_managers[user.bot_type])
+            session = sessions[user.id]
+            user_positions = open_positions.get(user.id, [])
+
+            closed, total_profit_loss_units, winning_count = self._close_positions(
+                user, position_manager, user_positions, current_time, transactions_to_create
+            )
+            positions_to_update.extend(closed)
+
+            if open_counts is not None:
+                open_count = open_counts.get(user.id, 0)
+            else:
+                open_count = len(user_positions) - len(closed)
+
+            opened = self._open_positions(
+                user,
+                position_manager,
+                to_units(session.current_balance, MONEY_EXP) + total_profit_loss_units,
+                open_count,
+                current_time
+            )
+            trades_to_create.extend(opened)
+            if scheduled_closes:
+                for trade in opened:
+                    close_deadlines[trade.id] = position_manager.choose_close_deadline(trade.opened_at)
+
+            total_profit_loss = from_units(total_profit_loss_units, MONEY_EXP)
+
+            if closed or opened:
+                session_deltas[session.id] = (total_profit_loss, winning_count, len(opened))
+            if total_profit_loss:
+                balance_deltas[user.id] = total_profit_loss
+
+            results.append({
+                'user_id': str(user.id),
+                'email': user.email,
+                'bot_type': user.bot_type,
+                'positions_closed': len(closed),
+                'trades_generated': len(opened),
+                'profit_loss': total_profit_loss,
+                'balance': user.balance + total_profit_loss,
+                'changed_trades': closed + opened,
+            })
+
+        with db_transaction.atomic():
+            if positions_to_update:
+                BotTrade.objects.bulk_update(
+                    positions_to_update,
+                    ['exit_price', 'profit_loss', 'profit_loss_percent', 'is_open', 'closed_at'],
+                    batch_size=self.batch_size
+                )
+            if trades_to_create:
+                BotTrade.objects.bulk_create(trades_to_create, batch_size=self.batch_size)
+            if transactions_to_create:
+                Transaction.objects.bulk_create(transactions_to_create, batch_size=self.batch_size)
+            self._apply_session_deltas(session_deltas)
+            self._apply_balance_deltas(balance_deltas)
+
+            db_transaction.on_commit(lambda: self.position_index.remove(positions_to_update))
+            db_transaction.on_commit(lambda: self.position_index.add(trades_to_create))
+            if close_deadlines:
+                db_transaction.on_commit(lambda: self.close_scheduler.schedule(close_deadlines))
+
+        send_bot_trades_updates(self.channel_layer, {
+            result['user_id']: (result.pop('changed_trades'), result['balance'])
+            for result in results
+        })
+        for result in results:
+            result['balance'] = str(result['balance'])
+            result['profit_loss'] = str(result['profit_loss'])
+
+        logger.info(
+            f"Bulk chunk done: {len(users)} users, {len(positions_to_update)} closed, "
+            f"{len(trades_to_create)} opened"
+        )
+        return results
+
+    def _load_sessions(self, users: List) -> Dict:
+        """Load active sessions for chunk, bulk-creating the missing ones"""
+        sessions = {
+            session.user_id: session
+            for session in TradingSession.objects.filter(
+                user_id__in=[user.id for user in users],
+                is_active=True
+            )
+        }
+
+        missing = [
+            TradingSession(
+                user=user,
+                bot_type=user.bot_type,
+                starting_balance=user.balance,
+                current_balance=user.balance,
+                is_active=True
+            )
+            for user in users if user.id not in sessions
+        ]
+        if missing:
+            TradingSession.objects.bulk_create(missing, batch_size=self.batch_size)
+            sessions.update({session.user_id: session for session in missing})
+
+        return sessions
+
+    def _use_user_rng(self, user_id, position_manager: PositionManager) -> PositionManager:
+        """Point the shared market, the tier's position manager and self at user's generator"""
+        if self.seed is not None:
+            self.rng = user_rng(self.seed, user_id)
+            self.market.rng = self.rng
+            position_manager.rng = self.rng
+        return position_manager
+
+    def _load_open_counts(self, users: List) -> Dict:
+        """
+        Open position count per user: Redis index, one grouped query as fallback.
+        Users the index shows at their limit are reconciled against the DB, so
+        stale entries can't block them (nothing else prunes them in scheduled mode).
+        """
+        user_ids = [user.id for user in users]
+        counts = self.position_index.counts(user_ids)
+        if counts is not None:
+            at_limit = [
+                user.id for user in users
+                if counts[user.id] >= self.position_managers[user.bot_type].config.max_open_positions
+            ]
+            if at_limit:
+                counts.update(self.position_index.reconcile(at_limit))
+            return counts
+
+        from django.db.models import Count
+
+        return dict(
+            BotTrade.objects.filter(user_id__in=user_ids, is_open=True)
+            .values_list('user_id')
+            .annotate(count=Count('id'))
+        )
+
+    def close_due_positions(self, batch_size: Optional[int] = None, max_batches: int = 50) -> Dict:
+        """
+        Drain the close schedule: pop positions whose deadline has passed in
+        batches and close each batch in bulk (one atomic write per batch).
+        Returns totals for the run.
+        """
+        batch_size = batch_size or self.batch_size
+        closed_total = 0
+        skipped_total = 0
+        batches = 0
+
+        while batches < max_batches:
+            current_time = timezone.now()
+            trade_ids = self.close_scheduler.pop_due(current_time, batch_size)
+            if not trade_ids:
+                break
+            batches += 1
+
+            try:
+                positions = list(
+                    BotTrade.objects.filter(id__in=trade_ids, is_open=True).select_related('user')
+                )
+                closed = self._close_position_batch(positions, current_time)
+            except Exception as e:
+                logger.exception(f"Error closing scheduled batch of {len(trade_ids)} positions: {e}")
+                self.close_scheduler.reschedule(trade_ids, current_time)
+                break
+
+            closed_total += closed
+            skipped_total += len(trade_ids) - closed
+            if len(trade_ids) < batch_size:
+                break
+
+        return {
+            'closed': closed_total,
+            'skipped': skipped_total,
+            'batches': batches,
+        }
+
+    def close_stale_positions(self, stale_before, chunk_size: Optional[int] = None) -> Dict:
+        """
+        Force-close every open position opened before stale_before for users
+        with the bot enabled. Positions are loaded with their users in keyset
+        chunks, exit against this orchestrator's shared price snapshot and
+        each chunk is persisted in one atomic batch.
+        Returns totals for the run.
+        """
+        chunk_size = chunk_size or self.batch_size
+        queryset = BotTrade.objects.filter(
+            is_open=True,
+            opened_at__lt=stale_before,
+            user__is_bot_enabled=True
+        ).select_related('user').order_by('pk')
+
+        closed_total = 0
+        chunks = 0
+        last_pk = None
+        while True:
+            chunk_qs = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            chunk = list(chunk_qs[:chunk_size])
+            if not chunk:
+                break
+            chunks += 1
+
+            try:
+                closed_total += self._close_position_batch(chunk, timezone.now(), stale=True)
+            except Exception as e:
+                logger.exception(f"Error closing chunk of {len(chunk)} stale positions: {e}")
+
+            last_pk = chunk[-1].pk
+            if len(chunk) < chunk_size:
+                break
+
+        return {
+            'closed': closed_total,
+            'chunks': chunks,
+        }
+
+    def _close_position_batch(self, positions: List[BotTrade], current_time, stale: bool = False) -> int:
+        """
+        Settle and persist one batch of positions across many users
+        (positions must be loaded with select_related('user')).
+        Returns number of positions closed.
+        """
+        if not positions:
+            return 0
+
+        by_user = defaultdict(list)
+        for position in sorted(positions, key=lambda position: position.opened_at):
+            by_user[position.user_id].append(position)
+
+        sessions = {
+            session.user_id: session
+            for session in TradingSession.objects.filter(user_id__in=list(by_user.keys()), is_active=True)
+        }
+
+        positions_to_update = []
+        transactions_to_create = []
+        session_deltas = {}
+        balance_deltas = {}
+        notifications = []
+
+        for user_id, user_positions in by_user.items():
+            user = user_positions[0].user
+            position_manager = self._use_user_rng(
+                user_id, self.position_managers.get(user.bot_type, self.position_managers['basic'])
+            )
+
+            closed, total_profit_loss_units, winning_count = self._settle_positions(
+                user, position_manager, user_positions, current_time, transactions_to_create, stale=stale
+            )
+            if not closed:
+                continue
+            positions_to_update.extend(closed)
+
+            total_profit_loss = from_units(total_profit_loss_units, MONEY_EXP)
+            if user_id in sessions:
+                session_deltas[sessions[user_id].id] = (total_profit_loss, winning_count, 0)
+            if total_profit_loss:
+                balance_deltas[user_id] = total_profit_loss
+            notifications.append((user_id, closed, user.balance + total_profit_loss))
+
+        with db_transaction.atomic():
+            if positions_to_update:
+                BotTrade.objects.bulk_update(
+                    positions_to_update,
+                    ['exit_price', 'profit_loss', 'profit_loss_percent', 'is_open', 'closed_at'],
+                    batch_size=self.batch_size
+                )
+            if transactions_to_create:
+                Transaction.objects.bulk_create(transactions_to_create, batch_size=self.batch_size)
+            self._apply_session_deltas(session_deltas)
+            self._apply_balance_deltas(balance_deltas)
+
+            db_transaction.on_commit(lambda: self.position_index.remove(positions_to_update))
+
+        send_bot_trades_updates(self.channel_layer, {
+            user_id: (closed, balance) for user_id, closed, balance in notifications
+        })
+
+        logger.info(
+            f"Closed {len(positions_to_update)} {'stale' if stale else 'scheduled'} positions "
+            f"for {len(notifications)} users"
+        )
+        return len(positions_to_update)
+
+    def _close_positions(
+        self,
+        user,
+        position_manager: PositionManager,
+        positions: List[BotTrade],
+        current_time,
+        transactions_to_create: List[Transaction]
+    ) -> Tuple[List[BotTrade], MoneyUnits, int]:
+        """
+        Close due positions in memory, queueing their transactions
+        Returns (closed positions, total P/L in 0.01 units, winning count)
+        """
+        return self._settle_positions(
+            user,
+            position_manager,
+            position_manager.select_positions_to_close(positions, current_time),
+            current_time,
+            transactions_to_create
+        )
+
+    def _settle_positions(
+        self,
+        user,
+        position_manager: PositionManager,
+        positions: List[BotTrade],
+        current_time,
+        transactions_to_create: List[Transaction],
+        stale: bool = False
+    ) -> Tuple[List[BotTrade], MoneyUnits, int]:
+        """
+        Settle the given positions in memory, queueing their transactions
+        (stale=True exits at the shared tick price, see settle_stale_position)
+        Returns (closed positions, total P/L in 0.01 units, winning count)
+        """
+        settle = position_manager.settle_stale_position if stale else position_manager.settle_position
+
+        closed = []
+        total_profit_loss_units = 0
+        winning_count = 0
+        for position in positions:
+            try:
+                profit_loss_units = settle(position, self.market, current_time)
+            except Exception as e:
+                logger.error(f"Error processing position {position.id}: {e}")
+                continue
+
+            closed.append(position)
+            total_profit_loss_units += profit_loss_units
+            if profit_loss_units > 0:
+                winning_count += 1
+
+            transactions_to_create.append(Transaction(
+                user=user,
+                transaction_type='bot_profit' if profit_loss_units > 0 else 'bot_loss',
+                amount=from_units(abs(profit_loss_units), MONEY_EXP),
+                status='completed',
+                processed_at=current_time
+            ))
+
+        return closed, total_profit_loss_units, winning_count
+
+    def _open_positions(
+        self,
+        user,
+        position_manager: PositionManager,
+        balance_units: MoneyUnits,
+        open_positions_count: int,
+        current_time
+    ) -> List[BotTrade]:
+        """Open new positions in memory while under the tier's position limit"""
+        config = position_manager.config
+        count = self.trades_per_user
+        if count is None:
+            count = self.rng.randint(*config.trades_per_run_range)
+
+        opened = []
+        for _ in range(count):
+            if open_positions_count >= config.max_open_positions or not self.market.base_prices:
+                break
+
+            symbol = self.market.choose_trading_pair()
+            entry_units = self.market.get_current_price_units(symbol)
+            if entry_units <= 0:
+                continue
+
+            side = self.rng.choices(self.SIDES, weights=self.SIDE_WEIGHTS, k=1)[0]
+            _, quantity_units = position_manager.position_size_units(
+                balance_units, entry_units, open_positions_count
+            )
+            if quantity_units <= 0:
+                break
+
+            opened.append(BotTrade(
+                user=user,
+                symbol=symbol,
+                side=side,
+                entry_price=from_units(entry_units, PRICE_EXP),
+                exit_price=None,
+                quantity=from_units(quantity_units, PRICE_EXP),
+                profit_loss=Decimal('0.00'),
+                profit_loss_percent=Decimal('0.00'),
+                is_open=True,
+                opened_at=current_time,
+                closed_at=None
+            ))
+            open_positions_count += 1
+
+        return opened
+
+    @staticmethod
+    def _apply_session_deltas(session_deltas: Dict) -> None:
+        """Apply per-session totals with a single UPDATE ... CASE statement"""
+        if not session_deltas:
+            return
+
+        from django.db.models import Case, F, IntegerField, DecimalField, Value, When
+
+        money_field = DecimalField(max_digits=15, decimal_places=2)
+        profit_whens = [
+            When(id=session_id, then=Value(delta[0], output_field=money_field))
+            for session_id, delta in session_deltas.items()
+        ]
+        profit_delta = Case(*profit_whens, default=Value(Decimal('0'), output_field=money_field))
+
+        TradingSession.objects.filter(id__in=list(session_deltas.keys())).update(
+            current_balance=F('current_balance') + profit_delta,
+            total_profit=F('total_profit') + profit_delta,
+            winning_trades=F('winning_trades') + Case(
+                *[When(id=session_id, then=Value(delta[1])) for session_id, delta in session_deltas.items()],
+                default=Value(0),
+                output_field=IntegerField()
+            ),
+            total_trades=F('total_trades') + Case(
+                *[When(id=session_id, then=Value(delta[2])) for session_id, delta in session_deltas.items()],
+                default=Value(0),
+                output_field=IntegerField()
+            )
+        )
+
+    @staticmethod
+    def _apply_balance_deltas(balance_deltas: Dict) -> None:
+        """Apply user balance changes with a single UPDATE ... CASE statement"""
+        if not balance_deltas:
+            return
+
+        from django.db.models import Case, F, DecimalField, Value, When
+        from apps.accounts.models import User
+
+        money_field = DecimalField(max_digits=15, decimal_places=2)
+        User.objects.filter(id__in=list(balance_deltas.keys())).update(
+            balance=F('balance') + Case(
+                *[
+                    When(id=user_id, then=Value(delta, output_field=money_field))
+                    for user_id, delta in balance_deltas.items()
+                ],
+                default=Value(Decimal('0'), output_field=money_field)
+            )
+        )
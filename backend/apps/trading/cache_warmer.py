@@ -0,0 +1,160 @@
+"""
+Refresh-ahead warming of market history, driven by access frequency.
+
+MarketHistoryView records every request in Redis:
+
+    market_history:access:{window}   sorted set 'SYMBOL|interval|limit' -> requests
+    market_history:stats:{window}    hash hit / stale / miss / warmed counters
+
+Windows are WINDOW_SECONDS long and kept for KEEP_WINDOWS windows. The
+trading.warm_history_cache task takes the hottest keys of the last two
+windows and refreshes those whose candle series (or klines cache entry)
+goes stale within the lead time, spending at most the upstream budget per
+run. `manage.py history_cache_report` prints the hit ratios per window so
+the budget can be tuned.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .candle_store import CandleStore
+from .utils.redis_client import get_redis_connection
+
+logger = logging.getLogger('apps.trading')
+
+CACHE_STATUSES = ('hit', 'stale', 'miss')
+
+
+class HistoryCacheWarmer:
+    ACCESS_PREFIX = 'market_history:access:'
+    STATS_PREFIX = 'market_history:stats:'
+    WINDOW_SECONDS = 60 * 60
+    KEEP_WINDOWS = 24
+
+    def __init__(self, top_n: int = None, budget: int = None, lead: float = None, store: CandleStore = None):
+        self.top_n = top_n or settings.MARKET_WARMER_TOP_N
+        self.budget = budget if budget is not None else settings.MARKET_WARMER_BUDGET
+        self.lead = lead if lead is not None else settings.MARKET_WARMER_LEAD
+        self.store = store or CandleStore()
+
+    @classmethod
+    def window(cls, now: float = None) -> int:
+        return int((time.time() if now is None else now) // cls.WINDOW_SECONDS)
+
+    @classmethod
+    def record_access(cls, canonical: str, interval: str, limit: int, cache_status: str) -> None:
+        """Count one MarketHistoryView request (never fails the request)"""
+        window = cls.window()
+        access_key = f'{cls.ACCESS_PREFIX}{window}'
+        stats_key = f'{cls.STATS_PREFIX}{window}'
+        expire = cls.WINDOW_SECONDS * cls.KEEP_WINDOWS
+
+        try:
+            pipe = get_redis_connection().pipeline(transaction=False)
+            pipe.zincrby(access_key, 1, f'{canonical}|{interval}|{limit}')
+            pipe.expire(access_key, expire)
+            if cache_status in CACHE_STATUSES:
+                pipe.hincrby(stats_key, cache_status, 1)
+                pipe.expire(stats_key, expire)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"⚠️ Market history access not recorded: {e}")
+
+    def hottest(self):
+        """[(symbol, interval, limit, requests)] of the current and previous window, hottest first"""
+        window = self.window()
+        merged_key = f'{self.ACCESS_PREFIX}merged:{window}'
+
+        # Sum both windows before ranking, so a key hot in only one still gets its full count
+        pipe = get_redis_connection().pipeline(transaction=False)
+        pipe.zunionstore(merged_key, [f'{self.ACCESS_PREFIX}{window}', f'{self.ACCESS_PREFIX}{window - 1}'])
+        pipe.zrevrange(merged_key, 0, self.top_n - 1, withscores=True)
+        pipe.delete(merged_key)
+        _, ranked, _ = pipe.execute()
+
+        hottest = []
+        for member, score in ranked:
+            symbol, interval, limit = member.split('|')
+            hottest.append((symbol, interval, int(limit), int(score)))
+        return hottest
+
+    def run(self):
+        """Refresh hot keys that go stale within the lead time, within the upstream budget"""
+        started = time.perf_counter()
+        refreshed = []
+        skipped_budget = 0
+        seen = set()
+
+        for symbol, interval, limit, requests in self.hottest():
+            base = self.store.base_interval(interval)
+            # Intervals resampled from the same base series share one refresh
+            target = (symbol, base or interval, base is None)
+            if target in seen:
+                continue
+            seen.add(target)
+
+            if base is not None:
+                fresh_for = self.store.sync_due_in(symbol, base)
+            else:
+                fresh_for = self.store.market_service.cache_fresh_for(symbol, interval)
+            if fresh_for is not None and fresh_for > self.lead:
+                continue
+
+            if len(refreshed) >= self.budget:
+                skipped_budget += 1
+                continue
+
+            if base is not None:
+                self.store.sync(symbol, base, force=True)
+            else:
+                self.store.market_service.refresh_market_data(symbol, interval, limit)
+            refreshed.append(f'{symbol} {base or interval}')
+
+        if refreshed:
+            try:
+                get_redis_connection().hincrby(f'{self.STATS_PREFIX}{self.window()}', 'warmed', len(refreshed))
+            except RedisError:
+                pass
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"🔥 Warmed {len(refreshed)} market history keys in {elapsed:.2f}s "
+            f"({skipped_budget} due keys over budget {self.budget})"
+        )
+        return {
+            'refreshed': refreshed,
+            'over_budget': skipped_budget,
+            'budget': self.budget,
+            'elapsed_seconds': round(elapsed, 3),
+        }
+
+    @classmethod
+    def report(cls, windows: int = 24):
+        """Per-window request counts and hit ratios, newest first"""
+        current = cls.window()
+        redis_client = get_redis_connection()
+
+        pipe = redis_client.pipeline(transaction=False)
+        for window in range(current, current - windows, -1):
+            pipe.hgetall(f'{cls.STATS_PREFIX}{window}')
+        results = pipe.execute()
+
+        rows = []
+        for offset, stats in enumerate(results):
+            counts = {status: int(stats.get(status, 0)) for status in CACHE_STATUSES}
+            requests = sum(counts.values())
+            if not requests and not stats:
+                continue
+            rows.append({
+                'window_start': (current - offset) * cls.WINDOW_SECONDS,
+                'requests': requests,
+                **counts,
+                'warmed': int(stats.get('warmed', 0)),
+                # Fresh hits only; stale responses are fast but may lag one sync
+                'hit_ratio': counts['hit'] / requests if requests else None,
+                'non_blocking_ratio': (counts['hit'] + counts['stale']) / requests if requests else None,
+            })
+        return rows
@@ -0,0 +1,258 @@
+"""
+Local incremental OHLCV candle store behind MarketHistoryView.
+
+Candles live in the market_candles table keyed by (canonical symbol,
+interval, open time). A series is backfilled once from Binance / Twelve
+Data; afterwards each sync only fetches the missing tail (plus the last
+stored candle, which may still have been forming). A series left unsynced
+for longer than one fetch covers is replaced by a fresh backfill rather
+than stitched across the hole. Syncs are throttled to one per series per
+market data cache TTL, so reads are served from the local table and keep
+working during upstream outages.
+
+Only the base intervals (1h, 1d) are stored. Every other interval (2h, 4h,
+12h, 1w, 3d, ...) is resampled locally from the coarsest base interval that
+divides it, so a symbol costs at most two upstream series.
+
+Reads never wait for a due tail sync (stale-while-revalidate): stored
+candles are served immediately and the sync is queued as a Celery task.
+Only a series with no stored candles yet is backfilled inline.
+"""
+
+import logging
+import time
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Candle
+from .services import MarketDataService
+from .utils.candles import FIELDS, CandleColumns
+from .utils.resample import bucket_origin, bucket_start, interval_to_ms, resample_ohlcv
+
+logger = logging.getLogger('apps.trading')
+
+
+class CandleStore:
+    # Stored series, coarsest last; everything else is resampled from these
+    BASE_INTERVALS = ('1h', '1d')
+
+    # Binance klines maximum per request
+    BACKFILL_LIMIT = 1000
+    SYNC_MARKER_PREFIX = 'candles:synced:'
+    UPSERT_BATCH_SIZE = 500
+
+    def __init__(self, market_service: MarketDataService = None):
+        self.market_service = market_service or MarketDataService()
+        # 'hit', 'stale' or 'miss' for the last get_market_data() call
+        self.last_cache_status = None
+
+    def series_key(self, symbol: str):
+        """(canonical symbol, asset type) for a user-supplied symbol"""
+        asset_type = self.market_service.get_asset_type(symbol)
+        return self.market_service.canonical_symbol(symbol, asset_type), asset_type
+
+    def base_interval(self, interval: str):
+        """Coarsest stored interval that interval is a whole multiple of (None if none)"""
+        interval_ms = interval_to_ms(interval)
+        if interval_ms is None:
+            return None
+
+        for base in reversed(self.BASE_INTERVALS):
+            if interval_ms % interval_to_ms(base) == 0:
+                return base
+        return None
+
+    def get_market_data(self, symbol: str, interval: str, limit: int):
+        """
+        Last `limit` candles as CandleColumns. Stored
+        candles are served as they are and a due tail sync runs in the
+        background; an empty series is backfilled first. Falls back to
+        MarketDataService.fetch_market_data for intervals that cannot be
+        built from a base series or while a series has no local data yet.
+        """
+        base = self.base_interval(interval)
+        if base is None:
+            data = self.market_service.fetch_market_data(symbol, interval, limit)
+            self.last_cache_status = self.market_service.last_cache_status
+            return data
+
+        canonical, asset_type = self.series_key(symbol)
+        data = self._read_interval(canonical, base, interval, limit)
+        if data:
+            self.last_cache_status = 'stale' if self.sync_in_background(symbol, base) else 'hit'
+            return data
+
+        self.last_cache_status = 'miss'
+        self.sync(symbol, base, limit if base == interval else None)
+        data = self._read_interval(canonical, base, interval, limit)
+        if data:
+            return data
+
+        logger.info(f"📭 No local candles for {canonical} {interval} yet - using cached upstream data")
+        return self.market_service.fetch_market_data(symbol, interval, limit)
+
+    def _read_interval(self, canonical: str, base: str, interval: str, limit: int):
+        if base == interval:
+            return self.read(canonical, interval, limit)
+        return self.read_resampled(canonical, base, interval, limit)
+
+    def read(self, canonical: str, interval: str, limit: int):
+        """Last `limit` stored candles"""
+        rows = list(
+            Candle.objects.filter(symbol=canonical, interval=interval)
+            .order_by('-open_time')
+            .values_list('open_time', 'open', 'high', 'low', 'close', 'volume')[:limit]
+        )
+        rows.reverse()
+        return CandleColumns.from_rows(rows)
+
+    def read_resampled(self, canonical: str, base: str, interval: str, limit: int):
+        """
+        Last `limit` interval bars aggregated from the stored base series.
+        The window is read back by row count, not wall-clock span, so series
+        with gaps (weekends, exchange sessions) still get `limit` bars when
+        enough history is stored.
+        """
+        interval_ms = interval_to_ms(interval)
+        origin = bucket_origin(interval_ms)
+        base_rows = (
+            Candle.objects.filter(symbol=canonical, interval=base)
+            .order_by('-open_time')
+            .values_list('open_time', 'open', 'high', 'low', 'close', 'volume')
+        )
+
+        # One extra bucket, since the oldest one read is usually cut short
+        rows = []
+        batch = (limit + 1) * (interval_ms // interval_to_ms(base))
+        while True:
+            query = base_rows.filter(open_time__lt=rows[-1][0]) if rows else base_rows
+            chunk = list(query[:batch])
+            rows.extend(chunk)
+            exhausted = len(chunk) < batch
+            if exhausted:
+                break
+            buckets = (np.fromiter((row[0] for row in rows), np.int64, len(rows)) - origin) // interval_ms
+            if np.count_nonzero(np.diff(buckets)) + 1 > limit:
+                break
+            # Gaps in the series: read further back
+            batch *= 2
+
+        if not rows:
+            return CandleColumns.empty()
+
+        rows.reverse()
+        bars = resample_ohlcv(CandleColumns.from_rows(rows).columns, interval_ms)
+
+        # Oldest bar is partial when the read stopped inside its bucket, or
+        # when stored history starts mid-bucket
+        first_open_time = rows[0][0]
+        if not exhausted or first_open_time != bucket_start(first_open_time, interval_ms):
+            bars = {key: values[1:] for key, values in bars.items()}
+
+        return CandleColumns(bars).tail(limit)
+
+    def _sync_marker(self, symbol: str, interval: str):
+        """(marker cache key, TTL) throttling syncs of a series; the marker holds the sync time"""
+        canonical, asset_type = self.series_key(symbol)
+        marker_key = f"{self.SYNC_MARKER_PREFIX}{asset_type}:{canonical}:{interval}"
+        return marker_key, self.market_service.cache_ttl.get(asset_type, 300)
+
+    def sync_in_background(self, symbol: str, interval: str) -> bool:
+        """Queue a tail sync if one is due (one per series per cache TTL across all workers)"""
+        from .tasks import sync_candles
+
+        marker_key, ttl = self._sync_marker(symbol, interval)
+        if not cache.add(marker_key, time.time(), ttl):
+            return False
+
+        try:
+            sync_candles.delay(symbol, interval)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not queue candle sync for {symbol} {interval}, syncing inline: {e}")
+            self.sync(symbol, interval, force=True)
+        return True
+
+    def sync_due_in(self, symbol: str, interval: str):
+        """Seconds until the next tail sync of a series is due (<= 0 once due)"""
+        marker_key, ttl = self._sync_marker(symbol, interval)
+        synced_at = cache.get(marker_key)
+        if synced_at is None:
+            return 0
+        return synced_at + ttl - time.time()
+
+    def sync(self, symbol: str, interval: str, limit: int = None, force: bool = False) -> int:
+        """
+        Bring a series up to date: backfill when empty, else fetch only the
+        missing tail. At most one sync per series per cache TTL (across all
+        workers) unless force=True. Returns number of candles written.
+        """
+        canonical, asset_type = self.series_key(symbol)
+        marker_key, ttl = self._sync_marker(symbol, interval)
+
+        if force:
+            cache.set(marker_key, time.time(), ttl)
+        elif not cache.add(marker_key, time.time(), ttl):
+            return 0
+
+        last_open_time = (
+            Candle.objects.filter(symbol=canonical, interval=interval)
+            .order_by('-open_time')
+            .values_list('open_time', flat=True)
+            .first()
+        )
+
+        if last_open_time is None:
+            fetch_count = max(limit or 0, self.BACKFILL_LIMIT)
+            logger.info(f"📥 Backfilling {fetch_count} {interval} candles for {canonical}")
+        else:
+            missing = (int(time.time() * 1000) - last_open_time) // interval_to_ms(interval)
+            # Re-fetch the last stored candle too: it may still have been forming
+            fetch_count = min(missing + 1, self.BACKFILL_LIMIT)
+
+        data = self.market_service.fetch_upstream_klines(symbol, asset_type, interval, fetch_count)
+        if not data:
+            logger.warning(f"⚠️ Candle sync failed for {canonical} {interval} - serving stored candles")
+            return 0
+
+        # Providers return the most recent candles only: after a gap longer than
+        # one fetch the stored series can't be joined, so it is replaced
+        if last_open_time is not None and data.columns['time'][0] > last_open_time:
+            logger.info(f"🕳️ {canonical} {interval} was not synced for {missing} candles - re-backfilling")
+            with transaction.atomic():
+                Candle.objects.filter(symbol=canonical, interval=interval).delete()
+                written = self.upsert(canonical, interval, data)
+            logger.info(f"✅ Replaced {canonical} {interval} with {written} candles")
+            return written
+
+        written = self.upsert(canonical, interval, data)
+        logger.info(f"✅ Synced {written} {interval} candles for {canonical}")
+        return written
+
+    def upsert(self, canonical: str, interval: str, data) -> int:
+        """Insert new candles and overwrite existing ones (still-forming last candle)"""
+        candles = [
+            Candle(
+                symbol=canonical,
+                interval=interval,
+                open_time=open_time,
+                open=open_price,
+                high=high_price,
+                low=low_price,
+                close=close_price,
+                volume=volume,
+            )
+            for open_time, open_price, high_price, low_price, close_price, volume in zip(
+                *(data[field].tolist() for field in FIELDS)
+            )
+        ]
+
+        Candle.objects.bulk_create(
+            candles,
+            batch_size=self.UPSERT_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['symbol', 'interval', 'open_time'],
+            update_fields=['open', 'high', 'low', 'close', 'volume', 'updated_at'],
+        )
+        return len(candles)
@@ -1,12 +1,17 @@
 import json
 import asyncio
 import aiohttp
-import random
 from datetime import datetime
 from decimal import Decimal
+from urllib.parse import parse_qs
 from django.conf import settings
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from .market_broadcast import CATEGORIES, PROTOCOL_DELTA, PROTOCOL_FULL, apply_selection, get_market_broadcaster
+from .mock_market import MockMarketEngine
 from .services import MarketDataService
+from .snapshots import AsyncSnapshotReader
+from .utils.upstream import provider_guard
 
 
 class MarketConsumer(AsyncWebsocketConsumer):
@@ -296,18 +301,18 @@ class MarketConsumer(AsyncWebsocketConsumer):
             self.is_authenticated = False
             print(f"[Market WS] Anonymous user connected")
 
-        # Changed: Use cached data instead of fetching directly
-        self.broadcast_task = asyncio.create_task(self.broadcast_cached_data())
+        # Cached snapshot is pushed by the process-wide broadcaster
+        # (?protocol=delta: versioned snapshot + deltas instead of full updates)
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        protocol = PROTOCOL_DELTA if query.get('protocol') == [PROTOCOL_DELTA] else PROTOCOL_FULL
+        self.broadcaster = get_market_broadcaster()
+        await self.broadcaster.subscribe(self, protocol)
         print(f"[WS] WebSocket connected ({self.channel_name})")
 
     async def disconnect(self, close_code):
         self.running = False
-        if hasattr(self, 'broadcast_task') and not self.broadcast_task.done():
-            self.broadcast_task.cancel()
-            try:
-                await self.broadcast_task
-            except asyncio.CancelledError:
-                pass
+        if hasattr(self, 'broadcaster'):
+            self.broadcaster.unsubscribe(self)
         print(f"[WS] WebSocket disconnected (code={close_code})")
 
     async def fetch_binance_tickers(self, session):
@@ -315,15 +320,16 @@ class MarketConsumer(AsyncWebsocketConsumer):
         binance_symbols_we_want += [asset['binance_id'] for asset in self.COMMODITIES_MAP if 'binance_id' in asset]
 
         try:
-            async with session.get(self.BINANCE_URL, timeout=10) as response:
-                response.raise_for_status()
-                data = await response.json()
-                filtered_tickers = {
-                    ticker['symbol']: ticker
-                    for ticker in data
-                    if ticker['symbol'] in binance_symbols_we_want
-                }
-                return filtered_tickers
+            async with provider_guard('binance').aguarded(weight=MarketDataService.BINANCE_24HR_ALL_WEIGHT):
+                async with session.get(self.BINANCE_URL, timeout=10) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+            filtered_tickers = {
+                ticker['symbol']: ticker
+                for ticker in data
+                if ticker['symbol'] in binance_symbols_we_want
+            }
+            return filtered_tickers
         except Exception as e:
             print(f"Error fetching Binance tickers: {e}")
             return {}
@@ -331,10 +337,11 @@ class MarketConsumer(AsyncWebsocketConsumer):
     async def fetch_forex_rates(self, session):
         try:
             url = "https://api.exchangerate-api.com/v4/latest/USD"
-            async with session.get(url, timeout=10) as response:
-                response.raise_for_status()
-                data = await response.json()
-                return data.get('rates', {})
+            async with provider_guard('exchangerate').aguarded():
+                async with session.get(url, timeout=10) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+            return data.get('rates', {})
         except Exception as e:
             print(f"Error fetching forex rates: {e}")
             return {}
@@ -355,25 +362,15 @@ class MarketConsumer(AsyncWebsocketConsumer):
                 return quote_rate / base_rate
             return 0.0
 
-    def get_mock_ticker(self, asset, category):
-        symbol = asset['symbol']
-        last_price_data = self.TICKER_CACHE.get(symbol, {})
-        last_price_str = last_price_data.get('price')
+    def mock_quotes(self):
+        """Shared mock quotes (same walk as the Celery refresh, see MockMarketEngine)"""
+        assets = [('stocks', asset['symbol']) for asset in self.STOCKS_MAP]
+        assets += [('commodities', asset['symbol']) for asset in self.COMMODITIES_MAP]
+        return MockMarketEngine(assets).quotes()
 
-        if last_price_str:
-            last_price = Decimal(last_price_str)
-        else:
-            if category == 'stocks':
-                last_price = Decimal(random.uniform(100.0, 500.0))
-            else:
-                last_price = Decimal(random.uniform(50.0, 150.0))
-
-        change_percent = Decimal(random.uniform(-3.5, 3.5))
-        new_price = last_price * (1 + change_percent / 100)
-        change_24h = new_price - last_price
-        volume = Decimal(random.uniform(1_000_000, 50_000_000))
-
-        self.TICKER_CACHE[symbol] = {'price': str(new_price)}
+    def get_mock_ticker(self, asset, category, quotes=None):
+        quotes = quotes or self.mock_quotes()
+        quote = quotes[MockMarketEngine.key(category, asset['symbol'])]
 
         return {
             'id': asset['id'],
@@ -381,10 +378,10 @@ class MarketConsumer(AsyncWebsocketConsumer):
             'name': asset['name'],
             'image': asset['image'],
             'category': category,
-            'price': float(new_price),
-            'change_percent_24h': float(change_percent),
-            'change_24h': float(change_24h),
-            'volume': float(volume)
+            'price': float(quote['price']),
+            'change_percent_24h': float(quote['change_percent_24h']),
+            'change_24h': float(quote['change_24h']),
+            'volume': float(quote['volume'])
         }
 
     async def fetch_real_prices(self):
@@ -402,6 +399,7 @@ class MarketConsumer(AsyncWebsocketConsumer):
                 forex_rates = await self.fetch_forex_rates(session)
 
                 all_assets = []
+                mock_quotes = self.mock_quotes()
 
                 # ===== CRYPTO =====
                 for asset in self.CRYPTO_ASSETS:
@@ -442,7 +440,7 @@ class MarketConsumer(AsyncWebsocketConsumer):
                         })
                     else:
                         # Немає від Binance, використовуємо mock
-                        mock_ticker = self.get_mock_ticker(asset, 'commodities')
+                        mock_ticker = self.get_mock_ticker(asset, 'commodities', mock_quotes)
                         all_assets.append(mock_ticker)
 
                 # ===== FOREX =====
@@ -474,7 +472,7 @@ class MarketConsumer(AsyncWebsocketConsumer):
 
                 # ===== STOCKS =====
                 for asset in self.STOCKS_MAP:
-                    all_assets.append(self.get_mock_ticker(asset, 'stocks'))
+                    all_assets.append(self.get_mock_ticker(asset, 'stocks', mock_quotes))
 
                 # Відправка на клієнт
                 await self.send(text_data=json.dumps({
@@ -489,45 +487,6 @@ class MarketConsumer(AsyncWebsocketConsumer):
 
         print("Price update task stopped")
 
-    async def broadcast_cached_data(self):
-        """
-        Optimized method: Send cached data to client every 5 seconds
-
-        Data is fetched by Celery task every 20 seconds and stored in Redis.
-        This eliminates duplicate API calls when multiple clients are connected.
-
-        Benefits:
-        - No direct API calls from WebSocket
-        - Reads from Redis cache (< 1ms latency)
-        - Single source of truth
-        - Automatic fallback to stale cache on errors
-        """
-        while self.running:
-            try:
-                # Read from Redis cache (populated by Celery task)
-                from apps.trading.services import MarketDataService
-                cached_data = MarketDataService.get_cached_websocket_data()
-
-                if cached_data:
-                    await self.send(text_data=json.dumps({
-                        'type': 'market_update',
-                        'data': cached_data,
-                        'timestamp': datetime.now().isoformat(),
-                        'source': 'cache'  # Indicates data is from Redis cache
-                    }))
-                    print(f"[Market WS] ✅ Sent {len(cached_data)} assets from cache")
-                else:
-                    # Cache is empty - Celery task hasn't run yet or failed
-                    print("[Market WS] ⚠️ No cached data available, waiting for Celery task...")
-
-                await asyncio.sleep(5)  # Broadcast every 5 seconds
-
-            except Exception as e:
-                print(f"[Market WS] ❌ Broadcast error: {e}")
-                await asyncio.sleep(5)
-
-        print("[Market WS] Broadcast task stopped")
-
     async def receive(self, text_data):
         try:
             data = json.loads(text_data)
@@ -539,6 +498,29 @@ class MarketConsumer(AsyncWebsocketConsumer):
                     'timestamp': datetime.now().isoformat()
                 }))
 
+            elif message_type == 'resync':
+                # Client missed a delta version: resend the full snapshot
+                await self.broadcaster.send_snapshot(self)
+
+            elif message_type in ('subscribe', 'unsubscribe'):
+                # {"type": "subscribe", "categories": ["crypto"], "symbols": ["BTC"]}
+                protocol, selection = self.broadcaster.subscription(self)
+                selection = apply_selection(
+                    selection,
+                    categories=data.get('categories'),
+                    symbols=data.get('symbols'),
+                    remove=message_type == 'unsubscribe'
+                )
+                categories, symbols, excluded = selection or (CATEGORIES, (), ())
+                await self.send(text_data=json.dumps({
+                    'type': 'subscription',
+                    'categories': sorted(categories),
+                    'symbols': sorted(symbols),
+                    'excluded_symbols': sorted(excluded),
+                    'timestamp': datetime.now().isoformat()
+                }))
+                await self.broadcaster.subscribe(self, protocol, selection)
+
         except json.JSONDecodeError:
             print("Invalid JSON received")
         except Exception as e:
@@ -561,6 +543,7 @@ class BalanceConsumer(AsyncWebsocketConsumer):
             return
 
         self.user = user
+        self.reader = AsyncSnapshotReader()
         self.group_name = f'user_{self.user.id}'
 
         # Add to user-specific channel group
@@ -572,10 +555,19 @@ class BalanceConsumer(AsyncWebsocketConsumer):
         # Send initial balance
         await self.send(text_data=json.dumps({
             'type': 'balance_update',
-            'balance': str(self.user.balance),
+            'balance': await self.current_balance(),
             'timestamp': datetime.now().isoformat()
         }))
 
+    async def current_balance(self) -> str:
+        """Latest balance: Redis snapshot (non-blocking), else the database"""
+        balance = await self.reader.balance(self.user.id)
+        if balance is None:
+            balance = str(await database_sync_to_async(
+                lambda: type(self.user).objects.values_list('balance', flat=True).get(pk=self.user.pk)
+            )())
+        return balance
+
     async def disconnect(self, close_code):
         if hasattr(self, 'user') and self.user.is_authenticated:
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
@@ -589,7 +581,7 @@ class BalanceConsumer(AsyncWebsocketConsumer):
             if message_type == 'get_balance':
                 await self.send(text_data=json.dumps({
                     'type': 'balance_update',
-                    'balance': str(self.user.balance),
+                    'balance': await self.current_balance(),
                     'timestamp': datetime.now().isoformat()
                 }))
 
@@ -613,6 +605,15 @@ class BalanceConsumer(AsyncWebsocketConsumer):
             'timestamp': datetime.now().isoformat()
         }))
 
+    async def bot_trades_update(self, event):
+        """All trades opened/closed for this user in one simulator run"""
+        await self.send(text_data=json.dumps({
+            'type': 'bot_trades_update',
+            'balance': event['balance'],
+            'trades': event['trades'],
+            'timestamp': datetime.now().isoformat()
+        }))
+
 
 class SupportConsumer(AsyncWebsocketConsumer):
     """
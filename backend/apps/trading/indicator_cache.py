@@ -0,0 +1,175 @@
+"""
+Memoized technical indicators behind MarketIndicatorsView.
+
+Indicators are computed from the CandleStore arrays (utils.indicators) and
+memoized in the cache per (symbol, interval, indicator, params, limit, last
+candle), so repeated requests between candle syncs are a single cache
+round-trip. The last candle is identified by its open time and close: the
+newest candle is still forming until its interval ends, and its updates
+must not be served from an older result.
+
+Indicator specs are 'name' or 'name:param:param', e.g. 'sma:50',
+'macd:12:26:9', 'bollinger:20:2'; missing params take the defaults below.
+"""
+
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+from django.core.cache import cache
+
+from .candle_store import CandleStore
+from .utils import indicators
+from .utils.candles import CandleColumns
+
+logger = logging.getLogger('apps.trading')
+
+# name: (default params, param types)
+INDICATOR_PARAMS = {
+    'sma': ((20,), (int,)),
+    'ema': ((20,), (int,)),
+    'rsi': ((14,), (int,)),
+    'macd': ((12, 26, 9), (int, int, int)),
+    'atr': ((14,), (int,)),
+    'bollinger': ((20, 2.0), (int, float)),
+}
+DEFAULT_INDICATORS = 'sma:20,ema:50,rsi:14,macd:12:26:9,atr:14,bollinger:20:2'
+MAX_PERIOD = 500
+
+
+class IndicatorService:
+    MEMO_PREFIX = 'indicators:'
+    # Keys change with every candle; this only bounds memory for dropped ones
+    MEMO_TTL = 24 * 60 * 60
+    # Extra candles per period so exponential indicators have converged
+    WARMUP_FACTOR = 3
+    MAX_CANDLES = CandleStore.BACKFILL_LIMIT
+
+    def __init__(self, store: CandleStore = None):
+        self.store = store or CandleStore()
+
+    @staticmethod
+    def parse(spec: str) -> List[Tuple[str, tuple]]:
+        """'sma:20,macd' -> [('sma', (20,)), ('macd', (12, 26, 9))]; ValueError on bad specs"""
+        parsed = []
+        for item in (spec or DEFAULT_INDICATORS).split(','):
+            name, *raw_params = item.strip().lower().split(':')
+            if name not in INDICATOR_PARAMS:
+                raise ValueError(f"Unknown indicator '{name}' (available: {', '.join(INDICATOR_PARAMS)})")
+
+            defaults, types = INDICATOR_PARAMS[name]
+            if len(raw_params) > len(defaults):
+                raise ValueError(f"Too many parameters for {name}")
+            try:
+                params = tuple(cast(value) for cast, value in zip(types, raw_params)) + defaults[len(raw_params):]
+            except ValueError:
+                raise ValueError(f"Invalid parameters for {name}: {':'.join(raw_params)}")
+
+            periods = [param for param, cast in zip(params, types) if cast is int]
+            if any(period < 1 or period > MAX_PERIOD for period in periods):
+                raise ValueError(f"{name} periods must be between 1 and {MAX_PERIOD}")
+            if name == 'bollinger' and not 0 < params[1] <= 10:
+                raise ValueError("bollinger width must be between 0 and 10")
+            if name == 'macd' and params[0] >= params[1]:
+                raise ValueError("macd fast period must be shorter than the slow period")
+            parsed.append((name, params))
+        return parsed
+
+    @staticmethod
+    def label(name: str, params: tuple) -> str:
+        """('macd', (12, 26, 9)) -> 'macd_12_26_9'"""
+        return '_'.join([name] + [f'{param:g}' if isinstance(param, float) else str(param) for param in params])
+
+    def warmup(self, requested) -> int:
+        longest = max(sum(params[:2]) if name == 'macd' else params[0] for name, params in requested)
+        return longest * self.WARMUP_FACTOR
+
+    def get(self, symbol: str, interval: str, spec: str = None, limit: int = 168) -> Dict:
+        """Indicator series for the last `limit` candles plus the strategy market conditions"""
+        requested = self.parse(spec)
+        candles = self.store.get_market_data(
+            symbol, interval, min(limit + self.warmup(requested), self.MAX_CANDLES)
+        )
+        if not candles:
+            return None
+
+        canonical, _ = self.store.series_key(symbol)
+        last = f"{candles.last_time}:{float(candles['close'][-1])!r}"
+        keys = {
+            self.label(name, params): f"{self.MEMO_PREFIX}{canonical}:{interval}:{self.label(name, params)}:{limit}:{last}"
+            for name, params in requested
+        }
+
+        memoized = cache.get_many(list(keys.values()))
+        results = {}
+        computed = {}
+        for name, params in requested:
+            label = self.label(name, params)
+            if keys[label] in memoized:
+                results[label] = memoized[keys[label]]
+                continue
+            results[label] = computed[keys[label]] = self.compute(candles, name, params, limit)
+
+        if computed:
+            cache.set_many(computed, self.MEMO_TTL)
+        logger.debug(f"📐 Indicators for {canonical} {interval}: {len(memoized)} memoized, {len(computed)} computed")
+
+        return {
+            'symbol': canonical,
+            'interval': interval,
+            'time': candles['time'][-limit:].tolist(),
+            'indicators': results,
+            'market_conditions': self.market_conditions(candles),
+            'memoized': len(memoized),
+            'computed': len(computed),
+        }
+
+    @staticmethod
+    def compute(candles: CandleColumns, name: str, params: tuple, limit: int):
+        """One indicator over the whole series, trimmed to the last `limit` values (JSON-ready)"""
+        close = candles['close']
+        if name == 'sma':
+            result = indicators.sma(close, *params)
+        elif name == 'ema':
+            result = indicators.ema(close, *params)
+        elif name == 'rsi':
+            result = indicators.rsi(close, *params)
+        elif name == 'macd':
+            result = indicators.macd(close, *params)
+        elif name == 'atr':
+            result = indicators.atr(candles['high'], candles['low'], close, *params)
+        else:
+            result = indicators.bollinger(close, *params)
+
+        if isinstance(result, dict):
+            return {key: _to_list(values[-limit:]) for key, values in result.items()}
+        return _to_list(result[-limit:])
+
+    @staticmethod
+    def market_conditions(candles: CandleColumns, window: int = 20) -> Dict:
+        """
+        The `market_conditions` the bot strategies read (see bot.strategies):
+            volatility  standard deviation of log returns over the window
+            trend       EMA(window) vs EMA(2 * window) distance in ATR units, squashed to (-1, 1)
+            volume      last volume relative to the window average
+        Spread is not derivable from candles and is left to the strategy default.
+        """
+        close = candles['close']
+        if close.size < 2 * window + 1:
+            return {}
+
+        returns = np.diff(np.log(close[-(window + 1):]))
+        average_true_range = indicators.atr(candles['high'], candles['low'], close, window)[-1]
+        distance = indicators.ema(close, window)[-1] - indicators.ema(close, 2 * window)[-1]
+        average_volume = candles['volume'][-window:].mean()
+
+        return {
+            'volatility': float(returns.std()),
+            'trend': float(np.tanh(distance / average_true_range)) if average_true_range else 0.0,
+            'volume': float(candles['volume'][-1] / average_volume) if average_volume else 1.0,
+        }
+
+
+def _to_list(values: np.ndarray) -> list:
+    """Floats with NaN (not defined yet) as None"""
+    return [None if value != value else value for value in values.tolist()]
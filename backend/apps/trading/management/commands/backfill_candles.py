@@ -0,0 +1,70 @@
+"""
+Backfill / sync the local OHLCV candle store
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.trading.candle_store import CandleStore
+from apps.trading.services import MarketDataService
+
+
+class Command(BaseCommand):
+    """Fill market_candles for the given symbols and intervals (tail only for existing series)"""
+
+    help = 'Backfill the local candle store from Binance / Twelve Data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbols', type=str, default=None,
+            help='Comma-separated symbols (default: all WebSocket crypto assets)'
+        )
+        parser.add_argument(
+            '--intervals', type=str, default=','.join(CandleStore.BASE_INTERVALS),
+            help='Comma-separated base intervals (others are resampled from these)'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=CandleStore.BACKFILL_LIMIT,
+            help='Candles to backfill per empty series'
+        )
+
+    def handle(self, *args, **options):
+        intervals = [interval.strip() for interval in options['intervals'].split(',') if interval.strip()]
+        unknown = set(intervals) - set(CandleStore.BASE_INTERVALS)
+        if unknown:
+            raise CommandError(f'Unsupported intervals: {", ".join(sorted(unknown))}')
+
+        if options['symbols']:
+            symbols = [symbol.strip() for symbol in options['symbols'].split(',') if symbol.strip()]
+        else:
+            symbols = [asset['binance_id'] for asset in MarketDataService.CRYPTO_ASSETS]
+
+        store = CandleStore()
+        start_time = timezone.now()
+        total_written = 0
+        failed = []
+
+        for symbol in symbols:
+            for interval in intervals:
+                written = store.sync(symbol, interval, limit=options['limit'], force=True)
+                total_written += written
+                if not written:
+                    failed.append(f'{symbol} {interval}')
+                self.stdout.write(f'✓ {symbol:12} {interval:4} | Candles written: {written}')
+
+        elapsed = (timezone.now() - start_time).total_seconds()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n{"=" * 60}\n'
+                f'  Candle Store Backfill\n'
+                f'{"=" * 60}\n'
+                f'  Series:          {len(symbols) * len(intervals)}\n'
+                f'  Candles written: {total_written}\n'
+                f'  Failed series:   {len(failed)}\n'
+                f'  Time elapsed:    {elapsed:.2f}s\n'
+                f'{"=" * 60}\n'
+            )
+        )
+        for series in failed:
+            self.stdout.write(self.style.WARNING(f'  ✗ {series}'))
@@ -0,0 +1,268 @@
+"""
+Throughput benchmark for the bot simulation pipeline
+"""
+
+import json
+import random
+import resource
+import sys
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext, override_settings
+from redis.exceptions import RedisError
+
+from apps.accounts.models import User
+from apps.trading.bot.position_index import OpenPositionIndex
+from apps.trading.bot.price_engine import PricePathEngine
+from apps.trading.bot.simulator import BulkSimulationOrchestrator, MarketSimulator, TradingBotSimulator
+from apps.trading.models import BotTrade, TradingSession
+from apps.trading.tasks import simulate_for_user
+from apps.transactions.models import Transaction
+
+
+class Command(BaseCommand):
+    """
+    Measure users/trades per second of the simulate_for_user task, the
+    standard (TradingBotSimulator) path and the bulk path on N synthetic
+    users in a throwaway test database.
+
+    Runs isolated from the live services: local-memory cache primed with
+    fixed base prices, in-memory channel layer and sweep-mode closing.
+    Between ticks every open position is aged by --tick-seconds so closes
+    happen as they would in production. Bulk latency is per user amortized
+    over its chunk.
+    """
+
+    help = 'Benchmark bot simulation throughput (task, standard and bulk paths), JSON report'
+
+    PATHS = ('task', 'standard', 'bulk')
+    TIERS = ('basic', 'premium', 'specialist')
+    BASE_PRICES = {
+        'BTC/USDT': Decimal('67000.00'),
+        'ETH/USDT': Decimal('3500.00'),
+        'BNB/USDT': Decimal('580.00'),
+        'SOL/USDT': Decimal('145.00'),
+        'XRP/USDT': Decimal('0.52'),
+        'ADA/USDT': Decimal('0.38'),
+        'DOGE/USDT': Decimal('0.085'),
+        'DOT/USDT': Decimal('6.20'),
+        'MATIC/USDT': Decimal('0.72'),
+        'AVAX/USDT': Decimal('28.50'),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=300, help='Synthetic users (spread across tiers)')
+        parser.add_argument('--ticks', type=int, default=5, help='Simulation runs per path')
+        parser.add_argument('--paths', type=str, default=','.join(self.PATHS), help='Comma-separated: task,standard,bulk')
+        parser.add_argument('--trades', type=int, default=1, help='Trades per user per tick')
+        parser.add_argument('--batch-size', type=int, default=200, help='Bulk path chunk size')
+        parser.add_argument('--tick-seconds', type=int, default=60, help='Simulated time between ticks')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for users, prices and trade streams')
+        parser.add_argument('--output', type=str, default=None, help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        paths = [path.strip() for path in options['paths'].split(',') if path.strip()]
+        unknown = set(paths) - set(self.PATHS)
+        if unknown:
+            raise CommandError(f'Unknown paths: {", ".join(sorted(unknown))}')
+        if options['users'] < 1 or options['ticks'] < 1:
+            raise CommandError('--users and --ticks must be positive')
+
+        isolated = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'}},
+            CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+            BOT_CLOSE_SCHEDULER_ENABLED=False,
+        )
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with isolated:
+                report = self._run(paths, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+        self.stdout.write(output)
+
+    def _run(self, paths, options):
+        user_ids = self._create_users(options['users'], options['seed'])
+
+        report = {
+            'users': len(user_ids),
+            'ticks': options['ticks'],
+            'trades_per_user': options['trades'],
+            'batch_size': options['batch_size'],
+            'seed': options['seed'],
+            'database': connection.vendor,
+            'paths': {},
+        }
+
+        try:
+            for path in paths:
+                report['paths'][path] = self._run_path(path, user_ids, options)
+        finally:
+            self._clear_position_index(user_ids)
+
+        return report
+
+    def _create_users(self, count, seed):
+        """Bulk-create synthetic bot users with seeded ids and balances"""
+        rng = random.Random(seed)
+        password = make_password(None)
+        users = [
+            User(
+                id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                email=f'bench-{index}@bench.local',
+                password=password,
+                full_name=f'Bench User {index}',
+                balance=Decimal(rng.randint(250, 20000)),
+                bot_type=self.TIERS[index % len(self.TIERS)],
+                is_bot_enabled=True,
+            )
+            for index in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=500)
+        self.initial_balances = {user.id: user.balance for user in users}
+        return [user.id for user in users]
+
+    def _reset_state(self, user_ids):
+        """Fresh start for each path: no trades/sessions, original balances, first price tick"""
+        BotTrade.objects.all().delete()
+        Transaction.objects.all().delete()
+        TradingSession.objects.all().delete()
+        self._clear_position_index(user_ids)
+
+        users = list(User.objects.filter(id__in=user_ids).only('id', 'balance'))
+        for user in users:
+            user.balance = self.initial_balances[user.id]
+        User.objects.bulk_update(users, ['balance'], batch_size=500)
+
+        cache.clear()
+        cache.set(MarketSimulator.PRICES_CACHE_KEY, self.BASE_PRICES, None)
+
+    def _run_path(self, path, user_ids, options):
+        """Run all ticks of one path and summarize"""
+        self._reset_state(user_ids)
+        engine = PricePathEngine(seed=options['seed'])
+        runner = getattr(self, f'_tick_{path}')
+
+        latencies = []
+        queries = 0
+        opened = 0
+        closed = 0
+        elapsed = 0.0
+
+        for tick in range(options['ticks']):
+            engine.advance(self.BASE_PRICES)
+            started = time.perf_counter()
+            tick_stats = runner(user_ids, options, options['seed'] + tick)
+            elapsed += time.perf_counter() - started
+
+            latencies.extend(tick_stats['latencies'])
+            queries += tick_stats['queries']
+            opened += tick_stats['opened']
+            closed += tick_stats['closed']
+
+            self._advance_clock(options['tick_seconds'])
+
+        trades = opened + closed
+        user_runs = len(user_ids) * options['ticks']
+        latencies_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'user_runs': user_runs,
+            'users_per_second': round(user_runs / elapsed, 2) if elapsed > 0 else 0,
+            'users_per_minute': round(user_runs / elapsed * 60, 0) if elapsed > 0 else 0,
+            'positions_opened': opened,
+            'positions_closed': closed,
+            'trades_per_second': round(trades / elapsed, 2) if elapsed > 0 else 0,
+            'queries': queries,
+            'queries_per_trade': round(queries / trades, 2) if trades else None,
+            'latency_ms': {
+                'p50': round(float(np.percentile(latencies_ms, 50)), 3),
+                'p99': round(float(np.percentile(latencies_ms, 99)), 3),
+            },
+            'peak_rss_mb': self._peak_rss_mb(),
+        }
+
+    def _tick_task(self, user_ids, options, seed):
+        """simulate_for_user executed inline, one call per user"""
+        stats = {'latencies': [], 'queries': 0, 'opened': 0, 'closed': 0}
+        for user_id in user_ids:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                result = simulate_for_user(str(user_id), trades_count=options['trades'], seed=seed)
+                stats['latencies'].append(time.perf_counter() - started)
+            stats['queries'] += len(captured.captured_queries)
+            stats['opened'] += result.get('new_trades', 0)
+            stats['closed'] += result.get('closed_positions', 0)
+        return stats
+
+    def _tick_standard(self, user_ids, options, seed):
+        """TradingBotSimulator per user: close due positions, then open new ones"""
+        stats = {'latencies': [], 'queries': 0, 'opened': 0, 'closed': 0}
+        for user in User.objects.filter(id__in=user_ids).order_by('pk'):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                simulator = TradingBotSimulator(user, user.bot_type, seed=seed)
+                simulator.start_session()
+                stats['closed'] += simulator.close_open_positions()
+                stats['opened'] += simulator.generate_multiple_trades(options['trades'])
+                stats['latencies'].append(time.perf_counter() - started)
+            stats['queries'] += len(captured.captured_queries)
+        return stats
+
+    def _tick_bulk(self, user_ids, options, seed):
+        """BulkSimulationOrchestrator chunk by chunk (latency amortized per user)"""
+        stats = {'latencies': [], 'queries': 0, 'opened': 0, 'closed': 0}
+        batch_size = options['batch_size']
+        orchestrator = BulkSimulationOrchestrator(
+            batch_size=batch_size,
+            trades_per_user=options['trades'],
+            seed=seed
+        )
+        for start in range(0, len(user_ids), batch_size):
+            chunk = user_ids[start:start + batch_size]
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                results = orchestrator.simulate_user_ids(chunk)
+                chunk_elapsed = time.perf_counter() - started
+            stats['queries'] += len(captured.captured_queries)
+            stats['latencies'].extend([chunk_elapsed / max(len(results), 1)] * len(results))
+            stats['opened'] += sum(r['trades_generated'] for r in results)
+            stats['closed'] += sum(r['positions_closed'] for r in results)
+        return stats
+
+    def _advance_clock(self, seconds):
+        """Age every open position (DB and Redis index) instead of sleeping"""
+        BotTrade.objects.filter(is_open=True).update(opened_at=F('opened_at') - timedelta(seconds=seconds))
+        OpenPositionIndex().add(BotTrade.objects.filter(is_open=True).only('id', 'user_id', 'opened_at'))
+
+    def _clear_position_index(self, user_ids):
+        """Drop index keys written for the synthetic users"""
+        index = OpenPositionIndex()
+        try:
+            index.redis.delete(*[index.key(user_id) for user_id in user_ids])
+        except RedisError:
+            pass
+
+    @staticmethod
+    def _peak_rss_mb():
+        """Peak resident set size of this process so far"""
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        return round(peak / divisor, 1)
@@ -0,0 +1,223 @@
+"""
+Microbenchmark: Decimal vs fixed-point simulator trade math
+"""
+
+import random
+import time
+from decimal import Decimal, ROUND_DOWN
+
+from django.core.management.base import BaseCommand
+
+from apps.trading.bot.fixed_point import MONEY_EXP, PERCENT_EXP, PRICE_EXP, from_units, to_units
+from apps.trading.bot.simulator import BotConfigurationFactory, MarketSimulator, PositionManager
+
+
+def _legacy_position_size(config, balance, entry_price, open_positions_count):
+    """Reference Decimal implementation of PositionManager.calculate_position_size"""
+    min_trade_amount = Decimal('10.00')
+    risk_amount = balance * config.risk_per_trade
+
+    position_factor = Decimal('1') - (Decimal(str(open_positions_count)) * Decimal('0.1'))
+    position_factor = max(position_factor, Decimal('0.5'))
+
+    if balance < Decimal('100'):
+        size_percent = Decimal('0.03')
+    elif balance < Decimal('500'):
+        size_percent = Decimal('0.05')
+    elif balance < Decimal('2000'):
+        size_percent = Decimal('0.08')
+    elif balance < Decimal('10000'):
+        size_percent = Decimal('0.12')
+    else:
+        size_percent = Decimal('0.15')
+
+    trade_amount = min(risk_amount, balance * size_percent) * position_factor
+    trade_amount = max(trade_amount, min_trade_amount)
+
+    if trade_amount > balance * Decimal('0.95'):
+        trade_amount = balance * Decimal('0.95')
+
+    if trade_amount < min_trade_amount:
+        return Decimal('0'), Decimal('0')
+
+    quantity = (trade_amount / entry_price).quantize(Decimal('1E-8'), rounding=ROUND_DOWN)
+    return trade_amount, quantity
+
+
+def _legacy_profit_target(config):
+    """Reference Decimal implementation of PositionManager.generate_profit_target"""
+    is_winning_trade = random.uniform(0, 100) < float(config.win_rate)
+
+    if is_winning_trade:
+        if random.uniform(0, 100) < float(config.high_yield_chance):
+            profit_percent = Decimal(str(random.uniform(
+                float(config.high_profit_range[0]),
+                float(config.high_profit_range[1])
+            )))
+        else:
+            profit_percent = Decimal(str(random.triangular(
+                float(config.profit_range[0]),
+                float(config.profit_range[1]),
+                float(config.profit_range[0]) * 1.3
+            )))
+    else:
+        if random.uniform(0, 100) < float(config.high_loss_chance):
+            profit_percent = Decimal(str(random.uniform(
+                float(config.high_loss_range[0]),
+                float(config.high_loss_range[1])
+            )))
+        else:
+            profit_percent = Decimal(str(random.triangular(
+                float(config.loss_range[0]),
+                float(config.loss_range[1]),
+                float(config.loss_range[1]) * 0.7
+            )))
+
+    return profit_percent.quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+
+
+def _legacy_realistic_exit(entry_price, target_percent, side, duration_seconds):
+    """Reference Decimal implementation of MarketSimulator.calculate_realistic_exit"""
+    if side == 'buy':
+        exit_price = entry_price * (Decimal('1') + target_percent / Decimal('100'))
+    else:
+        exit_price = entry_price * (Decimal('1') - target_percent / Decimal('100'))
+
+    slippage = Decimal(str(random.uniform(0.0001, 0.0005)))
+    if target_percent > 0:
+        exit_price = exit_price * (Decimal('1') - slippage)
+    else:
+        exit_price = exit_price * (Decimal('1') + slippage)
+
+    noise_factor = Decimal(str(random.gauss(0, 0.0005 * (duration_seconds / 300))))
+    exit_price = exit_price * (Decimal('1') + noise_factor)
+
+    return exit_price.quantize(Decimal('1E-8'), rounding=ROUND_DOWN)
+
+
+def _legacy_profit_loss(entry_price, exit_price, quantity, side):
+    """Reference Decimal implementation of PositionManager.calculate_profit_loss"""
+    fee_percent = Decimal('0.002')
+
+    if side == 'buy':
+        raw_pl = (exit_price - entry_price) * quantity
+    else:
+        raw_pl = (entry_price - exit_price) * quantity
+
+    fees = entry_price * quantity * fee_percent
+    profit_loss = (raw_pl - fees).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+
+    if side == 'buy':
+        profit_loss_percent = ((exit_price - entry_price) / entry_price) * Decimal('100')
+    else:
+        profit_loss_percent = ((entry_price - exit_price) / entry_price) * Decimal('100')
+    profit_loss_percent -= (fee_percent * Decimal('100'))
+
+    return profit_loss, profit_loss_percent.quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+
+
+class Command(BaseCommand):
+    """Compare trades-per-second of the Decimal and fixed-point trade math"""
+
+    help = 'Microbenchmark simulator trade math (Decimal reference vs fixed-point ints)'
+
+    PRICES = [
+        Decimal('67000.00'), Decimal('3500.00'), Decimal('580.00'), Decimal('145.00'),
+        Decimal('0.52'), Decimal('0.38'), Decimal('0.085'), Decimal('28.50'),
+    ]
+    BALANCES = [Decimal('75.00'), Decimal('420.50'), Decimal('1800.00'), Decimal('9500.25'), Decimal('25000.00')]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trades', type=int, default=50000, help='Trades per implementation')
+        parser.add_argument('--bot-type', type=str, choices=['basic', 'premium', 'specialist'], default='premium')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed shared by both runs')
+
+    def handle(self, *args, **options):
+        trades = options['trades']
+        seed = options['seed']
+        config = BotConfigurationFactory.get_config(options['bot_type'])
+
+        random.seed(seed)
+        scenarios = [
+            (
+                random.choice(self.BALANCES),
+                random.choice(self.PRICES),
+                random.randint(0, 6),
+                random.choice(['buy', 'sell']),
+                random.randint(60, 2400),
+            )
+            for _ in range(trades)
+        ]
+
+        legacy_results, legacy_elapsed = self._run_legacy(config, scenarios, seed)
+        fixed_results, fixed_elapsed = self._run_fixed(config, scenarios, seed)
+
+        mismatches = sum(1 for legacy, fixed in zip(legacy_results, fixed_results) if legacy != fixed)
+        legacy_tps = trades / legacy_elapsed if legacy_elapsed > 0 else 0
+        fixed_tps = trades / fixed_elapsed if fixed_elapsed > 0 else 0
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n{"=" * 60}\n'
+                f'  Simulator Trade Math Benchmark ({options["bot_type"]})\n'
+                f'{"=" * 60}\n'
+                f'  Trades:              {trades}\n'
+                f'  Decimal:             {legacy_tps:,.0f} trades/s ({legacy_elapsed:.3f}s)\n'
+                f'  Fixed-point:         {fixed_tps:,.0f} trades/s ({fixed_elapsed:.3f}s)\n'
+                f'  Speedup:             {fixed_tps / legacy_tps if legacy_tps else 0:.2f}x\n'
+                f'  Result mismatches:   {mismatches}\n'
+                f'{"=" * 60}\n'
+            )
+        )
+
+    def _run_legacy(self, config, scenarios, seed):
+        """Size, exit and P/L per trade using the Decimal reference"""
+        random.seed(seed)
+        results = []
+        started = time.perf_counter()
+
+        for balance, entry_price, open_count, side, duration in scenarios:
+            _, quantity = _legacy_position_size(config, balance, entry_price, open_count)
+            target = _legacy_profit_target(config)
+            exit_price = _legacy_realistic_exit(entry_price, target, side, duration)
+            profit_loss, profit_loss_percent = _legacy_profit_loss(entry_price, exit_price, quantity, side)
+            results.append((quantity, exit_price, profit_loss, profit_loss_percent))
+
+        return results, time.perf_counter() - started
+
+    def _run_fixed(self, config, scenarios, seed):
+        """Size, exit and P/L per trade on fixed-point ints, Decimal only at the end"""
+        position_manager = PositionManager(config)
+        market = MarketSimulator({}, tick_prices={})
+        scenarios = [
+            (to_units(balance, MONEY_EXP), to_units(entry_price, PRICE_EXP), open_count, side, duration)
+            for balance, entry_price, open_count, side, duration in scenarios
+        ]
+
+        random.seed(seed)
+        results = []
+        started = time.perf_counter()
+
+        for balance_units, entry_units, open_count, side, duration in scenarios:
+            _, quantity_units = position_manager.position_size_units(balance_units, entry_units, open_count)
+            target_units = position_manager.generate_profit_target_units()
+            exit_units = market.realistic_exit_units(entry_units, target_units, side, duration)
+            profit_loss, profit_loss_percent = position_manager.profit_loss_units(
+                entry_units, exit_units, quantity_units, side
+            )
+            results.append((quantity_units, exit_units, profit_loss, profit_loss_percent))
+
+        elapsed = time.perf_counter() - started
+
+        # ORM boundary: convert to Decimal for comparison with the reference
+        results = [
+            (
+                from_units(quantity, PRICE_EXP),
+                from_units(exit_price, PRICE_EXP),
+                from_units(profit_loss, MONEY_EXP),
+                from_units(profit_loss_percent, PERCENT_EXP),
+            )
+            for quantity, exit_price, profit_loss, profit_loss_percent in results
+        ]
+        return results, elapsed
+
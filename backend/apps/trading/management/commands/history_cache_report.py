@@ -0,0 +1,59 @@
+"""
+Market history cache hit ratios, for tuning the refresh-ahead warmer
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+
+from apps.trading.cache_warmer import HistoryCacheWarmer
+
+
+class Command(BaseCommand):
+    """Print hit / stale / miss counts per window and the current hottest keys"""
+
+    help = 'Report market history cache hit ratios and the hottest keys (tune MARKET_WARMER_*)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--windows', type=int, default=24, help='Hourly windows to report (newest first)')
+        parser.add_argument('--top', type=int, default=10, help='Hottest keys to list')
+
+    def handle(self, *args, **options):
+        rows = HistoryCacheWarmer.report(options['windows'])
+        warmer = HistoryCacheWarmer(top_n=options['top'])
+
+        self.stdout.write(
+            f'{"Window (UTC)":17} {"Requests":>9} {"Hit":>7} {"Stale":>7} {"Miss":>6} '
+            f'{"Warmed":>7} {"Hit %":>7} {"Non-blocking %":>15}'
+        )
+        totals = {'requests': 0, 'hit': 0, 'stale': 0, 'miss': 0, 'warmed': 0}
+        for row in rows:
+            started = datetime.fromtimestamp(row['window_start'], tz=dt_timezone.utc).strftime('%Y-%m-%d %H:%M')
+            hit_ratio = f"{row['hit_ratio'] * 100:.1f}" if row['requests'] else '-'
+            non_blocking = f"{row['non_blocking_ratio'] * 100:.1f}" if row['requests'] else '-'
+            self.stdout.write(
+                f"{started:17} {row['requests']:>9} {row['hit']:>7} {row['stale']:>7} {row['miss']:>6} "
+                f"{row['warmed']:>7} {hit_ratio:>7} {non_blocking:>15}"
+            )
+            for key in totals:
+                totals[key] += row[key]
+
+        hit_ratio = totals['hit'] / totals['requests'] * 100 if totals['requests'] else 0.0
+        miss_ratio = totals['miss'] / totals['requests'] * 100 if totals['requests'] else 0.0
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n{"=" * 60}\n'
+                f'  Market History Cache\n'
+                f'{"=" * 60}\n'
+                f'  Requests:          {totals["requests"]}\n'
+                f'  Fresh hit ratio:   {hit_ratio:.1f}%\n'
+                f'  Blocking misses:   {totals["miss"]} ({miss_ratio:.1f}%)\n'
+                f'  Warmer refreshes:  {totals["warmed"]}\n'
+                f'  Budget per run:    {warmer.budget} (lead {warmer.lead:g}s, top {warmer.top_n})\n'
+                f'{"=" * 60}\n'
+            )
+        )
+
+        for symbol, interval, limit, requests in warmer.hottest():
+            self.stdout.write(f'  {symbol:12} {interval:4} limit {limit:<4} | Requests: {requests}')
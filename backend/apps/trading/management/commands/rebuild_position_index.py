@@ -0,0 +1,43 @@
+"""
+Reconcile the Redis open-position index with bot_trades
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from apps.trading.bot.close_scheduler import PositionCloseScheduler
+from apps.trading.bot.position_index import OpenPositionIndex
+
+
+class Command(BaseCommand):
+    """Rebuild the per-user open-position sorted sets from the database"""
+
+    help = 'Rebuild the Redis open-position index from bot_trades (run after a Redis flush or outage)'
+
+    def handle(self, *args, **options):
+        index = OpenPositionIndex()
+        scheduler = PositionCloseScheduler()
+        start_time = timezone.now()
+        scheduled = 0
+
+        try:
+            indexed = index.rebuild()
+            if scheduler.is_enabled():
+                scheduled = scheduler.rebuild()
+        except RedisError as e:
+            raise CommandError(f'Redis unavailable, index not rebuilt: {e}')
+
+        elapsed = (timezone.now() - start_time).total_seconds()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n{"=" * 60}\n'
+                f'  Open Position Index Rebuilt\n'
+                f'{"=" * 60}\n'
+                f'  Open positions indexed: {indexed}\n'
+                f'  Closes rescheduled:     {scheduled}\n'
+                f'  Time elapsed:           {elapsed:.2f}s\n'
+                f'{"=" * 60}\n'
+            )
+        )
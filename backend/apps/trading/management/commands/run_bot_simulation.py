@@ -26,6 +26,7 @@ class Command(BaseCommand):
         parser.add_argument('--stats', action='store_true', help='Show detailed statistics')
         parser.add_argument('--quiet', action='store_true', help='Minimal output')
         parser.add_argument('--bulk', action='store_true', help='Use bulk orchestrator (recommended for 100+ users)')
+        parser.add_argument('--seed', type=int, default=None, help='Seed per-user random generators (reproducible trade streams)')
 
     def handle(self, *args, **options):
         self.verbosity = options.get('verbosity', 1)
@@ -44,6 +45,7 @@ class Command(BaseCommand):
                     f'  Users: {users.count()}\n'
                     f'  Mode: {"BULK PROCESSING" if options.get("bulk") else "STANDARD"}\n'
                     f'  Batch Size: {options.get("batch_size", 200)}\n'
+                    f'  Seed: {options.get("seed") if options.get("seed") is not None else "random"}\n'
                     f'  Time: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}\n'
                     f'{"=" * 60}\n'
                 )
@@ -92,7 +94,11 @@ class Command(BaseCommand):
     def _run_bulk_simulation(self, users, options):
         """Run simulation using bulk orchestrator"""
         batch_size = options.get('batch_size', 200)
-        orchestrator = BulkSimulationOrchestrator(batch_size=batch_size)
+        orchestrator = BulkSimulationOrchestrator(
+            batch_size=batch_size,
+            trades_per_user=options.get('trades'),
+            seed=options.get('seed')
+        )
 
         return orchestrator.simulate_users(users)
 
@@ -101,7 +107,7 @@ class Command(BaseCommand):
         results = []
         for user in users:
             try:
-                simulator = TradingBotSimulator(user, user.bot_type)
+                simulator = TradingBotSimulator(user, user.bot_type, seed=options.get('seed'))
                 simulator.start_session()
 
                 trades_count = simulator.generate_multiple_trades(options.get('trades'))
@@ -0,0 +1,58 @@
+"""
+Long-running streaming ticker ingestion worker
+"""
+
+import asyncio
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.trading.ticker_stream import TickerStreamIngestor
+
+
+class Command(BaseCommand):
+    """Consume the Binance combined ticker stream and publish the coalesced ticker book to Redis"""
+
+    help = 'Run the streaming ticker ingestion worker (replaces 24hr REST polling for crypto/commodities)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', type=str, default=None, help='Combined stream base URL (default: BINANCE_STREAM_URL)')
+        parser.add_argument(
+            '--publish-interval', type=float, default=None,
+            help='Seconds between coalesced ticker book publishes (default: MARKET_STREAM_PUBLISH_INTERVAL)'
+        )
+        parser.add_argument('--symbols', type=str, default=None, help='Comma-separated Binance symbols (default: all configured)')
+
+    def handle(self, *args, **options):
+        symbols = None
+        if options['symbols']:
+            symbols = [symbol.strip() for symbol in options['symbols'].split(',') if symbol.strip()]
+
+        ingestor = TickerStreamIngestor(
+            symbols=symbols,
+            url=options['url'],
+            publish_interval=options['publish_interval'],
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n{"=" * 60}\n'
+                f'  Ticker Stream Ingestion\n'
+                f'  Stream: {ingestor.url}\n'
+                f'  Symbols: {len(ingestor.symbols)}\n'
+                f'  Publish interval: {ingestor.publish_interval}s\n'
+                f'  Time: {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}\n'
+                f'{"=" * 60}\n'
+            )
+        )
+
+        try:
+            asyncio.run(ingestor.run())
+        except KeyboardInterrupt:
+            ingestor.stop()
+
+        self.stdout.write(
+            f'Stopped: {ingestor.stats["messages"]} messages, '
+            f'{ingestor.stats["publishes"]} publishes, {ingestor.stats["reconnects"]} reconnects, '
+            f'{ingestor.stats["errors"]} errors'
+        )
@@ -0,0 +1,373 @@
+"""
+Single-broadcaster fan-out for MarketConsumer.
+
+One MarketBroadcaster runs per event loop (i.e. per Daphne process). Every
+BROADCAST_INTERVAL seconds it reads the market snapshot from Redis once,
+encodes each outgoing frame once and pushes the same text frame to every
+subscribed socket, instead of each connection running its own read/encode
+loop.
+
+Two protocols are served:
+    full   'market_update' with every asset on every tick (legacy clients)
+    delta  versioned: one 'market_snapshot' with every asset, then
+           'market_delta' frames carrying only changed price fields keyed
+           by asset id; static metadata (name, image, ...) is only resent
+           for assets whose metadata changed
+
+Sockets receive the whole universe unless they narrow it down with a
+selection of categories and/or symbols; unsubscribing a symbol whose
+category is still subscribed excludes just that symbol. Every asset is
+serialized once per tick and the fragments are pre-joined per category, so
+a selection's frame is assembled by string concatenation and shared by all
+sockets with the same selection.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+from datetime import datetime
+
+from .snapshots import AsyncSnapshotReader
+
+logger = logging.getLogger('apps.trading')
+
+_broadcasters = weakref.WeakKeyDictionary()
+
+PROTOCOL_FULL = 'full'
+PROTOCOL_DELTA = 'delta'
+
+CATEGORIES = ('crypto', 'stocks', 'forex', 'commodities')
+
+
+class MarketSlices:
+    """
+    Pre-serialized pieces of one list of assets (or delta entries): one
+    JSON fragment per asset id, plus the fragments joined per category.
+    """
+
+    def __init__(self, fragments, categories):
+        # fragments: {asset id: json}, categories: {asset id: category}
+        self.fragments = fragments
+        self.ids_by_category = {}
+        for asset_id in fragments:
+            self.ids_by_category.setdefault(categories.get(asset_id), []).append(asset_id)
+        self.by_category = {
+            category: ','.join(fragments[asset_id] for asset_id in asset_ids)
+            for category, asset_ids in self.ids_by_category.items()
+        }
+        self.everything = ','.join(fragments.values())
+
+    def join(self, selection, asset_ids, excluded_ids=frozenset()) -> str:
+        """
+        Comma-joined fragments for a selection (None = everything): its
+        categories without excluded_ids, plus asset_ids picked by symbol
+        """
+        if selection is None:
+            return self.everything
+
+        parts = []
+        for category in selection[0]:
+            category_ids = self.ids_by_category.get(category)
+            if not category_ids:
+                continue
+            if excluded_ids.isdisjoint(category_ids):
+                parts.append(self.by_category[category])
+            else:
+                parts.extend(self.fragments[asset_id] for asset_id in category_ids if asset_id not in excluded_ids)
+        parts.extend(self.fragments[asset_id] for asset_id in asset_ids if asset_id in self.fragments)
+        return ','.join(part for part in parts if part)
+
+
+class MarketBroadcaster:
+    BROADCAST_INTERVAL = 5  # seconds
+
+    # Fields that change tick to tick; everything else is static metadata
+    DYNAMIC_FIELDS = ('price', 'change_24h', 'change_percent_24h', 'volume')
+
+    def __init__(self):
+        # {consumer: (protocol, selection)}; selection is None (everything) or
+        # (categories, symbols, excluded symbols), frozensets of upper-cased symbols
+        self.subscribers = {}
+        self.reader = AsyncSnapshotReader()
+        self.assets = {}
+        self.version = 0
+        self._categories = {}
+        self._symbol_ids = {}
+        # Index of the previous tick: removed assets are resolved against it
+        self._previous_categories = {}
+        self._previous_symbol_ids = {}
+        self._asset_slices = None
+        self._timestamp = None
+        # Frames encoded this tick: {(kind, version, selection): text}
+        self._frames = {}
+        # Last tick: {'subscribers', 'assets', 'changed', 'frames', 'bytes', 'encode_ms', 'send_ms'}
+        self.last_tick = {}
+        self._task = None
+
+    async def subscribe(self, consumer, protocol: str = PROTOCOL_FULL, selection=None) -> None:
+        """Register (or re-register) a socket and send it its current view"""
+        # Send before registering so a tick can't deliver a delta ahead of its snapshot
+        self.subscribers.pop(consumer, None)
+        await self.send_current(consumer, protocol, selection)
+        self.subscribers[consumer] = (protocol, selection)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    def unsubscribe(self, consumer) -> None:
+        """Drop a socket; the loop stops with the last subscriber"""
+        self.subscribers.pop(consumer, None)
+
+        if not self.subscribers and self._task is not None and not self._task.done():
+            self._task.cancel()
+            self._task = None
+            self.assets = {}
+            self.version = 0
+            self._asset_slices = None
+            self._frames = {}
+
+    def subscription(self, consumer):
+        """(protocol, selection) a socket is registered with"""
+        return self.subscribers.get(consumer, (PROTOCOL_FULL, None))
+
+    async def send_current(self, consumer, protocol: str, selection) -> None:
+        """Last full frame (full protocol) or versioned snapshot (delta protocol) for a selection"""
+        if not self.assets:
+            return
+
+        if protocol == PROTOCOL_DELTA:
+            frame = self._frame('snapshot', selection, self._encode_snapshot)
+        else:
+            frame = self._frame('update', selection, self._encode_update)
+        await consumer.send(text_data=frame)
+
+    async def send_snapshot(self, consumer) -> None:
+        """Resend the versioned snapshot (client detected a version gap)"""
+        _, selection = self.subscription(consumer)
+        await self.send_current(consumer, PROTOCOL_DELTA, selection)
+
+    async def _run(self):
+        while self.subscribers:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Market WS] ❌ Broadcast error: {e}")
+
+            await asyncio.sleep(self.BROADCAST_INTERVAL)
+
+    def _diff(self, assets):
+        """(changes, added ids, removed ids) of assets against the previous tick"""
+        changes = {}
+        added = []
+
+        for asset_id, asset in assets.items():
+            previous = self.assets.get(asset_id)
+            if previous is None or any(
+                previous.get(field) != value
+                for field, value in asset.items()
+                if field not in self.DYNAMIC_FIELDS
+            ):
+                added.append(asset_id)
+                continue
+
+            changed = {
+                field: asset.get(field)
+                for field in self.DYNAMIC_FIELDS
+                if previous.get(field) != asset.get(field)
+            }
+            if changed:
+                changes[asset_id] = changed
+
+        removed = [asset_id for asset_id in self.assets if asset_id not in assets]
+        return changes, added, removed
+
+    def _index(self, cached_data):
+        """Serialize every asset once and index ids by category and symbol"""
+        assets = {}
+        fragments = {}
+        categories = {}
+        symbol_ids = {}
+
+        for asset in cached_data:
+            asset_id = asset.get('id', asset['symbol'])
+            assets[asset_id] = asset
+            fragments[asset_id] = json.dumps(asset)
+            categories[asset_id] = asset.get('category')
+            for name in (asset_id, asset.get('symbol'), asset.get('binance_id')):
+                if name:
+                    symbol_ids.setdefault(str(name).upper(), asset_id)
+
+        return assets, fragments, categories, symbol_ids
+
+    def _selected_ids(self, selection, previous=False):
+        """
+        (asset ids picked by symbol that the selection's categories don't
+        already cover, ids of excluded symbols) in this tick's index, or in
+        the previous tick's for assets removed since
+        """
+        if selection is None:
+            return [], frozenset()
+
+        symbol_ids = self._previous_symbol_ids if previous else self._symbol_ids
+        categories = self._previous_categories if previous else self._categories
+        selected_categories, symbols, excluded = selection
+
+        asset_ids = dict.fromkeys(symbol_ids[symbol] for symbol in symbols if symbol in symbol_ids)
+        picked = [asset_id for asset_id in asset_ids if categories.get(asset_id) not in selected_categories]
+        excluded_ids = frozenset(symbol_ids[symbol] for symbol in excluded if symbol in symbol_ids)
+        return picked, excluded_ids
+
+    def _frame(self, kind, selection, encoder, *args) -> str:
+        """Frame for a selection, encoded once per version and shared by all its sockets"""
+        key = (kind, self.version, selection)
+        frame = self._frames.get(key)
+        if frame is None:
+            frame = self._frames[key] = encoder(selection, *args)
+        return frame
+
+    def _encode_update(self, selection) -> str:
+        data = self._asset_slices.join(selection, *self._selected_ids(selection))
+        return (
+            f'{{"type": "market_update", "data": [{data}], '
+            f'"timestamp": {json.dumps(self._timestamp)}, "source": "cache"}}'
+        )
+
+    def _encode_snapshot(self, selection) -> str:
+        data = self._asset_slices.join(selection, *self._selected_ids(selection))
+        return (
+            f'{{"type": "market_snapshot", "version": {self.version}, "data": [{data}], '
+            f'"timestamp": {json.dumps(self._timestamp)}, "source": "cache"}}'
+        )
+
+    def _encode_delta(self, selection, base_version, delta_slices) -> str:
+        selected = self._selected_ids(selection)
+        parts = [
+            f'"type": "market_delta", "version": {self.version}, "base_version": {base_version}',
+            f'"changes": {{{delta_slices["changes"].join(selection, *selected)}}}',
+            f'"timestamp": {json.dumps(self._timestamp)}',
+        ]
+        added = delta_slices['added'].join(selection, *selected)
+        if added:
+            parts.append(f'"added": [{added}]')
+        # Removed assets are gone from this tick's index
+        removed = delta_slices['removed'].join(selection, *self._selected_ids(selection, previous=True))
+        if removed:
+            parts.append(f'"removed": [{removed}]')
+        return '{' + ', '.join(parts) + '}'
+
+    async def tick(self) -> None:
+        """Read the snapshot once, encode each frame once, send to every subscriber"""
+        cached_data = await self.reader.market_snapshot()
+        if not cached_data:
+            logger.warning("[Market WS] ⚠️ No cached data available, waiting for Celery task...")
+            return
+
+        encode_started = time.perf_counter()
+        assets, fragments, categories, symbol_ids = self._index(cached_data)
+        changes, added, removed = self._diff(assets)
+        base_version = self.version
+
+        self._timestamp = datetime.now().isoformat()
+        self._frames = {}
+        self._previous_categories = self._categories
+        self._previous_symbol_ids = self._symbol_ids
+        self._categories = categories
+        self._symbol_ids = symbol_ids
+        self._asset_slices = MarketSlices(fragments, categories)
+
+        delta_slices = None
+        if changes or added or removed:
+            self.version += 1
+            self.assets = assets
+            delta_slices = {
+                'changes': MarketSlices(
+                    {asset_id: f'{json.dumps(asset_id)}: {json.dumps(fields)}' for asset_id, fields in changes.items()},
+                    categories
+                ),
+                'added': MarketSlices({asset_id: fragments[asset_id] for asset_id in added}, categories),
+                'removed': MarketSlices({asset_id: json.dumps(asset_id) for asset_id in removed}, self._previous_categories),
+            }
+
+        outgoing = []
+        for consumer, (protocol, selection) in self.subscribers.items():
+            if protocol == PROTOCOL_FULL:
+                frame = self._frame('update', selection, self._encode_update)
+            elif base_version == 0:
+                # First tick of this broadcaster: delta sockets have no snapshot yet
+                frame = self._frame('snapshot', selection, self._encode_snapshot)
+            elif delta_slices is not None:
+                frame = self._frame('delta', selection, self._encode_delta, base_version, delta_slices)
+            else:
+                continue
+            outgoing.append((consumer, frame))
+        encode_ms = (time.perf_counter() - encode_started) * 1000
+
+        send_started = time.perf_counter()
+        results = await asyncio.gather(
+            *(consumer.send(text_data=frame) for consumer, frame in outgoing),
+            return_exceptions=True
+        )
+        send_ms = (time.perf_counter() - send_started) * 1000
+
+        for (consumer, _), result in zip(outgoing, results):
+            if isinstance(result, Exception):
+                self.subscribers.pop(consumer, None)
+
+        self.last_tick = {
+            'subscribers': len(outgoing),
+            'assets': len(cached_data),
+            'changed': len(changes) + len(added) + len(removed),
+            'frames': len(self._frames),
+            'bytes': sum(len(frame) for frame in self._frames.values()),
+            'encode_ms': round(encode_ms, 3),
+            'send_ms': round(send_ms, 3),
+        }
+        logger.info(
+            f"[Market WS] ✅ Broadcast v{self.version} ({self.last_tick['changed']} changed, "
+            f"{len(self._frames)} frames) to {len(outgoing)} sockets "
+            f"(encode {encode_ms:.2f}ms, send {send_ms:.2f}ms)"
+        )
+
+
+def apply_selection(current, categories=None, symbols=None, remove=False):
+    """
+    Apply a subscribe (or unsubscribe, remove=True) message to a selection.
+
+    Unsubscribing a symbol also excludes it from categories that stay
+    subscribed (e.g. BTC while crypto is selected); the exclusion holds
+    until the symbol itself is subscribed again, subscribing its category
+    does not lift it. Returns None when the result is every category with
+    nothing excluded.
+    """
+    categories = frozenset(category for category in (categories or []) if category in CATEGORIES)
+    symbols = frozenset(str(symbol).upper() for symbol in (symbols or []) if symbol)
+
+    if current is None:
+        # First subscribe narrows the universe down, first unsubscribe carves out of it
+        current = (frozenset(CATEGORIES) if remove else frozenset(), frozenset(), frozenset())
+    current_categories, current_symbols, current_excluded = current
+
+    if remove:
+        selection = (current_categories - categories, current_symbols - symbols, current_excluded | symbols)
+    else:
+        selection = (current_categories | categories, current_symbols | symbols, current_excluded - symbols)
+
+    if selection[0] == frozenset(CATEGORIES) and not selection[2]:
+        return None
+    return selection
+
+
+def get_market_broadcaster() -> MarketBroadcaster:
+    """Broadcaster for the running event loop (one per Daphne process)"""
+    loop = asyncio.get_running_loop()
+    broadcaster = _broadcasters.get(loop)
+
+    if broadcaster is None:
+        broadcaster = MarketBroadcaster()
+        _broadcasters[loop] = broadcaster
+
+    return broadcaster
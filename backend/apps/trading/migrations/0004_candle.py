@@ -0,0 +1,38 @@
+# Generated by Django 5.0.9 on 2026-10-17 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0003_bottrade_bot_trades_user_id_1ccfae_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Candle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(help_text='Canonical symbol (e.g., BTCUSDT, EUR/USD, AAPL)', max_length=30)),
+                ('interval', models.CharField(max_length=8)),
+                ('open_time', models.BigIntegerField(help_text='Candle open time, epoch milliseconds')),
+                ('open', models.FloatField()),
+                ('high', models.FloatField()),
+                ('low', models.FloatField()),
+                ('close', models.FloatField()),
+                ('volume', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Candle',
+                'verbose_name_plural': 'Candles',
+                'db_table': 'market_candles',
+                'ordering': ['symbol', 'interval', 'open_time'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='candle',
+            constraint=models.UniqueConstraint(fields=('symbol', 'interval', 'open_time'), name='market_candles_symbol_interval_time_uniq'),
+        ),
+    ]
@@ -0,0 +1,214 @@
+"""
+Cluster-consistent mock prices for stocks and commodities without a feed.
+
+All mock symbols are advanced together by a vectorized, correlated
+log-space random walk (one market factor per category plus idiosyncratic
+noise, with slow mean reversion to each symbol's anchor). The walk state
+lives in the cache (Redis), so every Celery worker and Daphne process
+serves the same prices and restarts continue where the walk left off.
+
+Ticks are wall-clock aligned (TICK_SECONDS). The category factors of tick
+N come from an RNG seeded with N, and each symbol's own shock is a hash of
+(symbol, N), independent of which other symbols the caller tracks. So a
+process catching up on missed ticks, or two processes advancing the same
+tick at once, compute identical prices. State updates are merged under a
+short cache lock, so callers registering different symbol sets never drop
+each other's symbols.
+"""
+
+import logging
+import random
+import time
+import zlib
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class MockMarketEngine:
+    """
+    State in STATE_CACHE_KEY:
+        {
+            'tick': int,              # wall-clock tick the prices belong to
+            'day': int,               # UTC day the opens belong to
+            'keys': ['category:SYMBOL', ...],
+            'prices': [float, ...],
+            'opens': [float, ...],    # price at the start of the UTC day
+            'volumes': [float, ...],
+        }
+    """
+
+    STATE_CACHE_KEY = 'market_data:mock_tick:v1'
+    STATE_TTL = 7 * DAY_SECONDS
+    LOCK_CACHE_KEY = 'market_data:mock_tick:lock'
+    LOCK_TTL = 5
+    LOCK_WAIT = 1.0
+    LOCK_POLL_INTERVAL = 0.02
+    TICK_SECONDS = 20
+    # Longer gaps (e.g. nothing ran overnight) are bridged in this many steps
+    MAX_CATCHUP_TICKS = 360
+    # Mean reversion toward the anchor: half-life of ~30 days
+    REVERSION_PER_TICK = np.log(2) / (30 * DAY_SECONDS / TICK_SECONDS)
+
+    CATEGORY_PARAMS = {
+        'stocks': {'daily_vol': 0.02, 'correlation': 0.5, 'price_range': (100, 500), 'volume_range': (1_000_000, 50_000_000)},
+        'commodities': {'daily_vol': 0.015, 'correlation': 0.3, 'price_range': (50, 100), 'volume_range': (500_000, 10_000_000)},
+    }
+
+    def __init__(self, assets: Iterable[Tuple[str, str]]):
+        """assets: (category, symbol) pairs this caller needs quotes for"""
+        self.keys = sorted({f'{category}:{symbol}' for category, symbol in assets})
+
+    @staticmethod
+    def key(category: str, symbol: str) -> str:
+        return f'{category}:{symbol}'
+
+    @classmethod
+    def _anchor(cls, key: str) -> Tuple[float, float]:
+        """Deterministic (anchor price, base volume) of a symbol"""
+        category = key.split(':', 1)[0]
+        params = cls.CATEGORY_PARAMS.get(category, cls.CATEGORY_PARAMS['stocks'])
+        rng = random.Random(zlib.crc32(key.encode()))
+        return rng.uniform(*params['price_range']), rng.uniform(*params['volume_range'])
+
+    def quotes(self, now: float = None) -> Dict[str, Dict[str, float]]:
+        """{'category:SYMBOL': {'price', 'change_24h', 'change_percent_24h', 'volume'}} for the current tick"""
+        now = time.time() if now is None else now
+        state = self.advance(int(now // self.TICK_SECONDS))
+
+        result = {}
+        for key, price, open_price, volume in zip(state['keys'], state['prices'], state['opens'], state['volumes']):
+            change = price - open_price
+            result[key] = {
+                'price': price,
+                'change_24h': change,
+                'change_percent_24h': change / open_price * 100 if open_price else 0.0,
+                'volume': volume,
+            }
+        return result
+
+    def advance(self, tick: int) -> Dict:
+        """Bring the shared state up to tick (no-op if another process already did)"""
+        state = cache.get(self.STATE_CACHE_KEY) or {}
+        if self._covers(state, tick):
+            return state
+
+        # Read-merge-write under a lock so concurrent callers keep each other's symbols
+        deadline = time.monotonic() + self.LOCK_WAIT
+        while not cache.add(self.LOCK_CACHE_KEY, 1, self.LOCK_TTL):
+            if time.monotonic() >= deadline:
+                # Holder is stuck: serve this tick without persisting it
+                logger.warning(f"Mock market lock busy for {self.LOCK_WAIT}s, advancing tick {tick} without saving")
+                return self._advanced(state, tick)
+            time.sleep(self.LOCK_POLL_INTERVAL)
+            state = cache.get(self.STATE_CACHE_KEY) or {}
+            if self._covers(state, tick):
+                return state
+
+        try:
+            state = cache.get(self.STATE_CACHE_KEY) or {}
+            if self._covers(state, tick):
+                return state
+            state = self._advanced(state, tick)
+            cache.set(self.STATE_CACHE_KEY, state, self.STATE_TTL)
+        finally:
+            cache.delete(self.LOCK_CACHE_KEY)
+
+        logger.debug(f"Advanced mock market to tick {tick} ({len(state['keys'])} symbols)")
+        return state
+
+    def _covers(self, state: Dict, tick: int) -> bool:
+        return state.get('tick') == tick and set(self.keys).issubset(state.get('keys', []))
+
+    def _advanced(self, state: Dict, tick: int) -> Dict:
+        """New state at tick: state's symbols plus ours, walked forward from state's tick"""
+        known = state.get('keys', [])
+        if state.get('tick', tick) > tick:
+            # Another process is already past this tick: just add our symbols to it
+            tick = state['tick']
+
+        # Never drop symbols registered by other callers
+        keys = sorted(set(known) | set(self.keys))
+        previous = dict(zip(known, zip(state.get('prices', []), state.get('opens', []), state.get('volumes', []))))
+
+        anchors = np.array([self._anchor(key)[0] for key in keys])
+        base_volumes = np.array([self._anchor(key)[1] for key in keys])
+        prices = np.array([previous[key][0] if key in previous else anchors[i] for i, key in enumerate(keys)])
+        opens = np.array([previous[key][1] if key in previous else prices[i] for i, key in enumerate(keys)])
+
+        last_tick = state.get('tick', tick)
+        steps = min(max(tick - last_tick, 0), self.MAX_CATCHUP_TICKS)
+        if steps:
+            prices = self._walk(keys, prices, anchors, tick, steps)
+
+        day = tick * self.TICK_SECONDS // DAY_SECONDS
+        if state.get('day') != day:
+            opens = prices.copy()
+
+        volumes = base_volumes * np.exp(0.1 * self._symbol_normals(keys, np.array([tick]), stream=1)[0])
+
+        return {
+            'tick': tick,
+            'day': day,
+            'keys': keys,
+            'prices': prices.tolist(),
+            'opens': opens.tolist(),
+            'volumes': volumes.tolist(),
+        }
+
+    @staticmethod
+    def _symbol_normals(keys, ticks: np.ndarray, stream: int = 0) -> np.ndarray:
+        """
+        Standard normals of shape (len(ticks), len(keys)), each a pure function
+        of (key, tick, stream): splitmix64 hashes fed through Box-Muller.
+        """
+        seeds = np.array([zlib.crc32(key.encode()) for key in keys], dtype=np.uint64)
+        counters = (
+            (ticks.astype(np.uint64)[:, None] << np.uint64(34))
+            ^ (seeds[None, :] << np.uint64(2))
+            ^ np.uint64(stream)
+        )
+
+        with np.errstate(over='ignore'):
+            first = _splitmix64(counters)
+            second = _splitmix64(first)
+
+        # 53-bit uniforms in (0, 1]
+        scale = 2.0 ** -53
+        u1 = ((first >> np.uint64(11)).astype(np.float64) + 1.0) * scale
+        u2 = (second >> np.uint64(11)).astype(np.float64) * scale
+        return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+    def _walk(self, keys, prices, anchors, tick: int, steps: int) -> np.ndarray:
+        """Apply `steps` correlated log-space steps ending at tick, all symbols at once"""
+        categories = [key.split(':', 1)[0] for key in keys]
+        params = [self.CATEGORY_PARAMS.get(category, self.CATEGORY_PARAMS['stocks']) for category in categories]
+        sigma = np.array([p['daily_vol'] for p in params]) * np.sqrt(self.TICK_SECONDS / DAY_SECONDS)
+        beta = np.sqrt(np.array([p['correlation'] for p in params]))
+
+        category_names = sorted(self.CATEGORY_PARAMS)
+        category_index = np.array([category_names.index(c) if c in category_names else 0 for c in categories])
+
+        step_ticks = np.arange(tick - steps + 1, tick + 1)
+        idiosyncratic = self._symbol_normals(keys, step_ticks)
+
+        log_deviation = np.log(prices / anchors)
+        for step, step_tick in enumerate(step_ticks):
+            factors = np.random.default_rng([int(step_tick), 0]).standard_normal(len(category_names))
+            shocks = beta * factors[category_index] + np.sqrt(1 - beta ** 2) * idiosyncratic[step]
+            log_deviation = (1 - self.REVERSION_PER_TICK) * log_deviation + sigma * shocks - 0.5 * sigma ** 2
+
+        return anchors * np.exp(log_deviation)
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer over uint64 arrays (wrapping arithmetic)"""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
@@ -125,4 +125,37 @@ class TradingSession(models.Model):
     def win_rate(self):
         if self.total_trades > 0:
             return (self.winning_trades / self.total_trades) * 100
-        return 0.0
\ No newline at end of file
+        return 0.0
+
+class Candle(models.Model):
+    """
+    Local OHLCV candle store behind MarketHistoryView.
+    One row per (canonical symbol, interval, open time); see candle_store.py.
+    """
+    symbol = models.CharField(
+        max_length=30,
+        help_text='Canonical symbol (e.g., BTCUSDT, EUR/USD, AAPL)'
+    )
+    interval = models.CharField(max_length=8)
+    open_time = models.BigIntegerField(help_text='Candle open time, epoch milliseconds')
+    open = models.FloatField()
+    high = models.FloatField()
+    low = models.FloatField()
+    close = models.FloatField()
+    volume = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'market_candles'
+        verbose_name = 'Candle'
+        verbose_name_plural = 'Candles'
+        ordering = ['symbol', 'interval', 'open_time']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['symbol', 'interval', 'open_time'],
+                name='market_candles_symbol_interval_time_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} {self.interval} @ {self.open_time}"
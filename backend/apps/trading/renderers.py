@@ -0,0 +1,52 @@
+"""
+Candle response formats for MarketHistoryView, negotiated via the Accept header:
+
+    application/json                       chart payload {'ohlc': [...], 'volume': [...]} (default)
+    application/vnd.bemo.candles+json      columnar JSON (parallel arrays)
+    application/vnd.bemo.candles           packed binary (see utils.candles)
+
+Views return CandleColumns on success; anything else (error dicts) is
+rendered as plain JSON by every renderer.
+"""
+
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .utils.candles import CandleColumns
+
+
+class CandleJSONRenderer(JSONRenderer):
+    """Original per-candle JSON payload"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, CandleColumns):
+            data = data.to_chart()
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class ColumnarCandleJSONRenderer(JSONRenderer):
+    media_type = 'application/vnd.bemo.candles+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, CandleColumns):
+            data = data.to_columnar()
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class BinaryCandleRenderer(BaseRenderer):
+    media_type = 'application/vnd.bemo.candles'
+    format = 'candles'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, CandleColumns):
+            return data.pack()
+
+        # Errors stay readable; clients check the status code before decoding
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return json.dumps(data).encode()
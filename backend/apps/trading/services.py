@@ -1,35 +1,72 @@
 import requests
 import json
-import aiohttp
+import asyncio
 import random
+import time
+import struct
 from decimal import Decimal
+from urllib.parse import unquote
 from django.core.cache import cache
 import hashlib
 from django.conf import settings
 import logging
+from redis.exceptions import LockError, RedisError
 
-logger = logging.getLogger('apps.trading')
+from .utils.candles import CandleColumns
+from .utils.http_client import get_http_session, get_async_http_session
+from .utils.redis_client import get_redis_connection, get_async_redis_connection
+from .utils.upstream import ProviderUnavailable, provider_guard
+from .mock_market import MockMarketEngine
+from .snapshots import MARKET_SNAPSHOT_KEY, STREAM_TICKERS_KEY
 
+logger = logging.getLogger('apps.trading')
 
 class MarketDataService:
     BINANCE_BASE_URL = "https://api.binance.com/api/v3"
     TWELVE_DATA_BASE_URL = "https://api.twelvedata.com"
+    CRYPTO_QUOTE_SUFFIXES = ('USDT', 'BUSD')
+
+    # Single-flight: one upstream fetch per cache key across all workers
+    FETCH_LOCK_PREFIX = 'market_data:fetch_lock:'
+    FETCH_LOCK_TTL = 20  # > upstream request timeout
+    FETCH_WAIT_TIMEOUT = 16
+    FETCH_WAIT_INTERVAL = 0.1
+
+    # Last good copy of every cached payload, served while a provider is down
+    STALE_CACHE_SUFFIX = ':stale'
+    STALE_CACHE_TTL = 24 * 60 * 60
+
+    # Stale-while-revalidate: one queued background refresh per cache key
+    REFRESH_MARKER_PREFIX = 'market_data:refresh_queued:'
+    REFRESH_MARKER_TTL = 30  # also throttles retries while refreshes fail
+
+    # Binance request weights (see utils.upstream)
+    BINANCE_KLINES_WEIGHT = 2
+    BINANCE_24HR_ALL_WEIGHT = 80
 
     def __init__(self):
         self.twelve_data_key = getattr(settings, 'TWELVE_DATA_API_KEY', None)
+        # 'hit', 'stale' or 'miss' for the last fetch_market_data() call
+        self.last_cache_status = None
         self.cache_ttl = getattr(settings, 'MARKET_DATA_CACHE_TTL', {
             'crypto': 60,
             'forex': 300,
             'stocks': 300,
             'commodities': 300,
         })
+        self.hard_ttl = getattr(settings, 'MARKET_DATA_CACHE_HARD_TTL', {
+            'crypto': 900,
+            'forex': 3600,
+            'stocks': 3600,
+            'commodities': 3600,
+        })
 
     def _generate_cache_key(self, symbol: str, interval: str, asset_type: str) -> str:
-        key_string = f"market_data:{asset_type}:{symbol}:{interval}"
+        key_string = f"market_data:v3:{asset_type}:{symbol}:{interval}"
         return hashlib.md5(key_string.encode()).hexdigest()
 
     def get_asset_type(self, symbol: str) -> str:
-        symbol_upper = symbol.upper()
+        symbol_upper = unquote(symbol).upper()
 
         crypto_symbols = {
             'BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'DOGE', 'ADA', 'AVAX', 'TRX', 'LINK',
@@ -76,67 +113,87 @@ class MarketDataService:
 
         return 'stocks'
 
-    def fetch_crypto_klines(self, symbol: str, interval: str, limit: int):
-        try:
-            binance_symbol = symbol.upper().replace('/', '').replace('-', '').replace(' ', '')
+    def canonical_symbol(self, symbol: str, asset_type: str) -> str:
+        """
+        One spelling per instrument so 'btc', 'BTC/USDT', 'btc-usdt' and
+        'BTCUSDT' share a cache entry (and the Binance symbol)
+        """
+        clean_symbol = unquote(symbol).upper().strip()
 
-            if not binance_symbol.endswith('USDT') and not binance_symbol.endswith('BUSD'):
-                binance_symbol = f"{binance_symbol}USDT"
+        if asset_type == 'crypto':
+            clean_symbol = clean_symbol.replace('/', '').replace('-', '').replace(' ', '')
+            if not clean_symbol.endswith(self.CRYPTO_QUOTE_SUFFIXES):
+                clean_symbol = f"{clean_symbol}USDT"
+            return clean_symbol
 
-            url = f"{self.BINANCE_BASE_URL}/klines"
-            params = {
-                'symbol': binance_symbol,
-                'interval': interval,
-                'limit': limit
-            }
+        return clean_symbol.replace(' ', '')
+
+    @staticmethod
+    def _parse_binance_klines(klines):
+        return CandleColumns.from_binance(klines)
+
+    @staticmethod
+    def _parse_twelve_data_values(values):
+        return CandleColumns.from_twelve_data(values)
+
+    def _binance_klines_request(self, symbol: str, interval: str, limit: int):
+        binance_symbol = self.canonical_symbol(symbol, 'crypto')
+        url = f"{self.BINANCE_BASE_URL}/klines"
+        params = {
+            'symbol': binance_symbol,
+            'interval': interval,
+            'limit': limit
+        }
+        return binance_symbol, url, params
+
+    def _twelve_data_request(self, symbol: str, interval: str, outputsize: int):
+        interval_map = {
+            '1h': '1h',
+            '4h': '4h',
+            '1d': '1day',
+            '1w': '1week'
+        }
+
+        url = f"{self.TWELVE_DATA_BASE_URL}/time_series"
+        params = {
+            'symbol': symbol,
+            'interval': interval_map.get(interval, '1day'),
+            'outputsize': outputsize,
+            'apikey': self.twelve_data_key,
+            'format': 'JSON'
+        }
+        return url, params
+
+    def fetch_crypto_klines(self, symbol: str, interval: str, limit: int):
+        try:
+            binance_symbol, url, params = self._binance_klines_request(symbol, interval, limit)
 
             logger.info(f"🔄 Binance API Request - Symbol: {binance_symbol}, Interval: {interval}, Limit: {limit}")
             logger.debug(f"Full URL: {url} | Params: {params}")
 
-            response = requests.get(url, params=params, timeout=15)
+            with provider_guard('binance').guarded(weight=self.BINANCE_KLINES_WEIGHT):
+                response = get_http_session().get(url, params=params, timeout=15)
 
-            logger.info(f"📡 Binance API Response - Status: {response.status_code}, Symbol: {binance_symbol}")
-            logger.debug(f"Response Headers: {dict(response.headers)}")
+                logger.info(f"📡 Binance API Response - Status: {response.status_code}, Symbol: {binance_symbol}")
+                logger.debug(f"Response Headers: {dict(response.headers)}")
 
-            if response.status_code == 400:
-                error_msg = response.json() if response.text else "Unknown error"
-                logger.error(f"❌ Invalid symbol or parameters: {binance_symbol} | Error: {error_msg}")
-                return None
+                if response.status_code == 400:
+                    error_msg = response.json() if response.text else "Unknown error"
+                    logger.error(f"❌ Invalid symbol or parameters: {binance_symbol} | Error: {error_msg}")
+                    return None
 
-            response.raise_for_status()
-            klines = response.json()
+                response.raise_for_status()
+                klines = response.json()
             logger.info(f"✅ Binance API Success - Received {len(klines)} candles for {binance_symbol}")
 
             if not klines:
                 return None
 
-            ohlc_data = []
-            volume_data = []
-
-            for kline in klines:
-                open_time = kline[0]
-                open_price = float(kline[1])
-                high_price = float(kline[2])
-                low_price = float(kline[3])
-                close_price = float(kline[4])
-                volume = float(kline[5])
-
-                ohlc_data.append({
-                    'time': open_time,
-                    'open': open_price,
-                    'high': high_price,
-                    'low': low_price,
-                    'close': close_price
-                })
-
-                volume_data.append({
-                    'time': open_time,
-                    'value': volume,
-                    'color': '#22c55e' if close_price >= open_price else '#ef4444'
-                })
-
-            return {'ohlc': ohlc_data, 'volume': volume_data}
+            return self._parse_binance_klines(klines)
 
+        except ProviderUnavailable as e:
+            logger.warning(f"🔴 Binance API skipped for {symbol}: {e}")
+            return None
         except requests.exceptions.Timeout:
             logger.error(f"⏱️ Binance API Timeout for {symbol} - Request took longer than 15 seconds")
             return None
@@ -152,103 +209,220 @@ class MarketDataService:
 
     def fetch_twelve_data_klines(self, symbol: str, interval: str, outputsize: int):
         if not self.twelve_data_key:
-            print("Twelve Data API key not configured")
+            logger.warning("⚠️ Twelve Data API key not configured")
             return None
 
         try:
-            interval_map = {
-                '1h': '1h',
-                '4h': '4h',
-                '1d': '1day',
-                '1w': '1week'
-            }
-
-            twelve_interval = interval_map.get(interval, '1day')
+            url, params = self._twelve_data_request(symbol, interval, outputsize)
 
-            url = f"{self.TWELVE_DATA_BASE_URL}/time_series"
-            params = {
-                'symbol': symbol,
-                'interval': twelve_interval,
-                'outputsize': outputsize,
-                'apikey': self.twelve_data_key,
-                'format': 'JSON'
-            }
-
-            response = requests.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
+            with provider_guard('twelvedata').guarded():
+                response = get_http_session().get(url, params=params, timeout=15)
+                response.raise_for_status()
+                data = response.json()
 
             if 'values' not in data or not data['values']:
-                print(f"No values in Twelve Data response for {symbol}")
+                logger.warning(f"⚠️ No values in Twelve Data response for {symbol}")
                 return None
 
-            ohlc_data = []
-            volume_data = []
-
-            for item in reversed(data['values']):
-                import dateutil.parser
-                dt = dateutil.parser.parse(item['datetime'])
-                timestamp = int(dt.timestamp() * 1000)
-
-                open_price = float(item['open'])
-                high_price = float(item['high'])
-                low_price = float(item['low'])
-                close_price = float(item['close'])
-                volume = float(item.get('volume', 0))
-
-                ohlc_data.append({
-                    'time': timestamp,
-                    'open': open_price,
-                    'high': high_price,
-                    'low': low_price,
-                    'close': close_price
-                })
-
-                volume_data.append({
-                    'time': timestamp,
-                    'value': volume,
-                    'color': '#22c55e' if close_price >= open_price else '#ef4444'
-                })
-
-            return {'ohlc': ohlc_data, 'volume': volume_data}
+            return self._parse_twelve_data_values(data['values'])
 
+        except ProviderUnavailable as e:
+            logger.warning(f"🔴 Twelve Data API skipped for {symbol}: {e}")
+            return None
         except Exception as e:
-            print(f"Twelve Data API error: {e}")
+            logger.error(f"❌ Twelve Data API error for {symbol}: {e}")
             return None
 
+    def fetch_upstream_klines(self, symbol: str, asset_type: str, interval: str, limit: int):
+        if asset_type == 'crypto':
+            return self.fetch_crypto_klines(symbol, interval, limit)
+
+        data = self.fetch_twelve_data_klines(symbol, interval, limit)
+        if not data:
+            logger.warning(f"⚠️ Twelve Data failed for {symbol}, trying Binance as fallback")
+            data = self.fetch_crypto_klines(symbol, interval, limit)
+        return data
+
+    # Klines cache entry: fresh_until (float64) followed by CandleColumns.pack()
+    _ENTRY_HEADER = struct.Struct('<d')
+
+    @staticmethod
+    def _unpack(cached_data):
+        """(CandleColumns, fresh_until) of a klines cache entry"""
+        (fresh_until,) = MarketDataService._ENTRY_HEADER.unpack_from(cached_data)
+        return CandleColumns.unpack(cached_data[MarketDataService._ENTRY_HEADER.size:]), fresh_until
+
+    def _cache_market_data(self, cache_key: str, symbol: str, asset_type: str, data):
+        """
+        Cache a fetch result: fresh for the soft TTL, kept (and served stale)
+        until the hard TTL. On failure return the stale copy instead (or None).
+        """
+        if data:
+            ttl = self.cache_ttl.get(asset_type, 300)
+            packed = data.pack()
+            entry = self._ENTRY_HEADER.pack(time.time() + ttl) + packed
+            cache.set(cache_key, entry, self.hard_ttl.get(asset_type, ttl * 10))
+            cache.set(f"{cache_key}{self.STALE_CACHE_SUFFIX}", packed, self.STALE_CACHE_TTL)
+            logger.info(f"✅ Cached {symbol} for {ttl} seconds")
+            return data
+
+        stale = cache.get(f"{cache_key}{self.STALE_CACHE_SUFFIX}")
+        if stale:
+            logger.warning(f"🕰️ Upstream unavailable for {symbol}, serving stale data")
+            return CandleColumns.unpack(stale)
+
+        logger.error(f"❌ Failed to fetch market data for {symbol} from all sources")
+        return None
+
     def fetch_market_data(self, symbol: str, interval: str = '1d', limit: int = 90):
+        """
+        Cached klines for symbol. Past the soft TTL the cached data is still
+        returned immediately and one background refresh is queued; only a
+        miss (hard TTL expired) blocks. On a miss only one caller across all
+        workers (Redis lock per cache key) hits the upstream API; concurrent
+        misses for the same key wait for its result in the cache.
+        """
         asset_type = self.get_asset_type(symbol)
-        cache_key = self._generate_cache_key(symbol, interval, asset_type)
+        cache_key = self._generate_cache_key(self.canonical_symbol(symbol, asset_type), interval, asset_type)
 
         logger.info(f"📊 Market Data Request - Symbol: {symbol}, Type: {asset_type}, Interval: {interval}")
 
         cached_data = cache.get(cache_key)
         if cached_data:
-            logger.info(f"💾 Cache HIT for {symbol} {interval}")
-            return json.loads(cached_data)
+            data, fresh_until = self._unpack(cached_data)
+            if time.time() < fresh_until:
+                logger.info(f"💾 Cache HIT for {symbol} {interval}")
+                self.last_cache_status = 'hit'
+            else:
+                logger.info(f"♻️ Cache STALE for {symbol} {interval} - serving cached data, refreshing in background")
+                self.last_cache_status = 'stale'
+                self.queue_refresh(cache_key, symbol, interval, limit)
+            return data
 
         logger.info(f"🔍 Cache MISS for {symbol} {interval} - fetching from API")
+        self.last_cache_status = 'miss'
 
-        data = None
+        lock = self._fetch_lock(cache_key)
+        acquired = self._try_acquire(lock)
 
-        if asset_type == 'crypto':
-            data = self.fetch_crypto_klines(symbol, interval, limit)
-        else:
-            data = self.fetch_twelve_data_klines(symbol, interval, limit)
+        if acquired is False:
+            finished, data = self._wait_for_fetch(lock, cache_key)
+            if finished:
+                # The holder's fetch failed: serve the stale copy like the holder does
+                return data if data else self._cache_market_data(cache_key, symbol, asset_type, None)
+            logger.warning(f"⚠️ Waited {self.FETCH_WAIT_TIMEOUT}s for in-flight fetch of {symbol}, fetching directly")
 
-            if not data:
-                logger.warning(f"⚠️ Twelve Data failed for {symbol}, trying Binance as fallback")
-                data = self.fetch_crypto_klines(symbol, interval, limit)
+        try:
+            data = self.fetch_upstream_klines(symbol, asset_type, interval, limit)
+            data = self._cache_market_data(cache_key, symbol, asset_type, data)
+        finally:
+            if acquired:
+                self._release(lock)
 
-        if data:
-            ttl = self.cache_ttl.get(asset_type, 300)
-            cache.set(cache_key, json.dumps(data), ttl)
-            logger.info(f"✅ Cached {symbol} for {ttl} seconds")
-        else:
-            logger.error(f"❌ Failed to fetch market data for {symbol} from all sources")
+        return data
+
+    def queue_refresh(self, cache_key: str, symbol: str, interval: str, limit: int) -> bool:
+        """Queue a background refresh of a stale entry unless one is already queued for the key"""
+        from .tasks import refresh_market_data
+
+        marker_key = f"{self.REFRESH_MARKER_PREFIX}{cache_key}"
+        if not cache.add(marker_key, 1, self.REFRESH_MARKER_TTL):
+            return False
 
+        try:
+            refresh_market_data.delay(symbol, interval, limit)
+        except Exception as e:
+            cache.delete(marker_key)
+            logger.warning(f"⚠️ Could not queue refresh of {symbol} {interval}, serving stale data: {e}")
+            return False
+        return True
+
+    def cache_fresh_for(self, symbol: str, interval: str):
+        """Seconds until a klines entry goes stale (<= 0 once stale, None if not cached)"""
+        asset_type = self.get_asset_type(symbol)
+        cached_data = cache.get(self._generate_cache_key(self.canonical_symbol(symbol, asset_type), interval, asset_type))
+        if not cached_data:
+            return None
+        return self._unpack(cached_data)[1] - time.time()
+
+    def refresh_market_data(self, symbol: str, interval: str = '1d', limit: int = 90):
+        """Background revalidation of one klines entry (queued by fetch_market_data, or by the cache warmer)"""
+        asset_type = self.get_asset_type(symbol)
+        cache_key = self._generate_cache_key(self.canonical_symbol(symbol, asset_type), interval, asset_type)
+
+        lock = self._fetch_lock(cache_key)
+        acquired = self._try_acquire(lock)
+        if acquired is False:
+            # A blocking miss is fetching this key right now
+            return None
+
+        try:
+            data = self.fetch_upstream_klines(symbol, asset_type, interval, limit)
+            if not data:
+                # Keep serving the cached entry; the queue marker throttles the retry
+                logger.warning(f"⚠️ Background refresh of {symbol} {interval} failed - still serving stale data")
+                return None
+            self._cache_market_data(cache_key, symbol, asset_type, data)
+        finally:
+            if acquired:
+                self._release(lock)
+
+        cache.delete(f"{self.REFRESH_MARKER_PREFIX}{cache_key}")
         return data
 
+    # ---------- Single-flight helpers ----------
+
+    def _fetch_lock(self, cache_key: str):
+        """Redis lock guarding the upstream fetch for cache_key (None if Redis is unavailable)"""
+        try:
+            return get_redis_connection().lock(
+                f"{self.FETCH_LOCK_PREFIX}{cache_key}",
+                timeout=self.FETCH_LOCK_TTL,
+            )
+        except RedisError as e:
+            logger.warning(f"⚠️ Fetch lock unavailable, fetching without coalescing: {e}")
+            return None
+
+    @staticmethod
+    def _try_acquire(lock):
+        """True if acquired, False if another caller holds it, None if Redis is unavailable"""
+        if lock is None:
+            return None
+        try:
+            return bool(lock.acquire(blocking=False))
+        except RedisError as e:
+            logger.warning(f"⚠️ Fetch lock unavailable, fetching without coalescing: {e}")
+            return None
+
+    @staticmethod
+    def _release(lock) -> None:
+        try:
+            lock.release()
+        except (LockError, RedisError):
+            # Expired or Redis went away: the next miss simply takes a new lock
+            pass
+
+    def _wait_for_fetch(self, lock, cache_key: str):
+        """
+        Wait for the lock holder's result.
+        Returns (finished, data): finished is False on timeout, data is None
+        when the holder's fetch failed.
+        """
+        deadline = time.monotonic() + self.FETCH_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(self.FETCH_WAIT_INTERVAL)
+
+            cached_data = cache.get(cache_key)
+            if cached_data:
+                return True, self._unpack(cached_data)[0]
+            try:
+                if not lock.locked():
+                    return True, None
+            except RedisError:
+                return False, None
+
+        return False, None
+
     # ========== WebSocket Market Data Caching Methods ==========
 
     # Asset definitions for WebSocket market data
@@ -455,31 +629,73 @@ class MarketDataService:
 
     WS_CACHE_KEY = 'market_data:websocket:all'
     WS_CACHE_TTL = 20  # seconds
-    _ticker_cache = {}  # For mock data generation
+    WS_REFRESH_STATS_KEY = 'market_data:websocket:refresh_stats'
+    WS_BINANCE_STALE_KEY = 'market_data:websocket:binance_24hr:stale'
+    WS_FOREX_STALE_KEY = 'market_data:websocket:forex_rates:stale'
 
     @staticmethod
     async def fetch_and_cache_all_markets():
         """Fetch data from all sources and store in Redis for WebSocket consumption"""
         try:
-            async with aiohttp.ClientSession() as session:
-                # Fetch from various sources in parallel
-                crypto_data = await MarketDataService._fetch_binance_for_ws(session)
+            started = time.perf_counter()
+            session = get_async_http_session()
+
+            # Live book of the ticker stream worker when it is running, else one
+            # Binance 24hr download per refresh, shared by crypto and commodities
+            binance_tickers = await MarketDataService._read_stream_tickers()
+            binance_source = 'stream' if binance_tickers else 'rest'
+            if binance_tickers:
+                binance_bytes = 0
                 forex_data = await MarketDataService._fetch_forex_for_ws(session)
-                commodities_data = await MarketDataService._fetch_commodities_for_ws(session)
-                stocks_data = MarketDataService._generate_mock_stocks_for_ws()
-
-                # Combine all data
-                all_assets = crypto_data + forex_data + commodities_data + stocks_data
-
-                # Cache the combined data
-                cache.set(
-                    MarketDataService.WS_CACHE_KEY,
-                    all_assets,
-                    MarketDataService.WS_CACHE_TTL
+            else:
+                (binance_tickers, binance_bytes), forex_data = await asyncio.gather(
+                    MarketDataService._fetch_binance_24hr_index(session),
+                    MarketDataService._fetch_forex_for_ws(session),
                 )
+            fetched = time.perf_counter()
+
+            mock_quotes = MarketDataService._mock_quotes()
+            crypto_data = MarketDataService._build_crypto_for_ws(binance_tickers)
+            commodities_data = MarketDataService._build_commodities_for_ws(binance_tickers, mock_quotes)
+            stocks_data = MarketDataService._generate_mock_stocks_for_ws(mock_quotes)
+
+            # Combine all data
+            all_assets = crypto_data + forex_data + commodities_data + stocks_data
+            built = time.perf_counter()
+
+            # Cache the combined data
+            cache.set(
+                MarketDataService.WS_CACHE_KEY,
+                all_assets,
+                MarketDataService.WS_CACHE_TTL
+            )
+
+            # JSON copy for the async consumers' non-blocking reader
+            try:
+                await get_async_redis_connection().set(
+                    MARKET_SNAPSHOT_KEY,
+                    json.dumps(all_assets),
+                    ex=MarketDataService.WS_CACHE_TTL
+                )
+            except RedisError as e:
+                logger.warning(f"[MarketDataService] Market snapshot write failed: {e}")
+
+            stats = {
+                'assets': len(all_assets),
+                'binance_source': binance_source,
+                'binance_tickers': len(binance_tickers),
+                'binance_bytes': binance_bytes,
+                'fetch_ms': round((fetched - started) * 1000, 1),
+                'build_ms': round((built - fetched) * 1000, 2),
+                'total_ms': round((time.perf_counter() - started) * 1000, 1),
+            }
+            cache.set(MarketDataService.WS_REFRESH_STATS_KEY, stats, None)
 
-                logger.info(f"[MarketDataService] Cached {len(all_assets)} WebSocket market assets")
-                return all_assets
+            logger.info(
+                f"[MarketDataService] Cached {len(all_assets)} WebSocket market assets "
+                f"(fetch {stats['fetch_ms']}ms, build {stats['build_ms']}ms, total {stats['total_ms']}ms)"
+            )
+            return all_assets
 
         except Exception as e:
             logger.error(f"[MarketDataService] Error fetching market data: {e}")
@@ -487,84 +703,117 @@ class MarketDataService:
             return cache.get(MarketDataService.WS_CACHE_KEY, [])
 
     @staticmethod
-    async def _fetch_binance_for_ws(session):
-        """Fetch cryptocurrency data from Binance API for WebSocket"""
+    async def _read_stream_tickers():
+        """{symbol: ticker} published by the run_ticker_stream worker ({} if not running)"""
+        try:
+            raw = await get_async_redis_connection().get(STREAM_TICKERS_KEY)
+        except RedisError as e:
+            logger.warning(f"[MarketDataService] Stream ticker read failed: {e}")
+            return {}
+        return json.loads(raw) if raw else {}
+
+    @staticmethod
+    async def _fetch_binance_24hr_index(session):
+        """
+        Download Binance /ticker/24hr once and index it by symbol, keeping
+        only the configured crypto and commodity symbols.
+        Returns ({symbol: ticker}, response bytes); the last good index and 0
+        bytes on error ({} if there is none).
+        """
         binance_url = "https://api.binance.com/api/v3/ticker/24hr"
+        wanted = MarketDataService._ws_binance_symbols()
 
         try:
-            async with session.get(binance_url, timeout=10) as response:
-                response.raise_for_status()
-                data = await response.json()
-
-                # Create lookup dict for crypto assets
-                crypto_lookup = {asset['binance_id']: asset for asset in MarketDataService.CRYPTO_ASSETS}
-
-                # Filter and format crypto data - fetch all configured assets
-                crypto_assets = []
-                crypto_symbols = [asset['binance_id'] for asset in MarketDataService.CRYPTO_ASSETS]
-
-                for symbol in crypto_symbols:
-                    ticker = next((t for t in data if t['symbol'] == symbol), None)
-                    if ticker:
-                        # Get asset config for name and image
-                        asset_config = crypto_lookup.get(symbol, {})
-                        crypto_assets.append({
-                            'id': asset_config.get('id', symbol.replace('USDT', '').lower()),
-                            'symbol': symbol.replace('USDT', ''),
-                            'name': asset_config.get('name', symbol.replace('USDT', '')),
-                            'category': 'crypto',
-                            'price': float(ticker.get('lastPrice', 0)),
-                            'change_percent_24h': float(ticker.get('priceChangePercent', 0)),
-                            'change_24h': float(ticker.get('priceChange', 0)),
-                            'volume': float(ticker.get('volume', 0)),
-                            'image': asset_config.get('image', ''),
-                        })
-
-                return crypto_assets
+            async with provider_guard('binance').aguarded(weight=MarketDataService.BINANCE_24HR_ALL_WEIGHT):
+                async with session.get(binance_url, timeout=10) as response:
+                    response.raise_for_status()
+                    body = await response.read()
+
+                tickers = {
+                    ticker['symbol']: ticker
+                    for ticker in json.loads(body)
+                    if ticker.get('symbol') in wanted
+                }
+
+            await cache.aset(MarketDataService.WS_BINANCE_STALE_KEY, tickers, MarketDataService.STALE_CACHE_TTL)
+            return tickers, len(body)
 
         except Exception as e:
-            logger.error(f"[MarketDataService] Error fetching Binance data: {e}")
-            return []
+            logger.error(f"[MarketDataService] Error fetching Binance data, serving last good tickers: {e}")
+            return await cache.aget(MarketDataService.WS_BINANCE_STALE_KEY) or {}, 0
+
+    @staticmethod
+    def _ws_binance_symbols():
+        """Binance symbols the WebSocket snapshot needs (crypto + commodities)"""
+        return frozenset(
+            [asset['binance_id'] for asset in MarketDataService.CRYPTO_ASSETS]
+            + [commodity['binance_id'] for commodity in MarketDataService.COMMODITIES_MAP if 'binance_id' in commodity]
+        )
+
+    @staticmethod
+    def _build_crypto_for_ws(tickers):
+        """Crypto assets for WebSocket from the shared 24hr ticker index"""
+        crypto_assets = []
+
+        for asset_config in MarketDataService.CRYPTO_ASSETS:
+            symbol = asset_config['binance_id']
+            ticker = tickers.get(symbol)
+            if ticker:
+                crypto_assets.append({
+                    'id': asset_config.get('id', symbol.replace('USDT', '').lower()),
+                    'symbol': symbol.replace('USDT', ''),
+                    'name': asset_config.get('name', symbol.replace('USDT', '')),
+                    'category': 'crypto',
+                    'price': float(ticker.get('lastPrice', 0)),
+                    'change_percent_24h': float(ticker.get('priceChangePercent', 0)),
+                    'change_24h': float(ticker.get('priceChange', 0)),
+                    'volume': float(ticker.get('volume', 0)),
+                    'image': asset_config.get('image', ''),
+                })
+
+        return crypto_assets
 
     @staticmethod
     async def _fetch_forex_for_ws(session):
-        """Fetch forex data from exchange rate API for WebSocket"""
+        """Fetch forex data from exchange rate API for WebSocket (last good rates on error)"""
         forex_url = "https://api.exchangerate-api.com/v4/latest/USD"
 
         try:
-            async with session.get(forex_url, timeout=10) as response:
-                response.raise_for_status()
-                data = await response.json()
-                rates = data.get('rates', {})
-
-                # Process all configured forex pairs
-                forex_assets = []
-
-                for forex_config in MarketDataService.FOREX_MAP:
-                    price = MarketDataService._calculate_forex_price_ws(
-                        forex_config['base'],
-                        forex_config['quote'],
-                        rates
-                    )
-
-                    if price > 0:
-                        forex_assets.append({
-                            'id': forex_config['id'],
-                            'symbol': forex_config['symbol'],
-                            'name': forex_config.get('name', forex_config['symbol']),
-                            'category': 'forex',
-                            'price': float(price),
-                            'change_percent_24h': float(random.uniform(-1.0, 1.0)),
-                            'change_24h': 0,
-                            'volume': 0,
-                            'image': forex_config.get('image', '🌐'),
-                        })
-
-                return forex_assets
+            async with provider_guard('exchangerate').aguarded():
+                async with session.get(forex_url, timeout=10) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+            rates = data.get('rates', {})
+            await cache.aset(MarketDataService.WS_FOREX_STALE_KEY, rates, MarketDataService.STALE_CACHE_TTL)
 
         except Exception as e:
-            logger.error(f"[MarketDataService] Error fetching forex data: {e}")
-            return []
+            logger.error(f"[MarketDataService] Error fetching forex data, serving last good rates: {e}")
+            rates = await cache.aget(MarketDataService.WS_FOREX_STALE_KEY) or {}
+
+        # Process all configured forex pairs
+        forex_assets = []
+
+        for forex_config in MarketDataService.FOREX_MAP:
+            price = MarketDataService._calculate_forex_price_ws(
+                forex_config['base'],
+                forex_config['quote'],
+                rates
+            )
+
+            if price > 0:
+                forex_assets.append({
+                    'id': forex_config['id'],
+                    'symbol': forex_config['symbol'],
+                    'name': forex_config.get('name', forex_config['symbol']),
+                    'category': 'forex',
+                    'price': float(price),
+                    'change_percent_24h': float(random.uniform(-1.0, 1.0)),
+                    'change_24h': 0,
+                    'volume': 0,
+                    'image': forex_config.get('image', '🌐'),
+                })
+
+        return forex_assets
 
     @staticmethod
     def _calculate_forex_price_ws(base_currency: str, quote_currency: str, rates: dict) -> float:
@@ -585,96 +834,93 @@ class MarketDataService:
             return 0.0
 
     @staticmethod
-    async def _fetch_commodities_for_ws(session):
-        """Fetch commodities data - mix of real data from Binance and mock data"""
+    def _build_commodities_for_ws(tickers, mock_quotes):
+        """Commodities for WebSocket - Binance tickers where listed, mock data otherwise"""
         commodities_data = []
-        binance_url = "https://api.binance.com/api/v3/ticker/24hr"
-
-        try:
-            # Fetch Binance data for gold and silver
-            async with session.get(binance_url, timeout=10) as response:
-                response.raise_for_status()
-                binance_data = await response.json()
-
-                # Process each commodity
-                for commodity in MarketDataService.COMMODITIES_MAP:
-                    if 'binance_id' in commodity:
-                        # Try to get from binance_data
-                        ticker = next((t for t in binance_data if t.get('symbol') == commodity['binance_id']), None)
-                        if ticker:
-                            commodities_data.append({
-                                'id': commodity['id'],
-                                'symbol': commodity['symbol'],
-                                'name': commodity['name'],
-                                'category': 'commodities',
-                                'price': float(ticker.get('lastPrice', 0)),
-                                'change_percent_24h': float(ticker.get('priceChangePercent', 0)),
-                                'change_24h': float(ticker.get('priceChange', 0)),
-                                'volume': float(ticker.get('volume', 0)),
-                                'image': commodity.get('image', '📊'),
-                            })
-                        else:
-                            # Fallback to mock if not found
-                            commodities_data.append(MarketDataService._generate_mock_commodity(commodity))
-                    else:
-                        # Generate mock data for other commodities
-                        commodities_data.append(MarketDataService._generate_mock_commodity(commodity))
 
-        except Exception as e:
-            logger.error(f"[MarketDataService] Error fetching commodities: {e}")
-            # Return mock data for all commodities on error
-            for commodity in MarketDataService.COMMODITIES_MAP:
-                commodities_data.append(MarketDataService._generate_mock_commodity(commodity))
+        for commodity in MarketDataService.COMMODITIES_MAP:
+            ticker = tickers.get(commodity.get('binance_id'))
+            if ticker:
+                commodities_data.append(MarketDataService._commodity_from_ticker(commodity, ticker))
+            else:
+                # Not listed on Binance (or Binance unavailable): mock
+                commodities_data.append(MarketDataService._generate_mock_commodity(commodity, mock_quotes))
 
         return commodities_data
 
     @staticmethod
-    def _generate_mock_commodity(commodity):
-        """Generate mock data for a single commodity"""
-        last_price = MarketDataService._ticker_cache.get(commodity['symbol'], random.uniform(50, 100))
-        change_percent = random.uniform(-2.5, 2.5)
-        new_price = last_price * (1 + change_percent / 100)
-        MarketDataService._ticker_cache[commodity['symbol']] = new_price
-
+    def _commodity_from_ticker(commodity, ticker):
+        """WebSocket commodity asset from a Binance 24hr ticker"""
         return {
             'id': commodity['id'],
             'symbol': commodity['symbol'],
             'name': commodity['name'],
             'category': 'commodities',
-            'price': float(new_price),
-            'change_percent_24h': float(change_percent),
-            'change_24h': 0,
-            'volume': float(random.uniform(500_000, 10_000_000)),
+            'price': float(ticker.get('lastPrice', 0)),
+            'change_percent_24h': float(ticker.get('priceChangePercent', 0)),
+            'change_24h': float(ticker.get('priceChange', 0)),
+            'volume': float(ticker.get('volume', 0)),
             'image': commodity.get('image', '📊'),
         }
 
     @staticmethod
-    def _generate_mock_stocks_for_ws():
-        """Generate mock stock data for WebSocket"""
-        stock_data = []
+    def merge_stream_tickers(assets, tickers):
+        """
+        WebSocket assets with crypto and Binance-listed commodities replaced
+        by the ticker stream book (see ticker_stream); other assets as they are
+        """
+        streamed = {asset['id']: asset for asset in MarketDataService._build_crypto_for_ws(tickers)}
+        for commodity in MarketDataService.COMMODITIES_MAP:
+            ticker = tickers.get(commodity.get('binance_id'))
+            if ticker:
+                streamed[commodity['id']] = MarketDataService._commodity_from_ticker(commodity, ticker)
+
+        merged = [streamed.pop(asset.get('id'), asset) for asset in assets]
+        merged.extend(streamed.values())
+        return merged
 
-        # Create lookup dict for stocks
-        stock_lookup = {stock['symbol']: stock for stock in MarketDataService.STOCKS_MAP}
+    @staticmethod
+    def _mock_quotes():
+        """Current shared mock quotes for every stock and commodity (see MockMarketEngine)"""
+        assets = [('stocks', stock['symbol']) for stock in MarketDataService.STOCKS_MAP]
+        assets += [('commodities', commodity['symbol']) for commodity in MarketDataService.COMMODITIES_MAP]
+        return MockMarketEngine(assets).quotes()
+
+    @staticmethod
+    def _generate_mock_commodity(commodity, quotes):
+        """Mock data for a single commodity from the shared mock quotes"""
+        quote = quotes[f"commodities:{commodity['symbol']}"]
 
-        for symbol in stock_lookup.keys():
-            last_price = MarketDataService._ticker_cache.get(symbol, random.uniform(100, 500))
-            change_percent = random.uniform(-3.5, 3.5)
-            new_price = last_price * (1 + change_percent / 100)
+        return {
+            'id': commodity['id'],
+            'symbol': commodity['symbol'],
+            'name': commodity['name'],
+            'category': 'commodities',
+            'price': float(quote['price']),
+            'change_percent_24h': float(quote['change_percent_24h']),
+            'change_24h': float(quote['change_24h']),
+            'volume': float(quote['volume']),
+            'image': commodity.get('image', '📊'),
+        }
 
-            MarketDataService._ticker_cache[symbol] = new_price
+    @staticmethod
+    def _generate_mock_stocks_for_ws(quotes):
+        """Mock stock data for WebSocket from the shared mock quotes"""
+        stock_data = []
 
-            # Get stock config for name and image
-            stock_config = stock_lookup.get(symbol, {})
+        for stock_config in MarketDataService.STOCKS_MAP:
+            symbol = stock_config['symbol']
+            quote = quotes[f'stocks:{symbol}']
 
             stock_data.append({
                 'id': stock_config.get('id', symbol.lower()),
                 'symbol': symbol,
                 'name': stock_config.get('name', symbol),
                 'category': 'stocks',
-                'price': float(new_price),
-                'change_percent_24h': float(change_percent),
-                'change_24h': 0,
-                'volume': float(random.uniform(1_000_000, 50_000_000)),
+                'price': float(quote['price']),
+                'change_percent_24h': float(quote['change_percent_24h']),
+                'change_24h': float(quote['change_24h']),
+                'volume': float(quote['volume']),
                 'image': stock_config.get('image', '📈'),
             })
 
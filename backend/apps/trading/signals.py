@@ -0,0 +1,27 @@
+"""
+Keep the BalanceConsumer snapshot in step with balance changes saved
+through the ORM (admin edits, deposits, bot purchases, ...)
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .snapshots import clear_balance_snapshot, write_balance_snapshots
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_balance_snapshot(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'balance' not in update_fields:
+        return
+
+    user_id = instance.pk
+    balance = instance.balance
+    if isinstance(balance, Decimal):
+        transaction.on_commit(lambda: write_balance_snapshots({user_id: balance}))
+    else:
+        # Saved as an expression (F() etc.): the value is only known to the DB
+        transaction.on_commit(lambda: clear_balance_snapshot(user_id))
@@ -0,0 +1,106 @@
+"""
+Non-blocking snapshot reads for the async consumers.
+
+Snapshots are stored as plain JSON strings in Redis and read through the
+pooled async client, so a Redis latency spike only delays the coroutine
+waiting on it instead of stalling every socket of the Daphne process (the
+Django cache API is synchronous). Writers are sync code (Celery tasks,
+views) and use the sync client.
+
+Balance snapshots are written by the simulator after each run and by a
+post_save receiver on User (see signals), so every balance change made
+through the ORM replaces the snapshot once its transaction commits.
+
+    market_data:websocket:all:json   market asset list (MarketConsumer)
+    market_data:stream:tickers       Binance ticker book of run_ticker_stream,
+                                     overlaid on the asset list when read
+    balance:snapshot:{user_id}       latest balance per user (BalanceConsumer)
+"""
+
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from redis.exceptions import RedisError
+
+from .utils.redis_client import get_async_redis_connection, get_redis_connection
+
+logger = logging.getLogger('apps.trading')
+
+MARKET_SNAPSHOT_KEY = 'market_data:websocket:all:json'
+STREAM_TICKERS_KEY = 'market_data:stream:tickers'
+BALANCE_SNAPSHOT_PREFIX = 'balance:snapshot:'
+BALANCE_SNAPSHOT_TTL = 24 * 60 * 60
+
+
+def balance_snapshot_key(user_id) -> str:
+    return f'{BALANCE_SNAPSHOT_PREFIX}{user_id}'
+
+
+def write_balance_snapshots(balances) -> None:
+    """Store {user_id: balance} in one pipelined round-trip"""
+    if not balances:
+        return
+
+    try:
+        pipe = get_redis_connection().pipeline(transaction=False)
+        for user_id, balance in balances.items():
+            pipe.set(balance_snapshot_key(user_id), str(balance), ex=BALANCE_SNAPSHOT_TTL)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"⚠️ Balance snapshot write failed: {e}")
+
+
+def clear_balance_snapshot(user_id) -> None:
+    """Drop a user's snapshot so the next read falls back to the database"""
+    try:
+        get_redis_connection().delete(balance_snapshot_key(user_id))
+    except RedisError as e:
+        logger.warning(f"⚠️ Balance snapshot clear failed: {e}")
+
+
+class AsyncSnapshotReader:
+    """Shared by MarketConsumer (via MarketBroadcaster) and BalanceConsumer"""
+
+    # Upper bound on one snapshot read; a slower Redis just skips this read
+    READ_TIMEOUT = 2.0
+
+    async def _get(self, key):
+        return await asyncio.wait_for(get_async_redis_connection().get(key), self.READ_TIMEOUT)
+
+    async def market_snapshot(self):
+        """
+        Market asset list with the ticker stream book (when the worker runs)
+        overlaid, or None when Redis is unavailable / too slow. Falls back to
+        the Django cache entry (read in a worker thread) while the JSON
+        snapshot has not been written yet.
+        """
+        from .services import MarketDataService
+
+        try:
+            raw, raw_tickers = await asyncio.gather(self._get(MARKET_SNAPSHOT_KEY), self._get(STREAM_TICKERS_KEY))
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            logger.warning(f"[Market WS] ⚠️ Snapshot read failed: {e!r}")
+            return None
+
+        if raw is not None:
+            assets = json.loads(raw)
+        else:
+            assets = await sync_to_async(MarketDataService.get_cached_websocket_data, thread_sensitive=False)()
+
+        if not raw_tickers:
+            return assets
+        try:
+            return MarketDataService.merge_stream_tickers(assets or [], json.loads(raw_tickers))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"[Market WS] ⚠️ Ignoring unreadable ticker stream book: {e!r}")
+            return assets
+
+    async def balance(self, user_id):
+        """Latest balance string for a user, or None when there is no snapshot"""
+        try:
+            return await self._get(balance_snapshot_key(user_id))
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            logger.warning(f"[Balance WS] ⚠️ Balance snapshot read failed: {e!r}")
+            return None
@@ -1,26 +1,51 @@
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
+from django.core.cache import cache
 from apps.accounts.models import User
-from .bot.simulator import TradingBotSimulator
+from .bot.simulator import TradingBotSimulator, BulkSimulationOrchestrator, MarketSimulator
+from .bot.price_engine import PricePathEngine
+from .cache_warmer import HistoryCacheWarmer
+from .candle_store import CandleStore
 from .services import MarketDataService
 import asyncio
 import logging
+import time
+import uuid
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task
-def run_bot_simulation():
-    """
-    Dispatcher task: Spawns independent worker tasks for each user with bot enabled.
-    This ensures each account has its own isolated worker/task.
-    """
-    users = User.objects.filter(
+def _get_bot_users():
+    """Users eligible for bot simulation"""
+    return User.objects.filter(
         is_active=True,
         bot_type__in=['basic', 'premium', 'specialist'],
         is_bot_enabled=True  # Only run for users with bot enabled
     )
 
+
+def get_user_shard(user_id, shard_count: int) -> int:
+    """Map a user ID onto a stable shard index"""
+    return uuid.UUID(str(user_id)).int % shard_count
+
+
+@shared_task
+def run_bot_simulation(mode=None, shard_count=None):
+    """
+    Dispatcher task for the per-minute bot simulation.
+
+    Modes (BOT_SIMULATION_MODE setting, overridable per call):
+    - 'per_user': spawns an independent worker task for each user with bot enabled
+    - 'sharded': spawns a fixed number of shard tasks, each simulating its
+      slice of users in one process via BulkSimulationOrchestrator
+    """
+    mode = mode or getattr(settings, 'BOT_SIMULATION_MODE', 'per_user')
+    if mode == 'sharded':
+        return _dispatch_shards(shard_count or getattr(settings, 'BOT_SIMULATION_SHARD_COUNT', 8))
+
+    users = _get_bot_users()
+
     spawned_tasks = []
     for user in users:
         try:
@@ -42,13 +67,104 @@ def run_bot_simulation():
 
     logger.info(f"Spawned {len(spawned_tasks)} independent bot worker tasks")
     return {
+        'mode': 'per_user',
+        'spawned_count': len(spawned_tasks),
+        'tasks': spawned_tasks
+    }
+
+
+def split_user_shards(shard_count: int):
+    """Eligible user IDs (as strings) grouped by shard, from a single query"""
+    shards = [[] for _ in range(shard_count)]
+    for user_id in _get_bot_users().values_list('id', flat=True):
+        shards[get_user_shard(user_id, shard_count)].append(str(user_id))
+    return shards
+
+
+def _dispatch_shards(shard_count: int):
+    """Load eligible users once and spawn one simulate_shard task per non-empty shard"""
+    shard_count = max(int(shard_count), 1)
+
+    spawned_tasks = []
+    for shard_index, user_ids in enumerate(split_user_shards(shard_count)):
+        if not user_ids:
+            continue
+        try:
+            task = simulate_shard.delay(shard_index, shard_count, user_ids)
+            spawned_tasks.append({'shard': shard_index, 'users': len(user_ids), 'task_id': task.id})
+        except Exception as e:
+            logger.exception(f"Error spawning shard {shard_index}/{shard_count}: {e}")
+            spawned_tasks.append({'shard': shard_index, 'error': str(e)})
+
+    logger.info(f"Spawned {len(spawned_tasks)} bot shard tasks")
+    return {
+        'mode': 'sharded',
+        'shard_count': shard_count,
         'spawned_count': len(spawned_tasks),
         'tasks': spawned_tasks
     }
 
 
 @shared_task
-def simulate_for_user(user_id, trades_count=1):
+def simulate_shard(shard_index, shard_count, user_ids=None, batch_size=None):
+    """
+    Run simulation for the users of one shard.
+    All users share one price snapshot and one DB connection, and are
+    persisted in bulk per chunk by BulkSimulationOrchestrator.
+
+    Args:
+        shard_index: Index of this shard (0 <= shard_index < shard_count)
+        shard_count: Total number of shards
+        user_ids: This shard's user IDs, split once by the dispatcher
+            (loaded and split here when called directly)
+        batch_size: Users per bulk chunk (default: BOT_SIMULATION_BATCH_SIZE)
+    """
+    started = time.monotonic()
+
+    try:
+        if user_ids is None:
+            user_ids = split_user_shards(shard_count)[shard_index]
+        load_seconds = time.monotonic() - started
+
+        orchestrator = BulkSimulationOrchestrator(
+            batch_size=batch_size or getattr(settings, 'BOT_SIMULATION_BATCH_SIZE', 200)
+        )
+        results = orchestrator.simulate_user_ids(user_ids)
+        elapsed = time.monotonic() - started
+
+        closed_count = sum(r['positions_closed'] for r in results)
+        generated_count = sum(r['trades_generated'] for r in results)
+
+        logger.info(
+            f"✅ Bot shard {shard_index}/{shard_count} complete: {len(results)} users, "
+            f"Closed {closed_count}, Generated {generated_count} in {elapsed:.2f}s"
+        )
+
+        return {
+            'success': True,
+            'shard': shard_index,
+            'shard_count': shard_count,
+            'users': len(results),
+            'closed_positions': closed_count,
+            'new_trades': generated_count,
+            'load_seconds': round(load_seconds, 3),
+            'elapsed_seconds': round(elapsed, 3),
+            'users_per_second': round(len(results) / elapsed, 2) if elapsed > 0 else 0,
+        }
+
+    except Exception as e:
+        logger.exception(f"❌ Error in simulate_shard {shard_index}/{shard_count}: {e}")
+        return {
+            'success': False,
+            'shard': shard_index,
+            'shard_count': shard_count,
+            'elapsed_seconds': round(time.monotonic() - started, 3),
+            'error': str(e)
+        }
+
+
+@shared_task
+def simulate_for_user(user_id, trades_count=1, seed=None):
     """
     Run simulation for a specific user (independent worker task)
     Optimized: Generates exactly 1 trade per run for better performance
@@ -56,6 +172,7 @@ def simulate_for_user(user_id, trades_count=1):
     Args:
         user_id: UUID of the user
         trades_count: Number of trades to generate (default: 1)
+        seed: Seed for the user's random generator (reproducible runs)
     """
     logger.info(f"Starting independent bot worker for user_id: {user_id}")
 
@@ -81,7 +198,7 @@ def simulate_for_user(user_id, trades_count=1):
             }
 
         # Create simulator
-        simulator = TradingBotSimulator(user, user.bot_type)
+        simulator = TradingBotSimulator(user, user.bot_type, seed=seed)
         simulator.start_session()
 
         if not simulator.session:
@@ -138,59 +255,77 @@ def simulate_for_user(user_id, trades_count=1):
 
 
 @shared_task
-def close_stale_positions():
+def close_stale_positions(max_age_minutes=60, batch_size=None):
     """
     Close positions that have been open too long
     Runs periodically to prevent positions from staying open indefinitely
+
+    Set-based: stale positions are loaded with their users in chunks, exit
+    against one shared price snapshot and each chunk is written in one
+    atomic batch (see BulkSimulationOrchestrator.close_stale_positions).
     """
-    from .models import BotTrade
-    from django.utils import timezone
     from datetime import timedelta
 
-    # Get positions open for more than 1 hour
-    stale_time = timezone.now() - timedelta(hours=1)
-    stale_positions = BotTrade.objects.filter(
-        is_open=True,
-        opened_at__lt=stale_time
+    started = time.monotonic()
+    stale_time = timezone.now() - timedelta(minutes=max_age_minutes)
+
+    orchestrator = BulkSimulationOrchestrator(
+        batch_size=batch_size or getattr(settings, 'BOT_SIMULATION_BATCH_SIZE', 200)
     )
+    result = orchestrator.close_stale_positions(stale_time)
+    elapsed = time.monotonic() - started
 
-    closed_count = 0
-    for position in stale_positions:
-        try:
-            user = position.user
+    logger.info(f"✅ Closed {result['closed']} stale positions in {result['chunks']} chunks ({elapsed:.2f}s)")
 
-            # Skip if bot is disabled for this user
-            if not user.is_bot_enabled:
-                continue
+    return {
+        'closed_count': result['closed'],
+        'chunks': result['chunks'],
+        'elapsed_seconds': round(elapsed, 3),
+        'positions_per_second': round(result['closed'] / elapsed, 2) if elapsed > 0 else 0,
+        'timestamp': timezone.now().isoformat()
+    }
 
-            simulator = TradingBotSimulator(user, user.bot_type)
 
-            # Generate exit price
-            from decimal import Decimal
-            import random
-            profit_target = Decimal(str(random.uniform(-2.0, 3.0)))
+@shared_task(name='trading.close_due_positions')
+def close_due_positions(batch_size=None):
+    """
+    Close-timer worker: closes every position whose scheduled close deadline
+    has passed, in bulk batches (BOT_CLOSE_SCHEDULER_ENABLED only).
+    """
+    from .bot.close_scheduler import PositionCloseScheduler
 
-            duration_seconds = int((timezone.now() - position.opened_at).total_seconds())
-            exit_price = simulator.market.calculate_realistic_exit(
-                position.entry_price,
-                profit_target,
-                position.side,
-                duration_seconds
-            )
+    if not PositionCloseScheduler.is_enabled():
+        return {'enabled': False}
 
-            if exit_price <= 0:
-                exit_price = position.entry_price * Decimal('0.99')
+    started = time.monotonic()
+    orchestrator = BulkSimulationOrchestrator(
+        batch_size=batch_size or getattr(settings, 'BOT_SIMULATION_BATCH_SIZE', 200)
+    )
+    result = orchestrator.close_due_positions()
+    elapsed = time.monotonic() - started
 
-            if simulator.close_position(position, exit_price, timezone.now()):
-                closed_count += 1
+    if result['closed']:
+        logger.info(f"✅ Closed {result['closed']} due positions in {result['batches']} batches ({elapsed:.2f}s)")
+
+    result.update({
+        'enabled': True,
+        'pending': orchestrator.close_scheduler.pending(),
+        'elapsed_seconds': round(elapsed, 3),
+    })
+    return result
 
-        except Exception as e:
-            logger.error(f"Error closing stale position {position.id}: {e}")
-            continue
 
+@shared_task(name='trading.advance_price_tick')
+def advance_price_tick():
+    """
+    Advance the shared bot price path by one tick (vectorized GBM over all
+    symbols) and publish it to Redis for every simulator to read.
+    """
+    tick = PricePathEngine().advance(MarketSimulator.load_base_prices())
     return {
-        'closed_count': closed_count,
-        'timestamp': timezone.now().isoformat()
+        'tick': tick.get('tick'),
+        'symbols': len(tick.get('symbols', [])),
+        'timestamp': tick.get('timestamp'),
     }
 
 
@@ -238,6 +373,7 @@ def update_market_data_cache(self):
         return {
             'status': 'success',
             'assets_count': len(result),
+            'refresh': cache.get(MarketDataService.WS_REFRESH_STATS_KEY),
             'timestamp': timezone.now().isoformat(),
             'retry_count': self.request.retries
         }
@@ -264,3 +400,22 @@ def update_market_data_cache(self):
                 'timestamp': timezone.now().isoformat(),
                 'retry_count': self.request.retries
             }
+
+
+@shared_task(name='trading.refresh_market_data', ignore_result=True)
+def refresh_market_data(symbol, interval, limit):
+    """Revalidate one stale klines cache entry (queued by MarketDataService.fetch_market_data)"""
+    data = MarketDataService().refresh_market_data(symbol, interval, limit)
+    return {'symbol': symbol, 'interval': interval, 'refreshed': bool(data)}
+
+
+@shared_task(name='trading.sync_candles', ignore_result=True)
+def sync_candles(symbol, interval):
+    """Sync the tail of one stored candle series (queued by CandleStore.get_market_data)"""
+    return CandleStore().sync(symbol, interval, force=True)
+
+
+@shared_task(name='trading.warm_history_cache')
+def warm_history_cache():
+    """Refresh the hottest market history keys shortly before they go stale"""
+    return HistoryCacheWarmer().run()
@@ -0,0 +1,139 @@
+"""
+Streaming ticker ingestion worker (manage.py run_ticker_stream).
+
+Consumes a Binance combined ticker stream for only the configured crypto
+and commodity symbols, keeps the latest 24hr ticker per symbol in an
+in-memory book and publishes it to Redis at most once per publish
+interval, as market_data:stream:tickers (REST /ticker/24hr field names).
+
+The worker never rewrites the WebSocket snapshot, which stays owned by the
+20s REST refresh: readers (AsyncSnapshotReader) overlay the book onto it,
+and the refresh uses the book instead of downloading /ticker/24hr while it
+is fresh. The book expires after BOOK_TTL when the worker stops.
+
+The stream URL is configurable (BINANCE_STREAM_URL / --url), so the worker
+can run against a local fake stream server.
+"""
+
+import asyncio
+import json
+import logging
+
+import aiohttp
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from .services import MarketDataService
+from .snapshots import STREAM_TICKERS_KEY
+from .utils.redis_client import get_async_redis_connection
+
+logger = logging.getLogger('apps.trading')
+
+
+class TickerStreamIngestor:
+    STREAM_SUFFIX = '@ticker'
+    # The REST refresh falls back to downloading /ticker/24hr once the book is this old
+    BOOK_TTL = 15  # seconds
+    RECONNECT_DELAY_MIN = 1
+    RECONNECT_DELAY_MAX = 60
+    HEARTBEAT = 30
+
+    def __init__(self, symbols=None, url: str = None, publish_interval: float = None):
+        self.symbols = sorted(symbol.upper() for symbol in (symbols or MarketDataService._ws_binance_symbols()))
+        self.url = url or settings.BINANCE_STREAM_URL
+        self.publish_interval = publish_interval or settings.MARKET_STREAM_PUBLISH_INTERVAL
+        self.book = {}
+        self.dirty = False
+        self.stats = {'messages': 0, 'publishes': 0, 'reconnects': 0, 'errors': 0}
+        self._wanted = frozenset(self.symbols)
+        self._running = False
+
+    def stream_url(self) -> str:
+        """Combined stream URL subscribing to every configured symbol"""
+        streams = '/'.join(f'{symbol.lower()}{self.STREAM_SUFFIX}' for symbol in self.symbols)
+        return f'{self.url}?streams={streams}'
+
+    def apply(self, message) -> bool:
+        """Update the book from one stream message; False if it was not a wanted ticker"""
+        data = message.get('data', message)
+        if data.get('e') != '24hrTicker' or data.get('s') not in self._wanted:
+            return False
+
+        self.book[data['s']] = {
+            'symbol': data['s'],
+            'lastPrice': data['c'],
+            'priceChange': data['p'],
+            'priceChangePercent': data['P'],
+            'volume': data['v'],
+        }
+        self.dirty = True
+        self.stats['messages'] += 1
+        return True
+
+    def handle_message(self, raw: str) -> None:
+        """apply() one raw frame; a malformed message is logged and skipped"""
+        try:
+            self.apply(json.loads(raw))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️ Skipping malformed ticker stream message: {e!r} ({raw[:200]})")
+
+    async def publish(self) -> None:
+        """Write the book (one coalesced update)"""
+        tickers = dict(self.book)
+        self.dirty = False
+
+        await get_async_redis_connection().set(STREAM_TICKERS_KEY, json.dumps(tickers), ex=self.BOOK_TTL)
+        self.stats['publishes'] += 1
+
+    async def consume(self) -> None:
+        """Read the combined stream, reconnecting with exponential backoff"""
+        delay = self.RECONNECT_DELAY_MIN
+
+        async with aiohttp.ClientSession() as session:
+            while self._running:
+                try:
+                    async with session.ws_connect(self.stream_url(), heartbeat=self.HEARTBEAT) as ws:
+                        logger.info(f"📡 Ticker stream connected ({len(self.symbols)} symbols)")
+                        delay = self.RECONNECT_DELAY_MIN
+
+                        async for message in ws:
+                            if message.type == aiohttp.WSMsgType.TEXT:
+                                self.handle_message(message.data)
+                            elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+
+                    logger.warning("⚠️ Ticker stream closed by server")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.error(f"❌ Ticker stream error: {e!r}")
+                except Exception:
+                    # Never let the worker die on an unexpected error; reconnect instead
+                    logger.exception("💥 Unexpected ticker stream error")
+
+                if not self._running:
+                    break
+                self.stats['reconnects'] += 1
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.RECONNECT_DELAY_MAX)
+
+    async def publish_loop(self) -> None:
+        """Publish at most once per interval, only when the book changed"""
+        while self._running:
+            await asyncio.sleep(self.publish_interval)
+            if not self.dirty:
+                continue
+            try:
+                await self.publish()
+            except RedisError as e:
+                logger.error(f"❌ Ticker book publish failed: {e}")
+                self.dirty = True
+
+    async def run(self) -> None:
+        self._running = True
+        try:
+            await asyncio.gather(self.consume(), self.publish_loop())
+        finally:
+            self._running = False
+
+    def stop(self) -> None:
+        self._running = False
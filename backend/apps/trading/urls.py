@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BotTradeViewSet, TradingSessionViewSet, MarketHistoryView
+from .views import BotTradeViewSet, TradingSessionViewSet, MarketHistoryView, MarketIndicatorsView
 
 app_name = 'trading'
 
@@ -10,5 +10,6 @@ router.register(r'sessions', TradingSessionViewSet, basename='session')
 
 urlpatterns = [
     path('history/', MarketHistoryView.as_view(), name='market-history'),
+    path('indicators/', MarketIndicatorsView.as_view(), name='market-indicators'),
     path('', include(router.urls)),
 ]
@@ -0,0 +1,148 @@
+"""
+Struct-of-arrays candle series.
+
+CandleColumns keeps a series as six parallel NumPy arrays (time, open,
+high, low, close, volume) instead of two lists of per-candle dicts. It is
+cached as packed bytes and served in one of three representations:
+
+    chart    {'ohlc': [{time, open, high, low, close}], 'volume': [{time, value, color}]}
+             (the original MarketHistoryView payload)
+    columnar {'format': 'columnar', 'count': N, 'time': [...], 'open': [...], ...}
+    binary   PACK_HEADER followed by the six arrays, little-endian:
+
+        offset  size  field
+        0       4     magic b'CNDL'
+        4       1     format version (1)
+        5       3     reserved (zero)
+        8       4     count N (uint32)
+        12      4     reserved (zero)
+        16      8N    time (int64, open time in ms)
+        16+8N   8N    open (float64), then high, low, close, volume
+
+The header is 16 bytes, so every array starts 8-byte aligned and can be
+viewed in place (e.g. new Float64Array(buffer, 16 + 8 * N, N) in a browser).
+"""
+
+import struct
+from typing import Dict, Iterable
+
+import numpy as np
+
+FIELDS = ('time', 'open', 'high', 'low', 'close', 'volume')
+PRICE_FIELDS = FIELDS[1:]
+
+PACK_MAGIC = b'CNDL'
+PACK_VERSION = 1
+PACK_HEADER = struct.Struct('<4sB3xI4x')
+
+UP_COLOR = '#22c55e'
+DOWN_COLOR = '#ef4444'
+
+
+class CandleColumns:
+    """Parallel arrays of one candle series, ascending by open time"""
+
+    def __init__(self, columns: Dict[str, Iterable]):
+        self.columns = {'time': np.asarray(columns['time'], dtype=np.int64)}
+        for field in PRICE_FIELDS:
+            self.columns[field] = np.asarray(columns[field], dtype=np.float64)
+
+    @classmethod
+    def empty(cls) -> 'CandleColumns':
+        return cls({field: [] for field in FIELDS})
+
+    @classmethod
+    def from_binance(cls, klines) -> 'CandleColumns':
+        """Binance /klines rows: [open time, open, high, low, close, volume, ...] with prices as strings"""
+        if not klines:
+            return cls.empty()
+        rows = np.array([kline[:6] for kline in klines], dtype=object)
+        prices = rows[:, 1:6].astype(np.float64)
+        return cls({'time': rows[:, 0].astype(np.int64), **dict(zip(PRICE_FIELDS, prices.T))})
+
+    @classmethod
+    def from_twelve_data(cls, values) -> 'CandleColumns':
+        """Twelve Data time_series values (newest first)"""
+        import dateutil.parser
+
+        values = list(reversed(values))
+        return cls({
+            'time': [int(dateutil.parser.parse(item['datetime']).timestamp() * 1000) for item in values],
+            'open': [float(item['open']) for item in values],
+            'high': [float(item['high']) for item in values],
+            'low': [float(item['low']) for item in values],
+            'close': [float(item['close']) for item in values],
+            'volume': [float(item.get('volume', 0)) for item in values],
+        })
+
+    @classmethod
+    def from_rows(cls, rows) -> 'CandleColumns':
+        """(open_time, open, high, low, close, volume) rows, e.g. from values_list()"""
+        rows = list(rows)
+        if not rows:
+            return cls.empty()
+        prices = np.array([row[1:6] for row in rows], dtype=np.float64)
+        return cls({'time': [row[0] for row in rows], **dict(zip(PRICE_FIELDS, prices.T))})
+
+    def __len__(self) -> int:
+        return int(self.columns['time'].size)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.columns[field]
+
+    @property
+    def last_time(self):
+        """Open time of the newest candle (None when empty)"""
+        return int(self.columns['time'][-1]) if len(self) else None
+
+    def tail(self, count: int) -> 'CandleColumns':
+        if count >= len(self):
+            return self
+        return CandleColumns({field: values[-count:] for field, values in self.columns.items()})
+
+    def to_chart(self) -> Dict:
+        """Original per-candle payload ({'ohlc': [...], 'volume': [...]})"""
+        times = self.columns['time'].tolist()
+        opens = self.columns['open'].tolist()
+        highs = self.columns['high'].tolist()
+        lows = self.columns['low'].tolist()
+        closes = self.columns['close'].tolist()
+        volumes = self.columns['volume'].tolist()
+
+        return {
+            'ohlc': [
+                {'time': t, 'open': o, 'high': h, 'low': l, 'close': c}
+                for t, o, h, l, c in zip(times, opens, highs, lows, closes)
+            ],
+            'volume': [
+                {'time': t, 'value': v, 'color': UP_COLOR if c >= o else DOWN_COLOR}
+                for t, o, c, v in zip(times, opens, closes, volumes)
+            ],
+        }
+
+    def to_columnar(self) -> Dict:
+        """Compact JSON-ready dict of parallel lists"""
+        return {
+            'format': 'columnar',
+            'count': len(self),
+            **{field: values.tolist() for field, values in self.columns.items()},
+        }
+
+    def pack(self) -> bytes:
+        """Binary representation (see module docstring)"""
+        parts = [PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(self))]
+        parts.append(self.columns['time'].astype('<i8', copy=False).tobytes())
+        parts.extend(self.columns[field].astype('<f8', copy=False).tobytes() for field in PRICE_FIELDS)
+        return b''.join(parts)
+
+    @classmethod
+    def unpack(cls, data: bytes) -> 'CandleColumns':
+        magic, version, count = PACK_HEADER.unpack_from(data)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f'Not a packed candle series (magic={magic!r}, version={version})')
+
+        offset = PACK_HEADER.size
+        columns = {'time': np.frombuffer(data, dtype='<i8', count=count, offset=offset)}
+        for index, field in enumerate(PRICE_FIELDS, start=1):
+            columns[field] = np.frombuffer(data, dtype='<f8', count=count, offset=offset + 8 * count * index)
+        return cls(columns)
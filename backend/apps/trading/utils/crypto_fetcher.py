@@ -3,6 +3,8 @@ import asyncio
 import requests
 from typing import List, Dict
 from decimal import Decimal
+from django.core.cache import cache
+from .upstream import ProviderUnavailable, provider_guard
 
 
 class CryptoDataFetcher:
@@ -12,12 +14,17 @@ class CryptoDataFetcher:
     """
 
     COINGECKO_API_BASE = "https://api.coingecko.com/api/v3"
+    BINANCE_API_BASE = "https://api.binance.com/api/v3"
+    # Last good CoinGecko prices, served while CoinGecko is down or rate limited
+    STALE_PRICES_KEY = 'market_data:coingecko:base_prices:stale:{limit}'
+    STALE_PRICES_TTL = 24 * 60 * 60
 
     @staticmethod
     def get_base_prices_sync(limit: int = 20) -> Dict[str, Decimal]:
         """
         Fetch top cryptocurrencies from CoinGecko synchronously and return a dictionary
         of symbol -> price, formatted for the simulator.
+        Falls back to the last good prices while CoinGecko is unavailable.
         """
         url = f"{CryptoDataFetcher.COINGECKO_API_BASE}/coins/markets"
         params = {
@@ -27,20 +34,24 @@ class CryptoDataFetcher:
             'page': 1,
             'sparkline': 'false',
         }
+        stale_key = CryptoDataFetcher.STALE_PRICES_KEY.format(limit=limit)
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()  # Raise an exception for bad status codes
-            data = response.json()
+            with provider_guard('coingecko').guarded():
+                response = requests.get(url, params=params, timeout=10)
+                response.raise_for_status()  # Raise an exception for bad status codes
+                data = response.json()
 
             prices = {
                 f"{coin.get('symbol', '').upper()}/USDT": Decimal(str(coin.get('current_price', 0)))
                 for coin in data
             }
             # Filter out any coins that didn't have a symbol or price
-            return {k: v for k, v in prices.items() if k and v > 0}
-        except requests.exceptions.RequestException as e:
+            prices = {k: v for k, v in prices.items() if k and v > 0}
+            cache.set(stale_key, prices, CryptoDataFetcher.STALE_PRICES_TTL)
+            return prices
+        except (requests.exceptions.RequestException, ValueError, ProviderUnavailable) as e:
             print(f"❌ Error fetching sync prices from CoinGecko: {e}")
-            return {}  # Return empty dict on failure
+            return cache.get(stale_key) or {}  # Last good prices, or empty dict on failure
 
     @staticmethod
     async def get_top_coins(limit: int = 100) -> List[Dict]:
@@ -66,31 +77,32 @@ class CryptoDataFetcher:
             }
 
             try:
-                async with session.get(url, params=params, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-
-                        # Transform to our format
-                        coins = []
-                        for coin in data:
-                            # Handle None values safely
-                            coins.append({
-                                'id': coin.get('id', ''),
-                                'symbol': coin.get('symbol', '').upper(),
-                                'name': coin.get('name', ''),
-                                'image': coin.get('image', ''),  # URL to logo
-                                'price': coin.get('current_price', 0),
-                                'change_24h': coin.get('price_change_24h', 0),
-                                'change_percent_24h': coin.get('price_change_percentage_24h', 0),
-                                'market_cap': coin.get('market_cap', 0),
-                                'volume': coin.get('total_volume', 0),
-                            })
-
-                        return coins
-                    else:
-                        print(f"❌ CoinGecko API error: {response.status}")
-                        return []
-
+                # Bad statuses raise inside the guard so 429/5xx count towards the breaker
+                async with provider_guard('coingecko').aguarded(), session.get(url, params=params, timeout=10) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+
+                # Transform to our format
+                coins = []
+                for coin in data:
+                    # Handle None values safely
+                    coins.append({
+                        'id': coin.get('id', ''),
+                        'symbol': coin.get('symbol', '').upper(),
+                        'name': coin.get('name', ''),
+                        'image': coin.get('image', ''),  # URL to logo
+                        'price': coin.get('current_price', 0),
+                        'change_24h': coin.get('price_change_24h', 0),
+                        'change_percent_24h': coin.get('price_change_percentage_24h', 0),
+                        'market_cap': coin.get('market_cap', 0),
+                        'volume': coin.get('total_volume', 0),
+                    })
+
+                return coins
+
+            except aiohttp.ClientResponseError as e:
+                print(f"❌ CoinGecko API error: {e.status}")
+                return []
             except Exception as e:
                 print(f"❌ Error fetching coins from CoinGecko: {e}")
                 return []
@@ -103,23 +115,21 @@ class CryptoDataFetcher:
         """
 
         async with aiohttp.ClientSession() as session:
-            url = "https://api.binance.com/api/v3/exchangeInfo"
+            url = f"{CryptoDataFetcher.BINANCE_API_BASE}/exchangeInfo"
 
             try:
-                async with session.get(url, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
+                async with provider_guard('binance').aguarded(weight=20), session.get(url, timeout=10) as response:
+                    response.raise_for_status()
+                    data = await response.json()
 
-                        # Extract unique base assets (coins) from USDT pairs
-                        coins = set()
-                        for symbol in data['symbols']:
-                            if symbol['quoteAsset'] == 'USDT' and symbol['status'] == 'TRADING':
-                                coins.add(symbol['baseAsset'])
+                # Extract unique base assets (coins) from USDT pairs
+                coins = set()
+                for symbol in data['symbols']:
+                    if symbol['quoteAsset'] == 'USDT' and symbol['status'] == 'TRADING':
+                        coins.add(symbol['baseAsset'])
 
-                        return sorted(list(coins))
-                    else:
-                        return []
+                return sorted(list(coins))
 
             except Exception as e:
                 print(f"❌ Error fetching Binance pairs: {e}")
-                return []
\ No newline at end of file
+                return []
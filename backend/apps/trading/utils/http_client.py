@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import weakref
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connection pool sizes for upstream market data APIs
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 50
+DEFAULT_TIMEOUT = 15
+
+_session = None
+_session_lock = threading.Lock()
+_async_sessions = weakref.WeakKeyDictionary()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Shared requests session with a keep-alive connection pool, so repeated
+    calls to Binance / Twelve Data reuse TCP+TLS connections instead of
+    opening a fresh one per request.
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+
+    return _session
+
+
+def get_async_http_session() -> aiohttp.ClientSession:
+    """
+    Shared aiohttp session for the running event loop (aiohttp sessions
+    are bound to the loop they were created on).
+    """
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=POOL_MAXSIZE, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT),
+        )
+        _async_sessions[loop] = session
+
+    return session
+
@@ -0,0 +1,124 @@
+"""
+Vectorized technical indicators over candle arrays.
+
+Every function takes float64 NumPy arrays (oldest first) and returns
+arrays of the same length, NaN where the indicator is not defined yet.
+Definitions follow the usual charting conventions: EMA and MACD are
+seeded with the SMA of their first window, RSI and ATR use Wilder's
+smoothing (alpha = 1 / period), Bollinger bands use the population
+standard deviation.
+
+Exponential smoothing is evaluated in closed form per block,
+
+    y[k] = d^k * (y[0] + alpha * cumsum(x[j] / d^j)),   d = 1 - alpha
+
+with blocks short enough that d^-k stays far from overflow, so a series
+costs a handful of array operations instead of a Python loop per candle.
+"""
+
+from typing import Dict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Largest exponent d^-k is allowed to reach within one block
+_BLOCK_LOG_SPAN = 50.0
+
+
+def smooth(values: np.ndarray, alpha: float, start: int) -> np.ndarray:
+    """y[start] = values[start], then y[t] = y[t-1] + alpha * (values[t] - y[t-1]); NaN before start"""
+    n = values.size
+    out = np.full(n, np.nan)
+    if start >= n:
+        return out
+
+    decay = 1.0 - alpha
+    out[start] = level = values[start]
+    if decay <= 0:
+        out[start:] = values[start:]
+        return out
+
+    block = max(1, int(_BLOCK_LOG_SPAN / -np.log(decay)))
+    position = start + 1
+    while position < n:
+        chunk = values[position:position + block]
+        powers = decay ** np.arange(1, chunk.size + 1)
+        smoothed = powers * (level + alpha * np.cumsum(chunk / powers))
+        out[position:position + chunk.size] = smoothed
+        level = smoothed[-1]
+        position += chunk.size
+    return out
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    out = np.full(values.size, np.nan)
+    if values.size >= period:
+        out[period - 1:] = sliding_window_view(values, period).mean(axis=1)
+    return out
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """EMA seeded with the SMA of the first `period` (non-NaN) values"""
+    valid = np.flatnonzero(~np.isnan(values))
+    out = np.full(values.size, np.nan)
+    if valid.size < period:
+        return out
+
+    first = valid[0]
+    seeded = values.copy()
+    seed_index = first + period - 1
+    seeded[seed_index] = values[first:seed_index + 1].mean()
+    out[seed_index:] = smooth(seeded[seed_index:], 2.0 / (period + 1), 0)
+    return out
+
+
+def wilder(values: np.ndarray, period: int, first: int = 0) -> np.ndarray:
+    """Wilder's moving average of values[first:], seeded with the SMA of its first window"""
+    out = np.full(values.size, np.nan)
+    seed_index = first + period - 1
+    if seed_index >= values.size:
+        return out
+
+    seeded = values.copy()
+    seeded[seed_index] = values[first:seed_index + 1].mean()
+    out[seed_index:] = smooth(seeded[seed_index:], 1.0 / period, 0)
+    return out
+
+
+def rsi(close: np.ndarray, period: int) -> np.ndarray:
+    out = np.full(close.size, np.nan)
+    if close.size <= period:
+        return out
+
+    delta = np.diff(close, prepend=np.nan)
+    gains = wilder(np.where(delta > 0, delta, 0.0), period, first=1)
+    losses = wilder(np.where(delta < 0, -delta, 0.0), period, first=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = 100.0 - 100.0 / (1.0 + gains / losses)
+    out[(losses == 0) & ~np.isnan(gains)] = 100.0
+    return out
+
+
+def macd(close: np.ndarray, fast: int, slow: int, signal: int) -> Dict[str, np.ndarray]:
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return {'macd': line, 'signal': signal_line, 'histogram': line - signal_line}
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    previous_close = np.concatenate(([np.nan], close[:-1]))
+    ranges = np.vstack((high - low, np.abs(high - previous_close), np.abs(low - previous_close)))
+    return np.nanmax(ranges, axis=0)
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    return wilder(true_range(high, low, close), period)
+
+
+def bollinger(close: np.ndarray, period: int, width: float) -> Dict[str, np.ndarray]:
+    middle = sma(close, period)
+    deviation = np.full(close.size, np.nan)
+    if close.size >= period:
+        deviation[period - 1:] = sliding_window_view(close, period).std(axis=1)
+    return {'middle': middle, 'upper': middle + width * deviation, 'lower': middle - width * deviation}
@@ -5,6 +5,7 @@ from datetime import datetime
 from django.conf import settings
 from typing import List, Dict, Literal, Optional
 from .crypto_loader import CryptoSymbolLoader
+from .upstream import provider_guard
 
 Interval = Literal['1h', '4h', '1d', '1w']
 SymbolType = Literal['crypto', 'stock', 'forex', 'commodity']
@@ -85,10 +86,11 @@ class MarketDataFetcher:
             'limit': 200
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self.BINANCE_API_URL, params=params) as response:
-                response.raise_for_status()
-                data = await response.json()
+        async with provider_guard('binance').aguarded(weight=2):
+            async with aiohttp.ClientSession() as session:
+                async with session.get(self.BINANCE_API_URL, params=params) as response:
+                    response.raise_for_status()
+                    data = await response.json()
                 return [{
                     "time": int(k[0]),
                     "value": float(k[4])
@@ -0,0 +1,48 @@
+import asyncio
+import weakref
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+
+_connection_pool = None
+_async_connection_pools = weakref.WeakKeyDictionary()
+
+
+def get_redis_connection() -> redis.Redis:
+    """
+    Shared Redis client for data structures the Django cache API can't express
+    (sorted sets, pipelines, locks). Uses one connection pool per process.
+    """
+    global _connection_pool
+
+    if _connection_pool is None:
+        _connection_pool = redis.ConnectionPool.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+        )
+
+    return redis.Redis(connection_pool=_connection_pool)
+
+
+def get_async_redis_connection() -> aioredis.Redis:
+    """
+    Async counterpart of get_redis_connection() for consumers and async
+    fetch paths. One connection pool per event loop (asyncio pools are
+    bound to the loop they were created on).
+    """
+    loop = asyncio.get_running_loop()
+    pool = _async_connection_pools.get(loop)
+
+    if pool is None:
+        pool = aioredis.ConnectionPool.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+        )
+        _async_connection_pools[loop] = pool
+
+    return aioredis.Redis(connection_pool=pool)
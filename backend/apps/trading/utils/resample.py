@@ -0,0 +1,74 @@
+"""
+Vectorized OHLCV resampling.
+
+Builds higher-interval bars (2h, 4h, 12h, 1d, 1w, ...) from a finer base
+series in one pass over NumPy arrays: bars are bucketed by open time and
+each bucket is reduced with ufunc.reduceat (first open, max high, min low,
+last close, summed volume). Buckets are aligned to the Unix epoch like
+Binance klines, except weekly buckets which start on Monday 00:00 UTC.
+"""
+
+import re
+from typing import Dict, Optional
+
+import numpy as np
+
+MINUTE_MS = 60 * 1000
+UNIT_MS = {
+    'm': MINUTE_MS,
+    'h': 60 * MINUTE_MS,
+    'd': 24 * 60 * MINUTE_MS,
+    'w': 7 * 24 * 60 * MINUTE_MS,
+}
+
+# 1970-01-01 was a Thursday; Binance weeks open on Monday 1970-01-05
+WEEK_ORIGIN_MS = 4 * UNIT_MS['d']
+
+_INTERVAL_RE = re.compile(r'^(\d+)([mhdw])$')
+
+
+def interval_to_ms(interval: str) -> Optional[int]:
+    """'4h' -> 14400000; None for anything that is not <number><m|h|d|w>"""
+    match = _INTERVAL_RE.match(interval or '')
+    if not match or int(match.group(1)) == 0:
+        return None
+    return int(match.group(1)) * UNIT_MS[match.group(2)]
+
+
+def bucket_origin(interval_ms: int) -> int:
+    """Epoch offset bucket boundaries are aligned to"""
+    return WEEK_ORIGIN_MS if interval_ms % UNIT_MS['w'] == 0 else 0
+
+
+def bucket_start(open_time: int, interval_ms: int) -> int:
+    """Open time of the interval_ms bucket containing open_time"""
+    origin = bucket_origin(interval_ms)
+    return (open_time - origin) // interval_ms * interval_ms + origin
+
+
+def resample_ohlcv(columns: Dict[str, np.ndarray], interval_ms: int) -> Dict[str, np.ndarray]:
+    """
+    Aggregate base bars into interval_ms bars.
+
+    columns holds equal-length arrays 'time' (int64 ms, ascending), 'open',
+    'high', 'low', 'close' and 'volume'. Returns the same keys, one element
+    per non-empty bucket; 'time' is the bucket open time. The last bucket
+    may still be forming, exactly like the last upstream kline.
+    """
+    times = np.asarray(columns['time'], dtype=np.int64)
+    if times.size == 0:
+        return {key: np.asarray(columns[key])[:0] for key in ('time', 'open', 'high', 'low', 'close', 'volume')}
+
+    origin = bucket_origin(interval_ms)
+    buckets = (times - origin) // interval_ms
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.concatenate((starts[1:], [times.size])) - 1
+
+    return {
+        'time': buckets[starts] * interval_ms + origin,
+        'open': np.asarray(columns['open'], dtype=np.float64)[starts],
+        'high': np.maximum.reduceat(np.asarray(columns['high'], dtype=np.float64), starts),
+        'low': np.minimum.reduceat(np.asarray(columns['low'], dtype=np.float64), starts),
+        'close': np.asarray(columns['close'], dtype=np.float64)[ends],
+        'volume': np.add.reduceat(np.asarray(columns['volume'], dtype=np.float64), starts),
+    }
@@ -0,0 +1,241 @@
+"""
+Cluster-wide guard for outbound market data calls.
+
+Every call to Binance, Twelve Data, CoinGecko or exchangerate-api goes
+through the guard of its provider:
+
+    with provider_guard('binance').guarded(weight=2):
+        response = get_http_session().get(url, params=params, timeout=15)
+        response.raise_for_status()
+
+    async with provider_guard('exchangerate').aguarded():
+        ...
+
+Rate limit: a token bucket per provider in Redis (one Lua script, so all
+Celery workers and Daphne processes share the quota). A caller waits up to
+MAX_WAIT for tokens, then gives up with ProviderUnavailable.
+
+Circuit breaker: FAILURE_THRESHOLD consecutive failures (timeouts,
+connection errors, 5xx, 429) open the circuit for OPEN_SECONDS; while it
+is open calls fail fast with ProviderUnavailable instead of waiting for a
+timeout, and callers serve stale cache. Afterwards a single probe call is
+let through (half-open): success closes the circuit, failure reopens it.
+
+When Redis itself is unavailable the guard lets calls through unchecked.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import aiohttp
+import requests
+from redis.exceptions import RedisError
+
+from .redis_client import get_async_redis_connection, get_redis_connection
+
+logger = logging.getLogger('apps.trading')
+
+# Refill tokens, take `weight` of them; returns 0 or the ms until enough are available
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local weight = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+
+local wait = 0
+if tokens >= weight then
+    tokens = tokens - weight
+else
+    wait = math.ceil((weight - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class ProviderUnavailable(Exception):
+    """Circuit open or rate limit exhausted: serve cached data instead"""
+
+
+class ProviderGuard:
+    KEY_PREFIX = 'upstream:'
+    FAILURE_THRESHOLD = 5
+    FAILURE_WINDOW = 60  # seconds; failures further apart than this don't add up
+    OPEN_SECONDS = 30
+    PROBE_TIMEOUT = 20  # a crashed probe frees the half-open slot after this
+    MAX_WAIT = 2.0  # seconds a caller may wait for rate limit tokens
+
+    def __init__(self, name: str, rate: float, burst: float):
+        """rate: tokens per second, burst: bucket size (request weight units)"""
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.bucket_key = f'{self.KEY_PREFIX}{name}:bucket'
+        self.failures_key = f'{self.KEY_PREFIX}{name}:failures'
+        self.open_key = f'{self.KEY_PREFIX}{name}:open'
+        self.probe_key = f'{self.KEY_PREFIX}{name}:probe'
+
+    # ---------- Sync ----------
+
+    @contextmanager
+    def guarded(self, weight: float = 1):
+        """Admit one call (or raise ProviderUnavailable) and record its outcome"""
+        try:
+            redis_client = get_redis_connection()
+            self._admit(redis_client)
+            self._take(redis_client, weight)
+        except RedisError as e:
+            logger.warning(f"⚠️ Upstream guard unavailable for {self.name}, calling unchecked: {e}")
+            redis_client = None
+
+        try:
+            yield
+        except Exception as e:
+            if redis_client is not None and self.is_failure(e):
+                self._record_failure(redis_client, e)
+            raise
+        else:
+            if redis_client is not None:
+                self._record_success(redis_client)
+
+    def _admit(self, redis_client) -> None:
+        is_open, failures = redis_client.mget(self.open_key, self.failures_key)
+        if is_open:
+            raise ProviderUnavailable(f'{self.name} circuit open')
+        if int(failures or 0) >= self.FAILURE_THRESHOLD:
+            if not redis_client.set(self.probe_key, 1, nx=True, ex=self.PROBE_TIMEOUT):
+                raise ProviderUnavailable(f'{self.name} circuit half-open, probe in flight')
+            logger.info(f"🔌 {self.name} circuit half-open, probing")
+
+    def _take(self, redis_client, weight: float) -> None:
+        deadline = time.monotonic() + self.MAX_WAIT
+        while True:
+            wait_ms = redis_client.eval(TOKEN_BUCKET_SCRIPT, 1, self.bucket_key, self.rate, self.burst, weight)
+            if not wait_ms:
+                return
+            if time.monotonic() + wait_ms / 1000 > deadline:
+                raise ProviderUnavailable(f'{self.name} rate limit exhausted')
+            time.sleep(wait_ms / 1000)
+
+    def _record_success(self, redis_client) -> None:
+        try:
+            redis_client.delete(self.failures_key, self.probe_key)
+        except RedisError:
+            pass
+
+    def _record_failure(self, redis_client, error) -> None:
+        try:
+            pipe = redis_client.pipeline()
+            pipe.incr(self.failures_key)
+            pipe.expire(self.failures_key, self.FAILURE_WINDOW)
+            failures = pipe.execute()[0]
+            if failures >= self.FAILURE_THRESHOLD:
+                self._trip(redis_client.pipeline(), failures, error).execute()
+        except RedisError:
+            pass
+
+    # ---------- Async ----------
+
+    @asynccontextmanager
+    async def aguarded(self, weight: float = 1):
+        """guarded() for the shared aiohttp session"""
+        try:
+            redis_client = get_async_redis_connection()
+            await self._aadmit(redis_client)
+            await self._atake(redis_client, weight)
+        except RedisError as e:
+            logger.warning(f"⚠️ Upstream guard unavailable for {self.name}, calling unchecked: {e}")
+            redis_client = None
+
+        try:
+            yield
+        except Exception as e:
+            if redis_client is not None and self.is_failure(e):
+                await self._arecord_failure(redis_client, e)
+            raise
+        else:
+            if redis_client is not None:
+                try:
+                    await redis_client.delete(self.failures_key, self.probe_key)
+                except RedisError:
+                    pass
+
+    async def _aadmit(self, redis_client) -> None:
+        is_open, failures = await redis_client.mget(self.open_key, self.failures_key)
+        if is_open:
+            raise ProviderUnavailable(f'{self.name} circuit open')
+        if int(failures or 0) >= self.FAILURE_THRESHOLD:
+            if not await redis_client.set(self.probe_key, 1, nx=True, ex=self.PROBE_TIMEOUT):
+                raise ProviderUnavailable(f'{self.name} circuit half-open, probe in flight')
+            logger.info(f"🔌 {self.name} circuit half-open, probing")
+
+    async def _atake(self, redis_client, weight: float) -> None:
+        deadline = time.monotonic() + self.MAX_WAIT
+        while True:
+            wait_ms = await redis_client.eval(TOKEN_BUCKET_SCRIPT, 1, self.bucket_key, self.rate, self.burst, weight)
+            if not wait_ms:
+                return
+            if time.monotonic() + wait_ms / 1000 > deadline:
+                raise ProviderUnavailable(f'{self.name} rate limit exhausted')
+            await asyncio.sleep(wait_ms / 1000)
+
+    async def _arecord_failure(self, redis_client, error) -> None:
+        try:
+            pipe = redis_client.pipeline()
+            pipe.incr(self.failures_key)
+            pipe.expire(self.failures_key, self.FAILURE_WINDOW)
+            failures = (await pipe.execute())[0]
+            if failures >= self.FAILURE_THRESHOLD:
+                await self._trip(redis_client.pipeline(), failures, error).execute()
+        except RedisError:
+            pass
+
+    # ---------- Shared ----------
+
+    def _trip(self, pipe, failures: int, error):
+        """Open the circuit; failures outlive it so the next call after it is a probe"""
+        logger.error(f"🔴 {self.name} circuit open for {self.OPEN_SECONDS}s after {failures} failures: {error!r}")
+        pipe.set(self.open_key, 1, ex=self.OPEN_SECONDS)
+        pipe.expire(self.failures_key, self.OPEN_SECONDS + self.FAILURE_WINDOW)
+        pipe.delete(self.probe_key)
+        return pipe
+
+    @staticmethod
+    def is_failure(error) -> bool:
+        """Provider-side problems count toward the breaker; bad requests (4xx) don't"""
+        if isinstance(error, ProviderUnavailable):
+            return False
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            return error.response.status_code >= 500 or error.response.status_code == 429
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status >= 500 or error.status == 429
+        return isinstance(error, (
+            requests.exceptions.RequestException, aiohttp.ClientError, asyncio.TimeoutError, ValueError
+        ))
+
+
+# Limits stay well under the published quotas (weights per request):
+#   binance       6000 weight/min per IP; klines 2, ticker/24hr (all symbols) 80
+#   twelvedata    free plan 8 requests/min
+#   coingecko     public API ~30 requests/min
+#   exchangerate  open v4 endpoint, refreshed hourly upstream
+PROVIDERS = {
+    'binance': ProviderGuard('binance', rate=40, burst=800),
+    'twelvedata': ProviderGuard('twelvedata', rate=8 / 60, burst=8),
+    'coingecko': ProviderGuard('coingecko', rate=0.5, burst=10),
+    'exchangerate': ProviderGuard('exchangerate', rate=1, burst=5),
+}
+
+
+def provider_guard(name: str) -> ProviderGuard:
+    return PROVIDERS[name]
@@ -16,7 +16,10 @@ from .serializers import (
     TradingSessionSerializer,
     TradingStatsSerializer
 )
-from .services import MarketDataService
+from .cache_warmer import HistoryCacheWarmer
+from .renderers import BinaryCandleRenderer, CandleJSONRenderer, ColumnarCandleJSONRenderer
+from .candle_store import CandleStore
+from .indicator_cache import IndicatorService
 
 
 class BotTradeViewSet(viewsets.ReadOnlyModelViewSet):
@@ -165,6 +168,9 @@ class BotTradeViewSet(viewsets.ReadOnlyModelViewSet):
 
             trade.save()
 
+            from apps.trading.bot.position_index import OpenPositionIndex
+            OpenPositionIndex().remove([trade])
+
             serializer = self.get_serializer(trade)
             return Response(serializer.data)
 
@@ -298,7 +304,12 @@ class TradingSessionViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 class MarketHistoryView(APIView):
+    """
+    Candles for a symbol; the format follows the Accept header (see renderers):
+    chart JSON (default), columnar JSON or packed binary.
+    """
     permission_classes = [AllowAny]
+    renderer_classes = [CandleJSONRenderer, ColumnarCandleJSONRenderer, BinaryCandleRenderer]
 
     def get(self, request):
         symbol = request.query_params.get('symbol')
@@ -328,8 +339,9 @@ class MarketHistoryView(APIView):
         limit = limit_map.get(interval, 168)
 
         try:
-            market_service = MarketDataService()
-            data = market_service.fetch_market_data(symbol, interval, limit)
+            # Served from the local candle store (tail synced incrementally)
+            store = CandleStore()
+            data = store.get_market_data(symbol, interval, limit)
 
             if not data:
                 logger.error(f"❌ No data returned for {symbol} - Client: {client_ip}")
@@ -341,16 +353,22 @@ class MarketHistoryView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            if len(data['ohlc']) < 5:
-                logger.warning(f"⚠️ Insufficient data for {symbol}: {len(data['ohlc'])} candles")
+            if len(data) < 5:
+                logger.warning(f"⚠️ Insufficient data for {symbol}: {len(data)} candles")
                 return Response(
                     {
-                        'error': f'Insufficient data for {interval} interval. Only {len(data["ohlc"])} candles available. Try a shorter interval.'
+                        'error': f'Insufficient data for {interval} interval. Only {len(data)} candles available. Try a shorter interval.'
                     },
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            logger.info(f"✅ Successfully returned {len(data['ohlc'])} candles for {symbol} - Client: {client_ip}")
+            # Access frequency drives the refresh-ahead cache warmer
+            HistoryCacheWarmer.record_access(store.series_key(symbol)[0], interval, limit, store.last_cache_status)
+
+            logger.info(
+                f"✅ Successfully returned {len(data)} candles for {symbol} "
+                f"({request.accepted_renderer.format}) - Client: {client_ip}"
+            )
             return Response(data, status=status.HTTP_200_OK)
 
         except requests.Timeout:
@@ -380,3 +398,58 @@ class MarketHistoryView(APIView):
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class MarketIndicatorsView(APIView):
+    """
+    Technical indicators for a symbol, computed server-side from the candle store
+    and memoized per last candle (see indicator_cache).
+
+    ?symbol=BTCUSDT&interval=1h&indicators=sma:20,rsi:14,macd:12:26:9
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        symbol = request.query_params.get('symbol')
+        interval = request.query_params.get('interval', '1h')
+
+        if not symbol:
+            return Response(
+                {'error': 'Symbol is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Same window as MarketHistoryView so the series line up with the chart
+        limit_map = {
+            '1h': 168,
+            '4h': 168,
+            '1d': 90,
+            '1w': 100
+        }
+        limit = limit_map.get(interval, 168)
+
+        try:
+            data = IndicatorService().get(symbol, interval, request.query_params.get('indicators'), limit)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.exception(f"💥 Indicator calculation failed for {symbol} {interval}")
+            return Response(
+                {
+                    'error': f'Internal error: {str(e)}',
+                    'details': 'An unexpected error occurred while calculating indicators'
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        if not data:
+            return Response(
+                {'error': 'No data available for this symbol and interval'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        logger.info(
+            f"📐 Returned {len(data['indicators'])} indicators for {data['symbol']} {interval} "
+            f"({data['memoized']} memoized, {data['computed']} computed)"
+        )
+        return Response(data, status=status.HTTP_200_OK)
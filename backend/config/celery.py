@@ -15,6 +15,27 @@ app.conf.beat_schedule = {
         'task': 'apps.trading.tasks.run_bot_simulation',
         'schedule': crontab(),
     },
+    'close-due-bot-positions': {
+        'task': 'trading.close_due_positions',
+        'schedule': 5.0,  # Close timer resolution (no-op unless BOT_CLOSE_SCHEDULER_ENABLED)
+        'options': {
+            'expires': 5.0,
+        }
+    },
+    'advance-bot-price-tick': {
+        'task': 'trading.advance_price_tick',
+        'schedule': 60.0,  # One shared price tick per bot simulation run
+        'options': {
+            'expires': 55.0,
+        }
+    },
+    'warm-market-history-cache': {
+        'task': 'trading.warm_history_cache',
+        'schedule': 15.0,  # Must be shorter than MARKET_WARMER_LEAD
+        'options': {
+            'expires': 15.0,
+        }
+    },
     'update-market-data-cache': {
         'task': 'trading.update_market_data',
         'schedule': 20.0,  # Every 20 seconds
@@ -228,10 +228,14 @@ LOGGING = {
     },
 }
 
+# One Redis database for the Django cache and the raw client used for sorted
+# sets, pipelines and locks (apps.trading.utils.redis_client)
+REDIS_URL = config('REDIS_URL', default='redis://127.0.0.1:6379/1')
+
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': config('REDIS_URL', default='redis://127.0.0.1:6379/1'),
+        'LOCATION': REDIS_URL,
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
             'SOCKET_CONNECT_TIMEOUT': 5,
@@ -246,6 +250,11 @@ TWELVE_DATA_API_KEY = config('TWELVE_DATA_API_KEY', default=None)
 OANDA_API_KEY = config('OANDA_API_KEY', default=None)
 BINANCE_API_KEY = config('BINANCE_API_KEY', default=None)
 
+# Streaming ticker ingestion (manage.py run_ticker_stream): combined Binance
+# ticker stream, coalesced snapshot published every N seconds
+BINANCE_STREAM_URL = config('BINANCE_STREAM_URL', default='wss://stream.binance.com:9443/stream')
+MARKET_STREAM_PUBLISH_INTERVAL = config('MARKET_STREAM_PUBLISH_INTERVAL', default=1.0, cast=float)
+
 
 CRYPTO_SYMBOLS_LIMIT = 150
 
@@ -256,6 +265,23 @@ MARKET_DATA_CACHE_TTL = {
     'commodities': 300,
 }
 
+# Klines cache: fresh for MARKET_DATA_CACHE_TTL (soft), then served stale while
+# one background refresh runs, until this hard TTL (only then a request blocks)
+MARKET_DATA_CACHE_HARD_TTL = {
+    'crypto': 900,
+    'forex': 3600,
+    'stocks': 3600,
+    'commodities': 3600,
+}
+
+
+# Refresh-ahead warming of market history (trading.warm_history_cache): the
+# hottest N symbol/interval keys are refreshed when they go stale within LEAD
+# seconds, with at most BUDGET upstream calls per run
+MARKET_WARMER_TOP_N = config('MARKET_WARMER_TOP_N', default=50, cast=int)
+MARKET_WARMER_BUDGET = config('MARKET_WARMER_BUDGET', default=10, cast=int)
+MARKET_WARMER_LEAD = config('MARKET_WARMER_LEAD', default=20.0, cast=float)
+
 
 # Bot Configuration
 WITHDRAWAL_COMMISSION_PERCENT = 25.0
@@ -265,3 +291,13 @@ BOT_PRICING = {
     'premium': 500.0,
     'specialist': 1000.0,
 }
+
+# Bot simulation dispatch: 'per_user' (one Celery task per user) or
+# 'sharded' (BOT_SIMULATION_SHARD_COUNT bulk tasks per run)
+BOT_SIMULATION_MODE = config('BOT_SIMULATION_MODE', default='per_user')
+BOT_SIMULATION_SHARD_COUNT = config('BOT_SIMULATION_SHARD_COUNT', default=8, cast=int)
+BOT_SIMULATION_BATCH_SIZE = config('BOT_SIMULATION_BATCH_SIZE', default=200, cast=int)
+
+# Close positions at deadlines picked when they open (Redis timer wheel drained
+# by trading.close_due_positions) instead of the per-run close sweep
+BOT_CLOSE_SCHEDULER_ENABLED = config('BOT_CLOSE_SCHEDULER_ENABLED', default=False, cast=bool)
@@ -63,6 +63,6 @@ if config('SENTRY_DSN', default=''):
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': config('REDIS_URL', default='redis://localhost:6379/1'),
+        'LOCATION': REDIS_URL,
     }
 }
@@ -0,0 +1,31 @@
+from .base import *
+
+# Self-contained test run: no Redis server or channel layer needed
+# (tests that need raw Redis use the fakeredis fixtures in tests/conftest.py)
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
+
+CELERY_TASK_ALWAYS_EAGER = True
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+}
@@ -0,0 +1,63 @@
+import fakeredis
+import pytest
+import redis
+from django.core.cache import cache
+
+from apps.trading.utils import redis_client
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def fake_redis(redis_server, monkeypatch):
+    """Point get_redis_connection() at an in-process fake server (Lua included)"""
+    pool = redis.ConnectionPool(
+        connection_class=fakeredis.FakeRedisConnection,
+        server=redis_server,
+        decode_responses=True,
+    )
+    monkeypatch.setattr(redis_client, '_connection_pool', pool)
+    return redis.Redis(connection_pool=pool)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def bot_user(db):
+    from apps.accounts.models import User
+
+    return User.objects.create_user(
+        email='bot@example.com',
+        password='test-password-123',
+        bot_type='basic',
+        is_bot_enabled=True,
+    )
+
+
+@pytest.fixture
+def open_trade(bot_user):
+    """Factory for open BotTrade rows of bot_user"""
+    from decimal import Decimal
+
+    from apps.trading.models import BotTrade
+
+    def make(**fields):
+        values = {
+            'user': bot_user,
+            'symbol': 'BTCUSDT',
+            'side': 'buy',
+            'entry_price': Decimal('100.00'),
+            'quantity': Decimal('1.0'),
+            **fields,
+        }
+        return BotTrade.objects.create(**values)
+
+    return make
@@ -0,0 +1,118 @@
+import pytest
+
+from apps.trading.cache_warmer import HistoryCacheWarmer
+from apps.trading.candle_store import CandleStore
+
+LEAD = 30
+
+
+class StubMarketService:
+    """Klines cache of intervals without a stored base series"""
+
+    def __init__(self):
+        self.fresh_for = {}
+        self.refreshed = []
+
+    def cache_fresh_for(self, symbol, interval):
+        return self.fresh_for.get((symbol, interval))
+
+    def refresh_market_data(self, symbol, interval, limit):
+        self.refreshed.append((symbol, interval, limit))
+
+
+class StubStore(CandleStore):
+    """CandleStore interval mapping with recorded syncs and scripted sync deadlines"""
+
+    def __init__(self):
+        super().__init__(StubMarketService())
+        self.due_in = {}
+        self.synced = []
+
+    def sync_due_in(self, symbol, interval):
+        return self.due_in.get((symbol, interval), 0)
+
+    def sync(self, symbol, interval, limit=None, force=False):
+        self.synced.append((symbol, interval, force))
+        return 1
+
+
+@pytest.fixture
+def store():
+    return StubStore()
+
+
+def warmer(store, budget=10, top_n=10):
+    return HistoryCacheWarmer(top_n=top_n, budget=budget, lead=LEAD, store=store)
+
+
+def request(symbol, interval, times, limit=100):
+    for _ in range(times):
+        HistoryCacheWarmer.record_access(symbol, interval, limit, 'hit')
+
+
+def test_hottest_adds_up_the_last_two_windows(fake_redis):
+    request('BTCUSDT', '1h', 3)
+    request('ETHUSDT', '1h', 2)
+    previous = f'{HistoryCacheWarmer.ACCESS_PREFIX}{HistoryCacheWarmer.window() - 1}'
+    fake_redis.zincrby(previous, 4, 'ETHUSDT|1h|100')
+    fake_redis.zincrby(f'{HistoryCacheWarmer.ACCESS_PREFIX}{HistoryCacheWarmer.window() - 2}', 50, 'SOLUSDT|1h|100')
+
+    assert warmer(StubStore()).hottest() == [('ETHUSDT', '1h', 100, 6), ('BTCUSDT', '1h', 100, 3)]
+    assert warmer(StubStore(), top_n=1).hottest() == [('ETHUSDT', '1h', 100, 6)]
+
+
+def test_budget_caps_refreshes_to_the_hottest_due_keys(fake_redis, store):
+    for rank, symbol in enumerate(['AAA', 'BBB', 'CCC', 'DDD', 'EEE']):
+        request(symbol, '1h', 10 - rank)
+
+    result = warmer(store, budget=2).run()
+
+    assert store.synced == [('AAA', '1h', True), ('BBB', '1h', True)]
+    assert result['refreshed'] == ['AAA 1h', 'BBB 1h']
+    assert result['over_budget'] == 3
+    assert HistoryCacheWarmer.report(1)[0]['warmed'] == 2
+
+
+def test_fresh_keys_are_skipped_without_spending_budget(fake_redis, store):
+    request('AAA', '1h', 5)
+    request('BBB', '1h', 4)
+    request('CCC', '1h', 3)
+    store.due_in[('AAA', '1h')] = LEAD + 60
+
+    result = warmer(store, budget=2).run()
+
+    assert [symbol for symbol, _, _ in store.synced] == ['BBB', 'CCC']
+    assert result['over_budget'] == 0
+
+
+def test_resampled_intervals_share_one_base_sync(fake_redis, store):
+    request('BTCUSDT', '1h', 5)
+    request('BTCUSDT', '4h', 4, limit=50)
+    request('BTCUSDT', '1w', 3, limit=20)
+    request('BTCUSDT', '1d', 2)
+
+    result = warmer(store, budget=10).run()
+
+    assert store.synced == [('BTCUSDT', '1h', True), ('BTCUSDT', '1d', True)]
+    assert result['refreshed'] == ['BTCUSDT 1h', 'BTCUSDT 1d']
+
+
+def test_intervals_without_a_base_refresh_the_klines_cache(fake_redis, store):
+    request('BTCUSDT', '30m', 5, limit=200)
+    request('ETHUSDT', '30m', 4)
+    store.market_service.fresh_for[('ETHUSDT', '30m')] = LEAD + 1
+
+    warmer(store).run()
+
+    assert store.market_service.refreshed == [('BTCUSDT', '30m', 200)]
+    assert store.synced == []
+
+
+def test_report_ratios(fake_redis):
+    for status in ['hit', 'hit', 'stale', 'miss']:
+        HistoryCacheWarmer.record_access('BTCUSDT', '1h', 100, status)
+
+    row = HistoryCacheWarmer.report(2)[0]
+    assert (row['requests'], row['hit'], row['stale'], row['miss']) == (4, 2, 1, 1)
+    assert row['hit_ratio'] == 0.5
+    assert row['non_blocking_ratio'] == 0.75
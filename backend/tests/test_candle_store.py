@@ -0,0 +1,185 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from apps.trading.candle_store import CandleStore
+from apps.trading.models import Candle
+from apps.trading.utils.candles import CandleColumns
+from apps.trading.utils.resample import UNIT_MS, bucket_start, interval_to_ms, resample_ohlcv
+
+HOUR_MS = UNIT_MS['h']
+DAY_MS = UNIT_MS['d']
+
+
+def epoch_ms(*args) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def store_candles(symbol, interval, open_times):
+    Candle.objects.bulk_create(
+        Candle(
+            symbol=symbol, interval=interval, open_time=open_time,
+            open=100 + i, high=101 + i, low=99 + i, close=100.5 + i, volume=1,
+        )
+        for i, open_time in enumerate(open_times)
+    )
+
+
+def session_hours(first_day: datetime, days: int):
+    """Hourly open times 14:00-20:00 UTC on weekdays only, like a stock session"""
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        if day.weekday() < 5:
+            for hour in range(14, 21):
+                yield int(day.replace(hour=hour).timestamp() * 1000)
+
+
+def test_interval_to_ms():
+    assert interval_to_ms('4h') == 4 * HOUR_MS
+    assert interval_to_ms('1w') == 7 * DAY_MS
+    assert interval_to_ms('0h') is None
+    assert interval_to_ms('1y') is None
+
+
+def test_resample_aggregates_each_bucket():
+    start = epoch_ms(2024, 1, 1)
+    columns = {
+        'time': np.array([start + i * HOUR_MS for i in range(8)], dtype=np.int64),
+        'open': np.arange(8, dtype=float),
+        'high': np.array([5, 9, 1, 2, 3, 4, 8, 6], dtype=float),
+        'low': np.array([0, -3, 1, 2, 3, -1, 4, 5], dtype=float),
+        'close': np.arange(8, dtype=float) + 0.5,
+        'volume': np.ones(8),
+    }
+
+    bars = resample_ohlcv(columns, 4 * HOUR_MS)
+
+    assert bars['time'].tolist() == [start, start + 4 * HOUR_MS]
+    assert bars['open'].tolist() == [0, 4]
+    assert bars['high'].tolist() == [9, 8]
+    assert bars['low'].tolist() == [-3, -1]
+    assert bars['close'].tolist() == [3.5, 7.5]
+    assert bars['volume'].tolist() == [4, 4]
+
+
+def test_weekly_buckets_start_on_monday():
+    wednesday = epoch_ms(2024, 1, 3, 12)
+    monday = epoch_ms(2024, 1, 1)
+    assert bucket_start(wednesday, 7 * DAY_MS) == monday
+
+
+@pytest.mark.django_db
+def test_resampled_session_series_returns_limit_bars():
+    """Weekends and off-session hours must not shrink the window"""
+    store = CandleStore()
+    store_candles('AAPL', '1h', session_hours(datetime(2024, 1, 1, tzinfo=timezone.utc), 120))
+
+    bars = store.read_resampled('AAPL', '1h', '4h', 100)
+
+    assert len(bars) == 100
+    # Session 14:00-20:00 splits into 12:00 (2 bars), 16:00 (4) and 20:00 (1) buckets
+    assert set(np.diff(bars['time']).tolist()) <= {4 * HOUR_MS, 16 * HOUR_MS, 64 * HOUR_MS}
+
+
+@pytest.mark.django_db
+def test_resampled_weekly_from_weekday_dailies():
+    store = CandleStore()
+    first_monday = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    weekdays = [
+        int((first_monday + timedelta(days=offset)).timestamp() * 1000)
+        for offset in range(7 * 40) if (first_monday + timedelta(days=offset)).weekday() < 5
+    ]
+    store_candles('AAPL', '1d', weekdays)
+
+    bars = store.read_resampled('AAPL', '1d', '1w', 20)
+
+    assert len(bars) == 20
+    assert bars['volume'].tolist() == [5.0] * 20
+    assert bars.last_time == epoch_ms(2024, 9, 30)
+
+
+@pytest.mark.django_db
+def test_resampled_short_history_drops_partial_first_bar():
+    store = CandleStore()
+    # Starts at 02:00, inside the 00:00 4h bucket
+    start = epoch_ms(2024, 1, 1, 2)
+    store_candles('BTCUSDT', '1h', [start + i * HOUR_MS for i in range(10)])
+
+    bars = store.read_resampled('BTCUSDT', '1h', '4h', 50)
+
+    assert bars['time'].tolist() == [epoch_ms(2024, 1, 1, 4), epoch_ms(2024, 1, 1, 8)]
+    assert bars['volume'].tolist() == [4, 4]
+
+
+# ---------- Tail sync ----------
+
+class FakeUpstream:
+    """fetch_upstream_klines returning the most recent `limit` hourly candles, like Binance"""
+
+    def __init__(self, now_ms: int):
+        self.latest = bucket_start(now_ms, HOUR_MS)
+        self.requested = []
+
+    def __call__(self, symbol, asset_type, interval, limit):
+        self.requested.append(limit)
+        times = self.latest - HOUR_MS * np.arange(limit)[::-1]
+        return CandleColumns({
+            'time': times, 'open': np.full(limit, 200.0), 'high': np.full(limit, 201.0),
+            'low': np.full(limit, 199.0), 'close': np.full(limit, 200.5), 'volume': np.full(limit, 2.0),
+        })
+
+
+@pytest.fixture
+def synced_store(monkeypatch):
+    store = CandleStore()
+    upstream = FakeUpstream(int(time.time() * 1000))
+    monkeypatch.setattr(store.market_service, 'fetch_upstream_klines', upstream)
+    return store, upstream
+
+
+def stored_times(symbol='BTCUSDT'):
+    return list(Candle.objects.filter(symbol=symbol, interval='1h').order_by('open_time').values_list('open_time', flat=True))
+
+
+@pytest.mark.django_db
+def test_sync_fetches_only_the_missing_tail(synced_store):
+    store, upstream = synced_store
+    store_candles('BTCUSDT', '1h', [upstream.latest - HOUR_MS * offset for offset in range(10, 2, -1)])
+
+    written = store.sync('BTCUSDT', '1h', force=True)
+
+    # Three missing candles plus the last stored one, which may have been forming
+    assert upstream.requested == [4]
+    assert written == 4
+    times = stored_times()
+    assert times[-1] == upstream.latest
+    assert set(np.diff(times).tolist()) == {HOUR_MS}
+    assert Candle.objects.get(symbol='BTCUSDT', interval='1h', open_time=upstream.latest - 3 * HOUR_MS).close == 200.5
+
+
+@pytest.mark.django_db
+def test_sync_after_a_long_gap_rebackfills_instead_of_leaving_a_hole(synced_store):
+    store, upstream = synced_store
+    gap = CandleStore.BACKFILL_LIMIT + 500
+    store_candles('BTCUSDT', '1h', [upstream.latest - HOUR_MS * (gap + offset) for offset in range(5, 0, -1)])
+
+    written = store.sync('BTCUSDT', '1h', force=True)
+
+    assert upstream.requested == [CandleStore.BACKFILL_LIMIT]
+    assert written == CandleStore.BACKFILL_LIMIT
+    times = stored_times()
+    assert len(times) == CandleStore.BACKFILL_LIMIT
+    assert set(np.diff(times).tolist()) == {HOUR_MS}
+
+
+@pytest.mark.django_db
+def test_failed_sync_keeps_the_stored_series(synced_store, monkeypatch):
+    store, upstream = synced_store
+    old = [upstream.latest - HOUR_MS * (2000 + offset) for offset in range(5, 0, -1)]
+    store_candles('BTCUSDT', '1h', old)
+    monkeypatch.setattr(store.market_service, 'fetch_upstream_klines', lambda *args: None)
+
+    assert store.sync('BTCUSDT', '1h', force=True) == 0
+    assert stored_times() == old
@@ -0,0 +1,152 @@
+import json
+
+import numpy as np
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.trading.candle_store import CandleStore
+from apps.trading.utils.candles import (
+    DOWN_COLOR, FIELDS, PACK_HEADER, PACK_MAGIC, PACK_VERSION, UP_COLOR, CandleColumns,
+)
+
+HOUR_MS = 3_600_000
+START = 1_704_067_200_000  # 2024-01-01 00:00 UTC
+
+
+def series(count: int = 10) -> CandleColumns:
+    opens = 100 + np.arange(count, dtype=float)
+    return CandleColumns({
+        'time': START + HOUR_MS * np.arange(count),
+        'open': opens,
+        'high': opens + 2,
+        'low': opens - 2,
+        # Alternating up and down candles
+        'close': opens + np.where(np.arange(count) % 2, -0.5, 0.5),
+        'volume': np.arange(count, dtype=float) * 1.5,
+    })
+
+
+def assert_same(left: CandleColumns, right: CandleColumns):
+    for field in FIELDS:
+        assert left[field].dtype == right[field].dtype
+        np.testing.assert_array_equal(left[field], right[field])
+
+
+def test_pack_roundtrip():
+    data = series()
+    assert_same(CandleColumns.unpack(data.pack()), data)
+
+
+def test_pack_layout():
+    data = series(3)
+    packed = data.pack()
+
+    assert len(packed) == PACK_HEADER.size + 6 * 8 * 3
+    assert PACK_HEADER.size == 16
+    assert PACK_HEADER.unpack_from(packed) == (PACK_MAGIC, PACK_VERSION, 3)
+
+    # Every array sits at 16 + 8N * index, little-endian, as documented for browser views
+    times = np.frombuffer(packed, dtype='<i8', count=3, offset=16)
+    closes = np.frombuffer(packed, dtype='<f8', count=3, offset=16 + 8 * 3 * FIELDS.index('close'))
+    assert times.tolist() == data['time'].tolist()
+    assert closes.tolist() == data['close'].tolist()
+
+
+def test_pack_empty_series():
+    packed = CandleColumns.empty().pack()
+    assert len(packed) == PACK_HEADER.size
+    assert len(CandleColumns.unpack(packed)) == 0
+
+
+def test_unpack_rejects_foreign_bytes():
+    packed = bytearray(series(2).pack())
+    packed[:4] = b'JUNK'
+    with pytest.raises(ValueError, match='Not a packed candle series'):
+        CandleColumns.unpack(bytes(packed))
+
+    packed = bytearray(series(2).pack())
+    packed[4] = PACK_VERSION + 1
+    with pytest.raises(ValueError):
+        CandleColumns.unpack(bytes(packed))
+
+
+def test_parsers_build_the_same_columns():
+    klines = [[START, '1.5', '2.0', '1.0', '1.75', '10', START + HOUR_MS - 1, '0']]
+    rows = [(START, 1.5, 2.0, 1.0, 1.75, 10)]
+
+    assert_same(CandleColumns.from_binance(klines), CandleColumns.from_rows(rows))
+    assert len(CandleColumns.from_binance([])) == 0
+    assert CandleColumns.from_rows(rows).last_time == START
+
+
+def test_to_chart_matches_the_original_payload():
+    data = series(2)
+    chart = data.to_chart()
+
+    assert chart['ohlc'][0] == {'time': START, 'open': 100.0, 'high': 102.0, 'low': 98.0, 'close': 100.5}
+    assert [bar['color'] for bar in chart['volume']] == [UP_COLOR, DOWN_COLOR]
+    assert [bar['value'] for bar in chart['volume']] == [0.0, 1.5]
+
+
+def test_to_columnar():
+    columnar = series(3).to_columnar()
+
+    assert columnar['format'] == 'columnar'
+    assert columnar['count'] == 3
+    assert columnar['time'] == [START, START + HOUR_MS, START + 2 * HOUR_MS]
+    assert columnar['close'] == [100.5, 100.5, 102.5]
+    json.dumps(columnar)
+
+
+def test_tail():
+    data = series(10)
+    assert data.tail(20) is data
+    assert data.tail(3)['time'].tolist() == data['time'][-3:].tolist()
+
+
+# ---------- MarketHistoryView formats ----------
+
+@pytest.fixture
+def history(fake_redis, monkeypatch):
+    """GET market history with CandleStore serving `series()`"""
+    data = series()
+
+    def get_market_data(store, symbol, interval, limit):
+        store.last_cache_status = 'hit'
+        return data
+
+    monkeypatch.setattr(CandleStore, 'get_market_data', get_market_data)
+    client = APIClient()
+
+    def get(accept=None, **params):
+        headers = {'HTTP_ACCEPT': accept} if accept else {}
+        return client.get(reverse('trading:market-history'), params or {'symbol': 'BTCUSDT'}, **headers)
+
+    get.data = data
+    return get
+
+
+def test_history_defaults_to_chart_json(history):
+    response = history()
+    assert response['Content-Type'] == 'application/json'
+    assert response.json() == json.loads(json.dumps(history.data.to_chart()))
+
+
+def test_history_columnar_json(history):
+    response = history('application/vnd.bemo.candles+json')
+    assert response['Content-Type'].startswith('application/vnd.bemo.candles+json')
+    assert response.json()['count'] == len(history.data)
+
+
+def test_history_binary(history):
+    response = history('application/vnd.bemo.candles')
+    assert response['Content-Type'] == 'application/vnd.bemo.candles'
+    assert_same(CandleColumns.unpack(response.content), history.data)
+
+
+def test_history_binary_errors_stay_json(history):
+    response = history('application/vnd.bemo.candles', interval='1h')
+    assert response.status_code == 400
+    assert response['Content-Type'] == 'application/json'
+    assert response.json() == {'error': 'Symbol is required'}
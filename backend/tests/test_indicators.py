@@ -0,0 +1,225 @@
+import math
+
+import numpy as np
+import pytest
+
+from apps.trading.indicator_cache import IndicatorService
+from apps.trading.utils import indicators
+from apps.trading.utils.candles import CandleColumns
+
+RTOL = 1e-9
+
+
+def random_walk(count: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, count)))
+
+
+def candles(count: int = 600, seed: int = 7) -> CandleColumns:
+    close = random_walk(count, seed)
+    spread = np.abs(np.random.default_rng(seed + 1).normal(0, 0.5, count))
+    return CandleColumns({
+        'time': 1_704_067_200_000 + 3_600_000 * np.arange(count),
+        'open': np.concatenate(([close[0]], close[:-1])),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': np.full(count, 10.0),
+    })
+
+
+# ---------- Loop references (the textbook recurrences) ----------
+
+def ema_loop(values, period):
+    out = [math.nan] * len(values)
+    valid = [i for i, value in enumerate(values) if not math.isnan(value)]
+    if len(valid) < period:
+        return out
+    seed_index = valid[0] + period - 1
+    level = sum(values[valid[0]:seed_index + 1]) / period
+    out[seed_index] = level
+    alpha = 2 / (period + 1)
+    for i in range(seed_index + 1, len(values)):
+        level += alpha * (values[i] - level)
+        out[i] = level
+    return out
+
+
+def wilder_loop(values, period, first=0):
+    out = [math.nan] * len(values)
+    seed_index = first + period - 1
+    if seed_index >= len(values):
+        return out
+    level = sum(values[first:seed_index + 1]) / period
+    out[seed_index] = level
+    for i in range(seed_index + 1, len(values)):
+        level = (level * (period - 1) + values[i]) / period
+        out[i] = level
+    return out
+
+
+def rsi_loop(close, period):
+    out = [math.nan] * len(close)
+    if len(close) <= period:
+        return out
+    gains = [0.0] + [max(close[i] - close[i - 1], 0.0) for i in range(1, len(close))]
+    losses = [0.0] + [max(close[i - 1] - close[i], 0.0) for i in range(1, len(close))]
+    average_gain = wilder_loop(gains, period, first=1)
+    average_loss = wilder_loop(losses, period, first=1)
+    for i in range(period, len(close)):
+        if average_loss[i] == 0:
+            out[i] = 100.0
+        else:
+            out[i] = 100 - 100 / (1 + average_gain[i] / average_loss[i])
+    return out
+
+
+def atr_loop(high, low, close, period):
+    ranges = [high[0] - low[0]] + [
+        max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        for i in range(1, len(close))
+    ]
+    return wilder_loop(ranges, period)
+
+
+def assert_series(actual, expected):
+    np.testing.assert_allclose(actual, np.array(expected, dtype=float), rtol=RTOL, equal_nan=True)
+
+
+# ---------- Closed-form indicators vs loops ----------
+
+@pytest.mark.parametrize('period', [1, 2, 14, 50, 200])
+def test_ema_matches_loop(period):
+    close = random_walk(3000)
+    assert_series(indicators.ema(close, period), ema_loop(close.tolist(), period))
+
+
+@pytest.mark.parametrize('period', [2, 14, 100])
+def test_rsi_matches_loop(period):
+    close = random_walk(3000)
+    assert_series(indicators.rsi(close, period), rsi_loop(close.tolist(), period))
+
+
+def test_rsi_is_100_without_losses():
+    result = indicators.rsi(np.arange(1.0, 31.0), 14)
+    assert np.isnan(result[:14]).all()
+    assert (result[14:] == 100.0).all()
+
+
+def test_wilder_matches_loop_from_offset():
+    values = random_walk(500)
+    assert_series(indicators.wilder(values, 20, first=5), wilder_loop(values.tolist(), 20, first=5))
+
+
+def test_smooth_spans_many_blocks_without_drift():
+    # About 1000 values per closed-form block, so the level is carried across ~20 blocks
+    values = random_walk(20_000)
+    alpha = 2 / 41
+    expected = [values[0]]
+    for value in values[1:]:
+        expected.append(expected[-1] + alpha * (value - expected[-1]))
+    assert_series(indicators.smooth(values, alpha, 0), expected)
+
+
+def test_atr_matches_loop():
+    data = candles()
+    assert_series(
+        indicators.atr(data['high'], data['low'], data['close'], 14),
+        atr_loop(data['high'].tolist(), data['low'].tolist(), data['close'].tolist(), 14),
+    )
+
+
+def test_macd_signal_is_seeded_after_the_slow_ema():
+    close = random_walk(400)
+    result = indicators.macd(close, 12, 26, 9)
+
+    line = np.array(ema_loop(close.tolist(), 12)) - np.array(ema_loop(close.tolist(), 26))
+    assert_series(result['macd'], line)
+    assert_series(result['signal'], ema_loop(line.tolist(), 9))
+    assert np.isnan(result['signal'][:25 + 8]).all() and not np.isnan(result['signal'][25 + 8])
+
+
+def test_sma_and_bollinger():
+    close = random_walk(100)
+    middle = [math.nan] * 19 + [close[i - 19:i + 1].mean() for i in range(19, 100)]
+    deviation = [math.nan] * 19 + [close[i - 19:i + 1].std() for i in range(19, 100)]
+
+    bands = indicators.bollinger(close, 20, 2.0)
+    assert_series(indicators.sma(close, 20), middle)
+    assert_series(bands['upper'], np.array(middle) + 2 * np.array(deviation))
+    assert_series(bands['lower'], np.array(middle) - 2 * np.array(deviation))
+
+
+def test_short_series_are_all_nan():
+    close = random_walk(5)
+    assert np.isnan(indicators.ema(close, 10)).all()
+    assert np.isnan(indicators.rsi(close, 10)).all()
+    assert np.isnan(indicators.sma(close, 10)).all()
+
+
+# ---------- IndicatorService ----------
+
+class StubStore:
+    def __init__(self, data):
+        self.data = data
+        self.requested = []
+
+    def series_key(self, symbol):
+        return symbol.upper(), 'crypto'
+
+    def get_market_data(self, symbol, interval, limit):
+        self.requested.append(limit)
+        return self.data.tail(limit)
+
+
+def test_parse_defaults_and_labels():
+    parsed = IndicatorService.parse('SMA:50, macd, bollinger:10')
+    assert parsed == [('sma', (50,)), ('macd', (12, 26, 9)), ('bollinger', (10, 2.0))]
+    assert [IndicatorService.label(*item) for item in parsed] == ['sma_50', 'macd_12_26_9', 'bollinger_10_2']
+    assert len(IndicatorService.parse(None)) == 6
+
+
+@pytest.mark.parametrize('spec, message', [
+    ('vwap', 'Unknown indicator'),
+    ('sma:10:20', 'Too many parameters'),
+    ('sma:ten', 'Invalid parameters'),
+    ('ema:0', 'between 1 and'),
+    ('rsi:501', 'between 1 and'),
+    ('bollinger:20:11', 'bollinger width'),
+    ('macd:26:12', 'fast period'),
+])
+def test_parse_errors(spec, message):
+    with pytest.raises(ValueError, match=message):
+        IndicatorService.parse(spec)
+
+
+def test_results_are_memoized_per_last_candle():
+    store = StubStore(candles())
+    service = IndicatorService(store)
+
+    first = service.get('btcusdt', '1h', 'ema:20,rsi:14', limit=100)
+    assert (first['memoized'], first['computed']) == (0, 2)
+    assert len(first['time']) == 100 and len(first['indicators']['rsi_14']) == 100
+    # Enough warmup for the longest period
+    assert store.requested == [100 + 20 * IndicatorService.WARMUP_FACTOR]
+
+    second = service.get('BTCUSDT', '1h', 'rsi:14,ema:20', limit=100)
+    assert (second['memoized'], second['computed']) == (2, 0)
+    assert second['indicators'] == first['indicators']
+
+    # The forming candle moved: nothing is served from the old result
+    store.data.columns['close'] = store.data['close'].copy()
+    store.data.columns['close'][-1] += 1
+    third = service.get('BTCUSDT', '1h', 'ema:20,rsi:14', limit=100)
+    assert (third['memoized'], third['computed']) == (0, 2)
+    assert third['indicators']['ema_20'][-1] != first['indicators']['ema_20'][-1]
+
+
+def test_undefined_values_are_null_and_conditions_are_reported():
+    service = IndicatorService(StubStore(candles(60)))
+    result = service.get('BTCUSDT', '1h', 'sma:50', limit=60)
+
+    assert result['indicators']['sma_50'][:49] == [None] * 49
+    assert result['indicators']['sma_50'][49] is not None
+    assert set(result['market_conditions']) == {'volatility', 'trend', 'volume'}
+    assert -1 < result['market_conditions']['trend'] < 1
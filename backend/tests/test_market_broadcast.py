@@ -0,0 +1,190 @@
+import asyncio
+import json
+
+from apps.trading.market_broadcast import (
+    CATEGORIES, PROTOCOL_DELTA, PROTOCOL_FULL, MarketBroadcaster, apply_selection,
+)
+
+
+def asset(asset_id, symbol, category, price=1.0):
+    return {'id': asset_id, 'symbol': symbol, 'category': category, 'name': symbol, 'price': price}
+
+
+UNIVERSE = [
+    asset('bitcoin', 'BTC', 'crypto', 100.0),
+    asset('ethereum', 'ETH', 'crypto', 10.0),
+    asset('aapl', 'AAPL', 'stocks', 200.0),
+    asset('eurusd', 'EUR/USD', 'forex', 1.1),
+]
+
+
+class FakeReader:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    async def market_snapshot(self):
+        return self.snapshot
+
+
+class FakeConsumer:
+    def __init__(self):
+        self.frames = []
+
+    async def send(self, text_data):
+        self.frames.append(json.loads(text_data))
+
+    @property
+    def last(self):
+        return self.frames[-1]
+
+
+async def no_loop():
+    """Stands in for the broadcast loop: tests drive tick() themselves"""
+
+
+def broadcaster(snapshot=UNIVERSE):
+    instance = MarketBroadcaster()
+    instance.reader = FakeReader([dict(item) for item in snapshot])
+    instance._run = no_loop
+    return instance
+
+
+def run(scenario):
+    asyncio.run(scenario())
+
+
+async def subscribed(instance, protocol, selection=None):
+    consumer = FakeConsumer()
+    await instance.subscribe(consumer, protocol, selection)
+    return consumer
+
+
+def ids(frame):
+    return sorted(item['id'] for item in frame['data'])
+
+
+# ---------- apply_selection ----------
+
+def test_first_subscribe_narrows_and_first_unsubscribe_carves_out():
+    assert apply_selection(None, categories=['crypto']) == (frozenset({'crypto'}), frozenset(), frozenset())
+    assert apply_selection(None, categories=['forex'], remove=True) == (
+        frozenset(CATEGORIES) - {'forex'}, frozenset(), frozenset()
+    )
+    assert apply_selection(None, categories=['bogus']) == (frozenset(), frozenset(), frozenset())
+
+
+def test_unsubscribing_a_symbol_of_a_subscribed_category_excludes_it():
+    selection = apply_selection(None, symbols=['btc'], remove=True)
+    assert selection == (frozenset(CATEGORIES), frozenset(), frozenset({'BTC'}))
+
+    # Subscribing the symbol again lifts the exclusion and restores "everything"
+    assert apply_selection(selection, symbols=['BTC']) is None
+    # Subscribing its category does not
+    assert apply_selection(selection, categories=['crypto']) == selection
+
+
+def test_subscribing_every_category_is_everything():
+    selection = apply_selection(None, categories=['crypto', 'stocks'], symbols=['EUR/USD'])
+    assert apply_selection(selection, categories=['forex', 'commodities']) is None
+
+
+# ---------- Per-selection frames ----------
+
+def test_selections_get_their_category_slices_and_symbols():
+    async def scenario():
+        instance = broadcaster()
+        everyone = await subscribed(instance, PROTOCOL_FULL)
+        crypto = await subscribed(instance, PROTOCOL_FULL, apply_selection(None, categories=['crypto']))
+        mixed = await subscribed(instance, PROTOCOL_FULL, apply_selection(None, categories=['stocks'], symbols=['eth']))
+        await instance.tick()
+
+        assert ids(everyone.last) == ['aapl', 'bitcoin', 'ethereum', 'eurusd']
+        assert ids(crypto.last) == ['bitcoin', 'ethereum']
+        assert ids(mixed.last) == ['aapl', 'ethereum']
+
+    run(scenario)
+
+
+def test_unsubscribed_symbol_is_left_out_of_its_category():
+    async def scenario():
+        instance = broadcaster()
+        selection = apply_selection(None, symbols=['BTC'], remove=True)
+        full = await subscribed(instance, PROTOCOL_FULL, selection)
+        delta = await subscribed(instance, PROTOCOL_DELTA, selection)
+        await instance.tick()
+        assert ids(full.last) == ['aapl', 'ethereum', 'eurusd']
+        assert ids(delta.last) == ['aapl', 'ethereum', 'eurusd']
+
+        instance.reader.snapshot = [dict(item, price=item['price'] * 2) for item in UNIVERSE]
+        await instance.tick()
+        assert delta.last['type'] == 'market_delta'
+        assert sorted(delta.last['changes']) == ['aapl', 'ethereum', 'eurusd']
+
+    run(scenario)
+
+
+def test_delta_frames_follow_the_selection():
+    async def scenario():
+        instance = broadcaster()
+        await instance.tick()
+        consumer = await subscribed(instance, PROTOCOL_DELTA, apply_selection(None, categories=['crypto']))
+        assert consumer.last['type'] == 'market_snapshot'
+        version = consumer.last['version']
+
+        instance.reader.snapshot = [
+            dict(item, price=item['price'] + 1) if item['id'] in ('bitcoin', 'aapl') else dict(item)
+            for item in UNIVERSE
+        ] + [asset('solana', 'SOL', 'crypto', 5.0), asset('msft', 'MSFT', 'stocks', 300.0)]
+        await instance.tick()
+
+        delta = consumer.last
+        assert delta['type'] == 'market_delta' and delta['base_version'] == version
+        assert delta['changes'] == {'bitcoin': {'price': 101.0}}
+        assert [item['id'] for item in delta['added']] == ['solana']
+
+    run(scenario)
+
+
+def test_symbol_selected_asset_removal_reaches_the_socket():
+    async def scenario():
+        instance = broadcaster()
+        await instance.tick()
+        # AAPL is picked by symbol, not through its category
+        consumer = await subscribed(
+            instance, PROTOCOL_DELTA, apply_selection(None, categories=['crypto'], symbols=['AAPL'])
+        )
+        assert ids(consumer.last) == ['aapl', 'bitcoin', 'ethereum']
+
+        instance.reader.snapshot = [dict(item) for item in UNIVERSE if item['id'] != 'aapl']
+        await instance.tick()
+
+        assert consumer.last['type'] == 'market_delta'
+        assert consumer.last['removed'] == ['aapl']
+
+    run(scenario)
+
+
+def test_unchanged_tick_sends_no_delta():
+    async def scenario():
+        instance = broadcaster()
+        await instance.tick()
+        consumer = await subscribed(instance, PROTOCOL_DELTA)
+        await instance.tick()
+        assert len(consumer.frames) == 1
+
+    run(scenario)
+
+
+def test_frames_are_encoded_once_per_selection():
+    async def scenario():
+        instance = broadcaster()
+        selection = apply_selection(None, categories=['crypto'])
+        consumers = [await subscribed(instance, PROTOCOL_FULL, selection) for _ in range(5)]
+        await subscribed(instance, PROTOCOL_FULL)
+        await instance.tick()
+
+        assert instance.last_tick['subscribers'] == 6
+        assert instance.last_tick['frames'] == 2
+        assert all(consumer.last == consumers[0].last for consumer in consumers)
+
+    run(scenario)
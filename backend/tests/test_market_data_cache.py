@@ -0,0 +1,195 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+
+from apps.trading import tasks
+from apps.trading.candle_store import CandleStore
+from apps.trading.services import MarketDataService
+from apps.trading.utils.candles import CandleColumns
+
+SYMBOL = 'BTCUSDT'
+INTERVAL = '1h'
+SOFT_TTL = 60
+HARD_TTL = 900
+
+
+def candles(close: float) -> CandleColumns:
+    return CandleColumns({
+        'time': [0, 3_600_000],
+        'open': [1.0, 1.0],
+        'high': [2.0, close + 1],
+        'low': [0.5, 0.5],
+        'close': [1.5, close],
+        'volume': [10.0, 10.0],
+    })
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.time() for the service and the cache backend alike"""
+    fake = Clock()
+    monkeypatch.setattr(time, 'time', fake)
+    return fake
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Records upstream fetches; set .result to what the provider returns"""
+    class Upstream:
+        calls = 0
+        result = candles(100.0)
+
+    def fetch(service, symbol, asset_type, interval, limit):
+        Upstream.calls += 1
+        return Upstream.result
+
+    monkeypatch.setattr(MarketDataService, 'fetch_upstream_klines', fetch)
+    return Upstream
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Refresh tasks queued by fetch_market_data (not run)"""
+    calls = []
+    monkeypatch.setattr(tasks.refresh_market_data, 'delay', lambda *args: calls.append(args))
+    return calls
+
+
+@pytest.fixture
+def service(fake_redis, settings, clock, upstream, queued):
+    settings.MARKET_DATA_CACHE_TTL = {'crypto': SOFT_TTL}
+    settings.MARKET_DATA_CACHE_HARD_TTL = {'crypto': HARD_TTL}
+    return MarketDataService()
+
+
+def closes(data):
+    return data['close'].tolist()
+
+
+def test_miss_then_hit(service, upstream):
+    assert closes(service.fetch_market_data(SYMBOL, INTERVAL)) == [1.5, 100.0]
+    assert service.last_cache_status == 'miss'
+
+    service.fetch_market_data(SYMBOL, INTERVAL)
+    assert service.last_cache_status == 'hit'
+    assert upstream.calls == 1
+    assert service.cache_fresh_for(SYMBOL, INTERVAL) == SOFT_TTL
+
+
+def test_stale_entry_is_served_at_once_and_refreshed_once(service, upstream, queued, clock):
+    service.fetch_market_data(SYMBOL, INTERVAL, limit=50)
+    clock.now += SOFT_TTL + 1
+    upstream.result = candles(200.0)
+
+    for _ in range(5):
+        assert closes(service.fetch_market_data(SYMBOL, INTERVAL, limit=50)) == [1.5, 100.0]
+        assert service.last_cache_status == 'stale'
+
+    assert upstream.calls == 1
+    assert queued == [(SYMBOL, INTERVAL, 50)]
+
+    # The refresh task revalidates the entry and clears the queue marker
+    service.refresh_market_data(*queued[0])
+    assert closes(service.fetch_market_data(SYMBOL, INTERVAL)) == [1.5, 200.0]
+    assert service.last_cache_status == 'hit'
+
+    clock.now += SOFT_TTL + 1
+    service.fetch_market_data(SYMBOL, INTERVAL, limit=50)
+    assert len(queued) == 2
+
+
+def test_failed_refresh_keeps_serving_and_throttles_retries(service, upstream, queued, clock):
+    service.fetch_market_data(SYMBOL, INTERVAL)
+    clock.now += SOFT_TTL + 1
+    service.fetch_market_data(SYMBOL, INTERVAL)
+
+    upstream.result = CandleColumns.empty()
+    assert service.refresh_market_data(*queued[0]) is None
+
+    assert closes(service.fetch_market_data(SYMBOL, INTERVAL)) == [1.5, 100.0]
+    assert len(queued) == 1
+
+    # The marker expires, so the refresh is retried
+    clock.now += MarketDataService.REFRESH_MARKER_TTL + 1
+    service.fetch_market_data(SYMBOL, INTERVAL)
+    assert len(queued) == 2
+
+
+def test_hard_ttl_miss_blocks_on_upstream(service, upstream, queued, clock):
+    service.fetch_market_data(SYMBOL, INTERVAL)
+    clock.now += HARD_TTL + 1
+    upstream.result = candles(300.0)
+
+    assert closes(service.fetch_market_data(SYMBOL, INTERVAL)) == [1.5, 300.0]
+    assert service.last_cache_status == 'miss'
+    assert upstream.calls == 2
+    assert queued == []
+
+
+def test_broker_down_still_serves_stale(service, upstream, clock, monkeypatch):
+    def broker_down(*args):
+        raise ConnectionError('broker unreachable')
+
+    monkeypatch.setattr(tasks.refresh_market_data, 'delay', broker_down)
+    service.fetch_market_data(SYMBOL, INTERVAL)
+    clock.now += SOFT_TTL + 1
+
+    assert closes(service.fetch_market_data(SYMBOL, INTERVAL)) == [1.5, 100.0]
+    assert service.last_cache_status == 'stale'
+    # The marker is dropped so the next request tries to queue again
+    cache_key = service._generate_cache_key(service.canonical_symbol(SYMBOL, 'crypto'), INTERVAL, 'crypto')
+    assert cache.get(f'{MarketDataService.REFRESH_MARKER_PREFIX}{cache_key}') is None
+
+
+# ---------- Stored candles (MarketHistoryView) ----------
+
+@pytest.fixture
+def queued_syncs(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tasks.sync_candles, 'delay', lambda *args: calls.append(args))
+    return calls
+
+
+@pytest.mark.django_db
+def test_stored_candles_are_served_and_synced_in_background(service, upstream, queued_syncs):
+    store = CandleStore(service)
+    store.upsert('BTCUSDT', INTERVAL, candles(100.0))
+
+    for _ in range(3):
+        assert closes(store.get_market_data(SYMBOL, INTERVAL, 10)) == [1.5, 100.0]
+    assert queued_syncs == [(SYMBOL, INTERVAL)]
+    assert upstream.calls == 0
+    assert 0 < store.sync_due_in(SYMBOL, INTERVAL) <= SOFT_TTL
+
+
+@pytest.mark.django_db
+def test_empty_series_is_backfilled_inline(service, upstream, queued_syncs):
+    store = CandleStore(service)
+
+    assert closes(store.get_market_data(SYMBOL, INTERVAL, 10)) == [1.5, 100.0]
+    assert store.last_cache_status == 'miss'
+    assert upstream.calls == 1
+    assert queued_syncs == []
+
+
+def test_waiters_serve_stale_when_the_lock_holder_fails(service, upstream, fake_redis):
+    cache_key = service._generate_cache_key(service.canonical_symbol(SYMBOL, 'crypto'), INTERVAL, 'crypto')
+    cache.set(f'{cache_key}{MarketDataService.STALE_CACHE_SUFFIX}', candles(50.0).pack())
+
+    # Another worker holds the fetch lock and its upstream call fails
+    holder = fake_redis.lock(f'{MarketDataService.FETCH_LOCK_PREFIX}{cache_key}', timeout=10, thread_local=False)
+    assert holder.acquire(blocking=False)
+    threading.Timer(0.2, holder.release).start()
+
+    assert closes(service.fetch_market_data(SYMBOL, INTERVAL)) == [1.5, 50.0]
+    assert upstream.calls == 0
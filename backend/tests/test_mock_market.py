@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+
+from apps.trading.mock_market import MockMarketEngine
+
+TICK = 1_000_000
+
+# MarketConsumer and MarketDataService register different symbol sets
+CONSUMER_ASSETS = [('stocks', 'AAPL'), ('stocks', 'MSFT')]
+SERVICE_ASSETS = [('stocks', 'AAPL'), ('commodities', 'GOLD'), ('commodities', 'OIL')]
+
+
+def price(state, key):
+    return state['prices'][state['keys'].index(key)]
+
+
+def test_symbol_prices_do_not_depend_on_the_other_symbols_tracked():
+    small = MockMarketEngine([('stocks', 'AAPL')])
+    small.advance(TICK)
+    alone = price(small.advance(TICK + 50), 'stocks:AAPL')
+
+    cache.clear()
+    large = MockMarketEngine(SERVICE_ASSETS + [('stocks', f'S{i}') for i in range(40)])
+    large.advance(TICK)
+    together = price(large.advance(TICK + 50), 'stocks:AAPL')
+
+    assert alone == together
+    assert alone != MockMarketEngine._anchor('stocks:AAPL')[0]
+
+
+def test_concurrent_first_advance_keeps_the_union_of_symbols(monkeypatch):
+    original = MockMarketEngine._advanced
+
+    def slow_advanced(engine, state, tick):
+        # Hold the lock long enough for the other caller to read the empty state
+        if engine.keys == sorted(f'{c}:{s}' for c, s in CONSUMER_ASSETS):
+            time.sleep(0.2)
+        return original(engine, state, tick)
+
+    monkeypatch.setattr(MockMarketEngine, '_advanced', slow_advanced)
+
+    consumer = MockMarketEngine(CONSUMER_ASSETS)
+    service = MockMarketEngine(SERVICE_ASSETS)
+    results = {}
+
+    def run(name, engine):
+        results[name] = engine.advance(TICK)
+
+    threads = [threading.Thread(target=run, args=('consumer', consumer))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads.append(threading.Thread(target=run, args=('service', service)))
+    threads[1].start()
+    for thread in threads:
+        thread.join()
+
+    stored = cache.get(MockMarketEngine.STATE_CACHE_KEY)
+    assert set(stored['keys']) == set(consumer.keys) | set(service.keys)
+    assert price(results['consumer'], 'stocks:AAPL') == price(results['service'], 'stocks:AAPL')
+
+    # The next tick walks every symbol; nothing is reseeded at its anchor
+    following = consumer.advance(TICK + 1)
+    assert set(following['keys']) == set(stored['keys'])
+    for key in stored['keys']:
+        assert price(following, key) != MockMarketEngine._anchor(key)[0]
+
+
+def test_same_tick_quotes_are_identical_for_every_caller():
+    consumer = MockMarketEngine(CONSUMER_ASSETS)
+    service = MockMarketEngine(SERVICE_ASSETS)
+    consumer.advance(TICK)
+    service.advance(TICK)
+
+    now = (TICK + 30) * MockMarketEngine.TICK_SECONDS
+    consumer_quotes = consumer.quotes(now)
+    service_quotes = service.quotes(now)
+
+    assert consumer_quotes['stocks:AAPL'] == service_quotes['stocks:AAPL']
+    assert set(consumer_quotes) == set(service_quotes)
+
+
+def test_busy_lock_serves_the_tick_without_saving(monkeypatch):
+    monkeypatch.setattr(MockMarketEngine, 'LOCK_WAIT', 0.05)
+    engine = MockMarketEngine(SERVICE_ASSETS)
+    engine.advance(TICK)
+
+    cache.add(MockMarketEngine.LOCK_CACHE_KEY, 1, MockMarketEngine.LOCK_TTL)
+    served = engine.advance(TICK + 5)
+    assert served['tick'] == TICK + 5
+    assert cache.get(MockMarketEngine.STATE_CACHE_KEY)['tick'] == TICK
+
+    cache.delete(MockMarketEngine.LOCK_CACHE_KEY)
+    assert engine.advance(TICK + 5) == served
+
+
+@pytest.mark.parametrize('steps', [1, 400])
+def test_walk_stays_positive(steps):
+    engine = MockMarketEngine(SERVICE_ASSETS)
+    engine.advance(TICK)
+    state = engine.advance(TICK + steps)
+    assert all(value > 0 for value in state['prices'])
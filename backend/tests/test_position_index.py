@@ -0,0 +1,73 @@
+from django.db.models.query import QuerySet
+from django.utils import timezone
+
+from apps.trading.bot.position_index import OpenPositionIndex
+
+
+def close(trade):
+    trade.is_open = False
+    trade.closed_at = timezone.now()
+    trade.save(update_fields=['is_open', 'closed_at'])
+
+
+def test_rebuild_indexes_open_trades_and_drops_stale_members(fake_redis, bot_user, open_trade):
+    index = OpenPositionIndex()
+    trades = [open_trade(), open_trade()]
+    closed = open_trade()
+    close(closed)
+    fake_redis.zadd(index.key(bot_user.id), {str(closed.id): 1.0})
+
+    assert index.rebuild() == 2
+    assert index.is_ready()
+    assert set(fake_redis.zrange(index.key(bot_user.id), 0, -1)) == {str(trade.id) for trade in trades}
+    assert not fake_redis.keys(f'{index.STAGING_PREFIX}*')
+
+
+def test_rebuild_keeps_writes_made_while_streaming(fake_redis, bot_user, open_trade, monkeypatch):
+    """A position closed after its row was read must not come back; one opened meanwhile must stay"""
+    index = OpenPositionIndex()
+    kept, closed_meanwhile = open_trade(), open_trade()
+    index.add([kept, closed_meanwhile])
+    opened_meanwhile = []
+
+    original_iterator = QuerySet.iterator
+
+    def interleaved(queryset, *args, **kwargs):
+        rows = list(original_iterator(queryset, *args, **kwargs))
+        # Simulator activity between the DB read and the swap
+        close(closed_meanwhile)
+        index.remove([closed_meanwhile])
+        opened_meanwhile.append(open_trade())
+        index.add(opened_meanwhile)
+        yield from rows
+
+    monkeypatch.setattr(QuerySet, 'iterator', interleaved)
+    index.rebuild()
+
+    members = set(fake_redis.zrange(index.key(bot_user.id), 0, -1))
+    assert members == {str(kept.id), str(opened_meanwhile[0].id)}
+    assert index.count(bot_user.id) == 2
+    assert not fake_redis.exists(index.REBUILDING_KEY, index.CLOSED_DURING_REBUILD_KEY)
+
+
+def test_writes_outside_rebuild_touch_only_live_keys(fake_redis, bot_user, open_trade):
+    index = OpenPositionIndex()
+    trade = open_trade()
+
+    index.add([trade])
+    assert fake_redis.zrange(index.key(bot_user.id), 0, -1) == [str(trade.id)]
+    index.remove([trade])
+
+    assert fake_redis.keys('*') == []
+
+
+def test_reconcile_prunes_deleted_trades_and_returns_db_counts(fake_redis, bot_user, open_trade):
+    index = OpenPositionIndex()
+    kept, deleted = open_trade(), open_trade()
+    index.add([kept, deleted])
+    fake_redis.set(index.READY_KEY, 1)
+    deleted.delete()
+
+    assert index.count(bot_user.id) == 2
+    assert index.reconcile([bot_user.id]) == {bot_user.id: 1}
+    assert fake_redis.zrange(index.key(bot_user.id), 0, -1) == [str(kept.id)]
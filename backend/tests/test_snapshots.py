@@ -0,0 +1,134 @@
+import asyncio
+import json
+import time
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+
+from apps.trading import snapshots
+from apps.trading.bot.simulator import send_bot_trades_updates
+from apps.trading.consumers import BalanceConsumer
+from apps.trading.snapshots import AsyncSnapshotReader, balance_snapshot_key
+from apps.trading.utils import redis_client
+
+REDIS_DELAY = 0.3
+TICK = 0.01
+MAX_TICK_LAG = 0.05
+
+
+class SlowAsyncRedis(fakeredis.aioredis.FakeRedis):
+    """Async fake whose reads take REDIS_DELAY, like a Redis latency spike"""
+
+    delay = REDIS_DELAY
+
+    async def get(self, name):
+        await asyncio.sleep(self.delay)
+        return await super().get(name)
+
+
+@pytest.fixture
+def slow_redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    client = SlowAsyncRedis(server=server, decode_responses=True)
+    monkeypatch.setattr(snapshots, 'get_async_redis_connection', lambda: client)
+    return fakeredis.FakeRedis(server=server, decode_responses=True)
+
+
+async def run_with_ticker(coroutine):
+    """Run coroutine next to a TICK ticker; returns (result, ticks, worst lag in seconds)"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            expected = time.perf_counter() + TICK
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - expected)
+
+    ticker_task = asyncio.ensure_future(ticker())
+    try:
+        result = await coroutine
+    finally:
+        done.set()
+        await ticker_task
+    return result, len(lags), max(lags)
+
+
+def test_slow_snapshot_reads_do_not_block_the_loop(slow_redis):
+    user_ids = [uuid.uuid4() for _ in range(50)]
+    for user_id in user_ids:
+        slow_redis.set(balance_snapshot_key(user_id), '123.45')
+    reader = AsyncSnapshotReader()
+
+    async def read_all():
+        return await asyncio.gather(*[reader.balance(user_id) for user_id in user_ids])
+
+    balances, ticks, worst_lag = asyncio.run(run_with_ticker(read_all()))
+
+    assert balances == ['123.45'] * len(user_ids)
+    # 50 reads of 0.3s overlap instead of queueing behind each other
+    assert ticks >= REDIS_DELAY / TICK * 0.5
+    assert worst_lag < MAX_TICK_LAG
+
+
+def test_snapshot_read_gives_up_after_timeout(slow_redis, monkeypatch):
+    monkeypatch.setattr(AsyncSnapshotReader, 'READ_TIMEOUT', 0.05)
+    slow_redis.set(snapshots.MARKET_SNAPSHOT_KEY, json.dumps([{'symbol': 'BTC'}]))
+
+    started = time.perf_counter()
+    assert asyncio.run(AsyncSnapshotReader().market_snapshot()) is None
+    assert time.perf_counter() - started < REDIS_DELAY
+
+
+def test_balance_consumer_sends_snapshot_while_loop_keeps_ticking(slow_redis):
+    user = SimpleNamespace(id=uuid.uuid4(), pk=None, email='ws@example.com', is_authenticated=True)
+    slow_redis.set(balance_snapshot_key(user.id), '250.00')
+
+    async def connect_and_receive():
+        communicator = WebsocketCommunicator(BalanceConsumer.as_asgi(), '/ws/balance/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        message = await communicator.receive_json_from(timeout=2)
+        await communicator.disconnect()
+        return connected, message
+
+    (connected, message), ticks, worst_lag = asyncio.run(run_with_ticker(connect_and_receive()))
+
+    assert connected
+    assert message['type'] == 'balance_update'
+    assert message['balance'] == '250.00'
+    assert ticks >= REDIS_DELAY / TICK * 0.5
+    assert worst_lag < MAX_TICK_LAG
+
+
+@pytest.mark.django_db
+def test_saving_a_balance_replaces_the_snapshot(fake_redis, bot_user, django_capture_on_commit_callbacks):
+    fake_redis.set(balance_snapshot_key(bot_user.id), '0.00')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        bot_user.balance = Decimal('75.50')
+        bot_user.save()
+
+    assert fake_redis.get(balance_snapshot_key(bot_user.id)) == '75.50'
+
+    with django_capture_on_commit_callbacks(execute=True):
+        bot_user.save(update_fields=['last_login'])
+
+    assert fake_redis.get(balance_snapshot_key(bot_user.id)) == '75.50'
+
+
+@pytest.mark.django_db
+def test_trade_updates_write_snapshots_with_the_sync_client(fake_redis, bot_user, open_trade):
+    trade = open_trade()
+
+    sent = send_bot_trades_updates(get_channel_layer(), {bot_user.id: ([trade], Decimal('99.00'))})
+
+    assert sent == 1
+    assert fake_redis.get(balance_snapshot_key(bot_user.id)) == '99.00'
+    # No redis.asyncio pool left behind on the throwaway async_to_sync loop
+    assert len(redis_client._async_connection_pools) == 0
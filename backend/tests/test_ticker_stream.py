@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import fakeredis
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from apps.trading import snapshots, ticker_stream
+from apps.trading.snapshots import MARKET_SNAPSHOT_KEY, STREAM_TICKERS_KEY, AsyncSnapshotReader
+from apps.trading.ticker_stream import TickerStreamIngestor
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT']
+
+
+def ticker(symbol, price):
+    return {'stream': f'{symbol.lower()}@ticker', 'data': {
+        'e': '24hrTicker', 's': symbol, 'c': str(price), 'p': '1.0', 'P': '0.5', 'v': '100',
+    }}
+
+
+class FakeStream:
+    """Combined stream server: one scripted batch of frames per connection, then closes"""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.connections = 0
+        self.streams = []
+
+    async def handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.streams.append(request.query.get('streams'))
+        batch = self.batches[min(self.connections, len(self.batches) - 1)]
+        self.connections += 1
+
+        for frame in batch:
+            await ws.send_str(frame if isinstance(frame, str) else json.dumps(frame))
+        if self.connections < len(self.batches):
+            await ws.close()
+        else:
+            # Last batch: stay connected like a live stream
+            await asyncio.sleep(10)
+        return ws
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    server = fakeredis.FakeServer()
+    client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    monkeypatch.setattr(ticker_stream, 'get_async_redis_connection', lambda: client)
+    monkeypatch.setattr(snapshots, 'get_async_redis_connection', lambda: client)
+    monkeypatch.setattr(TickerStreamIngestor, 'RECONNECT_DELAY_MIN', 0.01)
+    return fakeredis.FakeRedis(server=server, decode_responses=True)
+
+
+def run_against(stream, until, publish_interval=0.05, timeout=5.0):
+    """Run an ingestor against the fake stream until until(ingestor) holds"""
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/stream', stream.handler)
+        server = TestServer(app)
+        await server.start_server()
+
+        ingestor = TickerStreamIngestor(
+            symbols=SYMBOLS, url=str(server.make_url('/stream')), publish_interval=publish_interval
+        )
+        task = asyncio.ensure_future(ingestor.run())
+        try:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while not until(ingestor) and loop.time() < deadline and not task.done():
+                await asyncio.sleep(0.01)
+            # Let a pending publish land
+            await asyncio.sleep(publish_interval * 2)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await server.close()
+        return ingestor
+
+    return asyncio.run(main())
+
+
+def test_bursts_are_coalesced_into_few_publishes(redis_server):
+    burst = [ticker('BTCUSDT', 60000 + i) for i in range(200)] + [ticker('ETHUSDT', 3000), ticker('DOGEUSDT', 1)]
+    stream = FakeStream([burst])
+
+    ingestor = run_against(stream, until=lambda ingestor: ingestor.stats['publishes'] >= 1)
+
+    assert stream.streams[0] == 'btcusdt@ticker/ethusdt@ticker'
+    assert ingestor.stats['messages'] == 201  # DOGEUSDT was not subscribed
+    assert 1 <= ingestor.stats['publishes'] <= 3
+
+    book = json.loads(redis_server.get(STREAM_TICKERS_KEY))
+    assert book['BTCUSDT']['lastPrice'] == '60199'
+    assert book['ETHUSDT']['lastPrice'] == '3000'
+
+
+def test_publish_leaves_the_refresh_snapshot_alone_and_readers_overlay_the_book(redis_server):
+    refreshed = [
+        {'id': 'bitcoin', 'symbol': 'BTC', 'category': 'crypto', 'price': 59000.0},
+        {'id': 'aapl', 'symbol': 'AAPL', 'category': 'stocks', 'price': 200.0},
+    ]
+    redis_server.set(MARKET_SNAPSHOT_KEY, json.dumps(refreshed), ex=20)
+    stream = FakeStream([[ticker('BTCUSDT', 61000)]])
+
+    run_against(stream, until=lambda ingestor: ingestor.stats['publishes'] >= 1)
+
+    # The REST refresh owns the snapshot: neither its values nor its expiry change
+    assert json.loads(redis_server.get(MARKET_SNAPSHOT_KEY)) == refreshed
+    assert 0 < redis_server.ttl(MARKET_SNAPSHOT_KEY) <= 20
+
+    assets = {asset['id']: asset for asset in asyncio.run(AsyncSnapshotReader().market_snapshot())}
+    assert assets['bitcoin']['price'] == 61000.0
+    assert assets['aapl']['price'] == 200.0
+
+    # Without a book (worker stopped) the refresh snapshot is served as is
+    redis_server.delete(STREAM_TICKERS_KEY)
+    assert asyncio.run(AsyncSnapshotReader().market_snapshot()) == refreshed
+
+
+def test_reconnects_after_server_close(redis_server):
+    stream = FakeStream([[ticker('BTCUSDT', 100)], [ticker('BTCUSDT', 200)]])
+
+    ingestor = run_against(
+        stream,
+        until=lambda ingestor: ingestor.book.get('BTCUSDT', {}).get('lastPrice') == '200',
+    )
+
+    assert stream.connections == 2
+    assert ingestor.stats['reconnects'] >= 1
+    assert json.loads(redis_server.get(STREAM_TICKERS_KEY))['BTCUSDT']['lastPrice'] == '200'
+
+
+def test_malformed_messages_are_skipped(redis_server):
+    broken = {'data': {'e': '24hrTicker', 's': 'BTCUSDT'}}  # no price fields
+    stream = FakeStream([['not json', broken, ticker('BTCUSDT', 300)]])
+
+    ingestor = run_against(stream, until=lambda ingestor: 'BTCUSDT' in ingestor.book)
+
+    assert ingestor.stats['errors'] == 2
+    assert ingestor.book['BTCUSDT']['lastPrice'] == '300'
+    assert stream.connections == 1
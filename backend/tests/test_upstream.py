@@ -0,0 +1,210 @@
+import asyncio
+import time
+
+import aiohttp
+import fakeredis
+import pytest
+import requests
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from apps.trading.utils import upstream
+from apps.trading.utils.crypto_fetcher import CryptoDataFetcher
+from apps.trading.utils.upstream import ProviderGuard, ProviderUnavailable
+
+
+def call(guard, error=None, weight=1):
+    """One guarded call that raises error (if given); returns whether the body ran"""
+    ran = []
+    with guard.guarded(weight=weight):
+        ran.append(True)
+        if error is not None:
+            raise error
+    return bool(ran)
+
+
+def fail(guard, times):
+    for _ in range(times):
+        with pytest.raises(requests.ConnectionError):
+            call(guard, requests.ConnectionError('down'))
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f'{status}', response=response)
+
+
+@pytest.fixture
+def guard(fake_redis):
+    return ProviderGuard('test', rate=1000, burst=1000)
+
+
+# ---------- Token bucket ----------
+
+def test_bucket_admits_the_burst_then_gives_up(fake_redis, monkeypatch):
+    monkeypatch.setattr(ProviderGuard, 'MAX_WAIT', 0)
+    guard = ProviderGuard('test', rate=0.01, burst=3)
+
+    assert all(call(guard) for _ in range(3))
+    with pytest.raises(ProviderUnavailable, match='rate limit'):
+        call(guard)
+
+
+def test_bucket_counts_request_weight(fake_redis, monkeypatch):
+    monkeypatch.setattr(ProviderGuard, 'MAX_WAIT', 0)
+    guard = ProviderGuard('test', rate=0.01, burst=3)
+
+    assert call(guard, weight=2)
+    with pytest.raises(ProviderUnavailable):
+        call(guard, weight=2)
+    assert call(guard, weight=1)
+
+
+def test_bucket_waits_for_refill_within_max_wait(fake_redis):
+    guard = ProviderGuard('test', rate=20, burst=1)
+    call(guard)
+
+    started = time.monotonic()
+    assert call(guard)
+    assert 0.03 <= time.monotonic() - started < ProviderGuard.MAX_WAIT
+
+
+def test_bucket_is_shared_by_every_guard_of_a_provider(fake_redis, monkeypatch):
+    monkeypatch.setattr(ProviderGuard, 'MAX_WAIT', 0)
+    first = ProviderGuard('test', rate=0.01, burst=2)
+    second = ProviderGuard('test', rate=0.01, burst=2)
+
+    call(first)
+    call(second)
+    with pytest.raises(ProviderUnavailable):
+        call(first)
+    assert call(ProviderGuard('other', rate=0.01, burst=2))
+
+
+# ---------- Circuit breaker ----------
+
+def test_breaker_opens_after_threshold_and_fails_fast(guard, fake_redis):
+    fail(guard, ProviderGuard.FAILURE_THRESHOLD - 1)
+    assert call(guard) is True
+
+    # A success resets the count
+    fail(guard, ProviderGuard.FAILURE_THRESHOLD - 1)
+    assert not fake_redis.exists(guard.open_key) and fake_redis.get(guard.failures_key) == '4'
+    fail(guard, 1)
+    assert fake_redis.exists(guard.open_key)
+    assert 0 < fake_redis.ttl(guard.open_key) <= ProviderGuard.OPEN_SECONDS
+
+    with pytest.raises(ProviderUnavailable, match='circuit open'):
+        call(guard)
+
+
+def test_successes_in_between_keep_the_circuit_closed(guard, fake_redis):
+    for _ in range(3):
+        fail(guard, ProviderGuard.FAILURE_THRESHOLD - 1)
+        call(guard)
+    assert not fake_redis.exists(guard.open_key)
+
+
+def test_half_open_lets_one_probe_through(guard, fake_redis):
+    fail(guard, ProviderGuard.FAILURE_THRESHOLD)
+    fake_redis.delete(guard.open_key)  # OPEN_SECONDS elapsed
+
+    with guard.guarded():
+        # Other callers fail fast while the probe is in flight
+        with pytest.raises(ProviderUnavailable, match='half-open'):
+            call(guard)
+
+    assert not fake_redis.exists(guard.failures_key, guard.probe_key)
+    assert call(guard)
+
+
+def test_failed_probe_reopens_the_circuit(guard, fake_redis):
+    fail(guard, ProviderGuard.FAILURE_THRESHOLD)
+    fake_redis.delete(guard.open_key)
+
+    fail(guard, 1)
+    assert fake_redis.exists(guard.open_key)
+    assert not fake_redis.exists(guard.probe_key)
+    with pytest.raises(ProviderUnavailable, match='circuit open'):
+        call(guard)
+
+
+def test_client_errors_do_not_count(guard, fake_redis):
+    for _ in range(ProviderGuard.FAILURE_THRESHOLD + 1):
+        with pytest.raises(requests.HTTPError):
+            call(guard, http_error(404))
+    assert not fake_redis.exists(guard.failures_key, guard.open_key)
+
+
+@pytest.mark.parametrize('error, counted', [
+    (requests.ConnectionError(), True),
+    (requests.Timeout(), True),
+    (http_error(500), True),
+    (http_error(429), True),
+    (http_error(400), False),
+    (aiohttp.ClientResponseError(None, (), status=503), True),
+    (aiohttp.ClientResponseError(None, (), status=404), False),
+    (asyncio.TimeoutError(), True),
+    (ValueError('bad json'), True),
+    (ProviderUnavailable(), False),
+    (KeyError('price'), False),
+])
+def test_is_failure(error, counted):
+    assert ProviderGuard.is_failure(error) is counted
+
+
+def test_calls_go_through_unchecked_without_redis(guard, redis_server):
+    redis_server.connected = False
+    fail(guard, ProviderGuard.FAILURE_THRESHOLD + 1)
+    assert call(guard)
+
+
+def test_async_guard_shares_the_breaker(guard, fake_redis, redis_server, monkeypatch):
+    async_client = fakeredis.aioredis.FakeRedis(server=redis_server, decode_responses=True)
+    monkeypatch.setattr(upstream, 'get_async_redis_connection', lambda: async_client)
+
+    async def failing_call():
+        async with guard.aguarded():
+            raise aiohttp.ClientConnectionError('down')
+
+    async def scenario():
+        for _ in range(ProviderGuard.FAILURE_THRESHOLD):
+            with pytest.raises(aiohttp.ClientConnectionError):
+                await failing_call()
+        with pytest.raises(ProviderUnavailable, match='circuit open'):
+            async with guard.aguarded():
+                pass
+
+    asyncio.run(scenario())
+    with pytest.raises(ProviderUnavailable, match='circuit open'):
+        call(guard)
+
+
+
+@pytest.mark.parametrize('fetch, provider, status', [
+    (CryptoDataFetcher.get_top_coins, 'coingecko', 429),
+    (CryptoDataFetcher.get_binance_supported_coins, 'binance', 503),
+])
+def test_fetcher_error_statuses_count_as_failures(fetch, provider, status, fake_redis, redis_server, monkeypatch):
+    async_client = fakeredis.aioredis.FakeRedis(server=redis_server, decode_responses=True)
+    monkeypatch.setattr(upstream, 'get_async_redis_connection', lambda: async_client)
+
+    async def handler(request):
+        return web.Response(status=status)
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get('/{path:.*}', handler)
+        server = TestServer(app)
+        await server.start_server()
+        base = str(server.make_url('')).rstrip('/')
+        monkeypatch.setattr(CryptoDataFetcher, 'COINGECKO_API_BASE', base)
+        monkeypatch.setattr(CryptoDataFetcher, 'BINANCE_API_BASE', base)
+        try:
+            return await fetch()
+        finally:
+            await server.close()
+
+    assert asyncio.run(scenario()) == []
+    assert fake_redis.get(upstream.provider_guard(provider).failures_key) == '1'
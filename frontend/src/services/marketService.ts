@@ -24,24 +24,65 @@ export interface OHLCVResponse {
   volume: VolumeData[];
 }
 
+// Parallel arrays (Accept: application/vnd.bemo.candles+json), several times
+// smaller than OHLCVResponse and cheaper to encode on the server
+export interface ColumnarCandles {
+  format: 'columnar';
+  count: number;
+  time: number[];
+  open: number[];
+  high: number[];
+  low: number[];
+  close: number[];
+  volume: number[];
+}
+
 export type ChartInterval = '1h' | '4h' | '1d' | '1w';
 
+const COLUMNAR_ACCEPT = 'application/vnd.bemo.candles+json';
+
+const fetchColumnar = async (symbol: string, interval: ChartInterval): Promise<ColumnarCandles> => {
+  const response = await api.get<ColumnarCandles>('/api/trading/history/', {
+    params: {
+      symbol: symbol,
+      interval: interval,
+    },
+    headers: { Accept: COLUMNAR_ACCEPT },
+  });
+  return response.data;
+};
+
+const toOHLCV = (candles: ColumnarCandles): OHLCVResponse => {
+  const ohlc: CandlestickData[] = [];
+  const volume: VolumeData[] = [];
+
+  for (let i = 0; i < candles.count; i++) {
+    ohlc.push({
+      time: candles.time[i],
+      open: candles.open[i],
+      high: candles.high[i],
+      low: candles.low[i],
+      close: candles.close[i],
+    });
+    volume.push({
+      time: candles.time[i],
+      value: candles.volume[i],
+      color: candles.close[i] >= candles.open[i] ? '#22c55e' : '#ef4444',
+    });
+  }
+
+  return { ohlc, volume };
+};
+
 export const marketService = {
   async getHistory(symbol: string, interval: ChartInterval): Promise<ChartDataPoint[]> {
     try {
-      const response = await api.get<OHLCVResponse>('/api/trading/history/', {
-        params: {
-          symbol: symbol,
-          interval: interval,
-        },
-      });
-
-      const ohlcvData = response.data;
+      const candles = await fetchColumnar(symbol, interval);
 
-      if (ohlcvData && ohlcvData.ohlc && ohlcvData.ohlc.length > 0) {
-        return ohlcvData.ohlc.map((candle: CandlestickData) => ({
-          time: candle.time,
-          value: candle.close,
+      if (candles && candles.count > 0) {
+        return candles.time.map((time, i) => ({
+          time,
+          value: candles.close[i],
         }));
       }
 
@@ -54,13 +95,7 @@ export const marketService = {
 
   async getHistoryOHLC(binanceSymbol: string, interval: ChartInterval): Promise<OHLCVResponse> {
     try {
-      const response = await api.get<OHLCVResponse>('/api/trading/history/', {
-        params: {
-          symbol: binanceSymbol,
-          interval: interval,
-        },
-      });
-      return response.data;
+      return toOHLCV(await fetchColumnar(binanceSymbol, interval));
     } catch (error) {
       console.error(`Error fetching OHLC history for ${binanceSymbol}:`, error);
       throw error;
@@ -35,6 +35,17 @@ export function useBalanceWebSocket() {
           dispatch(clearFlashBalance());
         }, 1000);
       }
+    } else if (message.type === 'bot_trades_update') {
+      // Coalesced update: every trade opened/closed in one bot run
+      if (message.balance !== undefined) {
+        dispatch(updateBalance(message.balance));
+      }
+      if (Array.isArray(message.trades) && message.trades.length > 0) {
+        message.trades.forEach((trade: any) => dispatch(updateBotTrade(trade)));
+        setTimeout(() => {
+          dispatch(clearFlashBalance());
+        }, 1000);
+      }
     }
   }, [dispatch]);
 
@@ -1,6 +1,6 @@
 import { useEffect, useRef, useCallback } from 'react';
 import { useAppDispatch, useAppSelector } from '@/store/hooks';
-import { marketUpdate, setConnected, setError } from '@/store/slices/websocketSlice';
+import { AssetItem, marketDelta, marketUpdate, setConnected, setError } from '@/store/slices/websocketSlice';
 import { RootState } from '@/store/store';
 
 interface UseWebSocketProps {
@@ -9,16 +9,25 @@ interface UseWebSocketProps {
   reconnectInterval?: number;
   maxReconnectAttempts?: number;
   onMessage?: (message: any) => void;
+  // Market socket only: narrow updates down to these categories / symbols
+  subscription?: { categories?: string[]; symbols?: string[] };
 }
 
 const WEBSOCKET_MARKET_URL =  'ws://localhost:8000/ws/market/';
 
+// Market socket: versioned snapshot + deltas instead of the full list every tick
+const withDeltaProtocol = (url: string) =>
+  url.includes('/ws/market/') && !url.includes('protocol=')
+    ? `${url}${url.includes('?') ? '&' : '?'}protocol=delta`
+    : url;
+
 export function useWebSocket({
   url = WEBSOCKET_MARKET_URL,
   autoConnect = true,
   reconnectInterval = 3000,
   maxReconnectAttempts = 10,
-  onMessage
+  onMessage,
+  subscription
 }: UseWebSocketProps = {}) {
   const dispatch = useAppDispatch();
   const { connected } = useAppSelector((state: RootState) => state.websocket);
@@ -29,6 +38,12 @@ export function useWebSocket({
   const shouldReconnect = useRef(autoConnect);
   const isConnecting = useRef(false);
   const connectionTimeout = useRef<NodeJS.Timeout | null>(null);
+  const marketAssets = useRef<Map<string, AssetItem>>(new Map());
+  const marketVersion = useRef<number | null>(null);
+  // A resync was sent and its snapshot hasn't arrived yet
+  const resyncPending = useRef(false);
+  const marketSubscription = useRef(subscription);
+  marketSubscription.current = subscription;
 
   const connect = useCallback(() => {
     if (!url || typeof url !== 'string' || (!url.startsWith('ws://') && !url.startsWith('wss://'))) {
@@ -62,7 +77,9 @@ export function useWebSocket({
 
     try {
       console.log('🔌 Attempting to connect to WebSocket:', url);
-      ws.current = new WebSocket(url);
+      marketVersion.current = null;
+      resyncPending.current = false;
+      ws.current = new WebSocket(withDeltaProtocol(url));
 
       ws.current.onopen = () => {
         console.log('✅ WebSocket connected successfully');
@@ -74,6 +91,9 @@ export function useWebSocket({
         dispatch(setError(null));
         reconnectAttempts.current = 0;
         isConnecting.current = false;
+        if (marketSubscription.current && url.includes('/ws/market/')) {
+          ws.current?.send(JSON.stringify({ type: 'subscribe', ...marketSubscription.current }));
+        }
       };
 
       ws.current.onmessage = (event) => {
@@ -85,6 +105,47 @@ export function useWebSocket({
           if (url.includes('/ws/market/')) {
             if (message.type === 'market_update') {
               dispatch(marketUpdate(message.data));
+            } else if (message.type === 'market_snapshot') {
+              marketAssets.current = new Map(message.data.map((asset: AssetItem) => [asset.id, asset]));
+              marketVersion.current = message.version;
+              resyncPending.current = false;
+              dispatch(marketUpdate(message.data));
+            } else if (message.type === 'market_delta') {
+              if (marketVersion.current !== message.base_version) {
+                // Missed a version: ask for one fresh snapshot, drop deltas until it arrives
+                if (!resyncPending.current) {
+                  resyncPending.current = true;
+                  ws.current?.send(JSON.stringify({ type: 'resync' }));
+                }
+                return;
+              }
+
+              const assets = marketAssets.current;
+              const updated: AssetItem[] = [];
+              const removed: string[] = [];
+
+              for (const [id, fields] of Object.entries(message.changes || {})) {
+                const asset = assets.get(id);
+                if (asset) {
+                  const next = { ...asset, ...(fields as Partial<AssetItem>) };
+                  assets.set(id, next);
+                  updated.push(next);
+                }
+              }
+              for (const asset of (message.added || []) as AssetItem[]) {
+                assets.set(asset.id, asset);
+                updated.push(asset);
+              }
+              for (const id of (message.removed || []) as string[]) {
+                const asset = assets.get(id);
+                if (asset) {
+                  assets.delete(id);
+                  removed.push(asset.symbol);
+                }
+              }
+
+              marketVersion.current = message.version;
+              dispatch(marketDelta({ updated, removed }));
             }
           }
         } catch (err) {
@@ -51,6 +51,22 @@ const websocketSlice = createSlice({
       state.lastUpdate = new Date().toISOString();
       state.loading = false;
     },
+    marketDelta: (state, action: PayloadAction<{ updated: AssetItem[]; removed: string[] }>) => {
+      for (const asset of action.payload.updated) {
+        const existing = state.assets[asset.symbol];
+        state.assets[asset.symbol] = {
+          ...asset,
+          isFavorite: existing?.isFavorite || false,
+        };
+      }
+
+      for (const symbol of action.payload.removed) {
+        delete state.assets[symbol];
+      }
+
+      state.lastUpdate = new Date().toISOString();
+      state.loading = false;
+    },
     toggleFavorite: (state, action: PayloadAction<string>) => {
       const symbol = action.payload;
       if (state.assets[symbol]) {
@@ -79,6 +95,7 @@ const websocketSlice = createSlice({
 
 export const {
   marketUpdate,
+  marketDelta,
   toggleFavorite,
   setConnected,
   setError,